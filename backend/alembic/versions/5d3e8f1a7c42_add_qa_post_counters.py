@@ -0,0 +1,47 @@
+"""add_qa_post_counters
+
+Revision ID: 5d3e8f1a7c42
+Revises: 227a03e2787e
+Create Date: 2026-10-17 09:12:41.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d3e8f1a7c42'
+down_revision: Union[str, Sequence[str], None] = '227a03e2787e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Denormalised reply and vote counters on Q&A posts
+    op.add_column('qa_posts', sa.Column('reply_count', sa.Integer(), nullable=False, server_default='0'))
+    op.add_column('qa_posts', sa.Column('upvote_count', sa.Integer(), nullable=False, server_default='0'))
+    op.add_column('qa_posts', sa.Column('downvote_count', sa.Integer(), nullable=False, server_default='0'))
+    op.add_column('qa_posts', sa.Column('vote_score', sa.Integer(), nullable=False, server_default='0'))
+
+    # Backfill from existing replies and votes
+    op.execute("""
+        UPDATE qa_posts SET
+            reply_count = (SELECT COUNT(*) FROM qa_posts AS replies WHERE replies.parent_post_id = qa_posts.id),
+            upvote_count = (SELECT COUNT(*) FROM qa_votes WHERE qa_votes.post_id = qa_posts.id AND qa_votes.vote_type = 'up'),
+            downvote_count = (SELECT COUNT(*) FROM qa_votes WHERE qa_votes.post_id = qa_posts.id AND qa_votes.vote_type = 'down')
+    """)
+    op.execute("UPDATE qa_posts SET vote_score = upvote_count - downvote_count")
+
+    op.create_index('ix_qa_posts_course_score', 'qa_posts', ['course_id', 'parent_post_id', 'vote_score'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_qa_posts_course_score', table_name='qa_posts')
+    op.drop_column('qa_posts', 'vote_score')
+    op.drop_column('qa_posts', 'downvote_count')
+    op.drop_column('qa_posts', 'upvote_count')
+    op.drop_column('qa_posts', 'reply_count')
@@ -0,0 +1,33 @@
+"""extend_qa_post_score_index
+
+Revision ID: 6c2f9b4e8d17
+Revises: f3b7d1c8e2a4
+Create Date: 2026-10-17 18:04:22.615390
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6c2f9b4e8d17'
+down_revision: Union[str, Sequence[str], None] = 'f3b7d1c8e2a4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # "Top questions" pages order by (vote_score, created_at, id); with the tie-breakers
+    # in the index, keyset pages are read from it without sorting equal scores
+    op.drop_index('ix_qa_posts_course_score', table_name='qa_posts')
+    op.create_index('ix_qa_posts_course_score', 'qa_posts',
+                    ['course_id', 'parent_post_id', 'vote_score', 'created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_qa_posts_course_score', table_name='qa_posts')
+    op.create_index('ix_qa_posts_course_score', 'qa_posts', ['course_id', 'parent_post_id', 'vote_score'], unique=False)
@@ -0,0 +1,32 @@
+"""add_learning_session_progress_index
+
+Revision ID: a3d7e5b90c21
+Revises: e4a9f2c6b813
+Create Date: 2026-10-17 15:02:44.170385
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3d7e5b90c21'
+down_revision: Union[str, Sequence[str], None] = 'e4a9f2c6b813'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Serves the dashboard's per-enrollment session counts and last access
+    op.create_index(
+        'ix_learning_sessions_user_course_started', 'learning_sessions',
+        ['user_id', 'course_id', 'started_at'], unique=False
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_learning_sessions_user_course_started', table_name='learning_sessions')
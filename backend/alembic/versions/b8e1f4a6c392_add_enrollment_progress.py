@@ -0,0 +1,48 @@
+"""add_enrollment_progress
+
+Revision ID: b8e1f4a6c392
+Revises: a3d7e5b90c21
+Create Date: 2026-10-17 15:48:12.593027
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8e1f4a6c392'
+down_revision: Union[str, Sequence[str], None] = 'a3d7e5b90c21'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Filled in by rebuild_enrollment_progress.py, then kept current by session events
+    op.create_table('enrollment_progress',
+    sa.Column('enrollment_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('course_id', sa.Integer(), nullable=False),
+    sa.Column('total_content', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('completed_sessions', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('learning_minutes', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('tracked_seconds', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('progress_percentage', sa.Float(), server_default='0', nullable=False),
+    sa.Column('last_accessed_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['course_id'], ['courses.id'], ),
+    sa.ForeignKeyConstraint(['enrollment_id'], ['enrollments.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('enrollment_id')
+    )
+    op.create_index(op.f('ix_enrollment_progress_course_id'), 'enrollment_progress', ['course_id'], unique=False)
+    op.create_index(op.f('ix_enrollment_progress_user_id'), 'enrollment_progress', ['user_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_enrollment_progress_user_id'), table_name='enrollment_progress')
+    op.drop_index(op.f('ix_enrollment_progress_course_id'), table_name='enrollment_progress')
+    op.drop_table('enrollment_progress')
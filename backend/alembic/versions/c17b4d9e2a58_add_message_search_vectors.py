@@ -0,0 +1,54 @@
+"""add_message_search_vectors
+
+Revision ID: c17b4d9e2a58
+Revises: 9a4c2e7b1f63
+Create Date: 2026-10-17 13:05:27.604913
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c17b4d9e2a58'
+down_revision: Union[str, Sequence[str], None] = '9a4c2e7b1f63'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Title words rank above body words; must match app/services/message_search.py
+SEARCH_VECTORS = {
+    'messages': (
+        "setweight(to_tsvector('english'::regconfig, coalesce(subject, '')), 'A') || "
+        "setweight(to_tsvector('english'::regconfig, coalesce(content, '')), 'B')"
+    ),
+    'qa_posts': (
+        "setweight(to_tsvector('english'::regconfig, coalesce(title, '')), 'A') || "
+        "setweight(to_tsvector('english'::regconfig, coalesce(content, '')), 'B')"
+    ),
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # tsvector search is Postgres only; other databases use the LIKE fallback
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    for table, expression in SEARCH_VECTORS.items():
+        op.execute(
+            f"ALTER TABLE {table} ADD COLUMN search_vector tsvector "
+            f"GENERATED ALWAYS AS ({expression}) STORED"
+        )
+        op.create_index(f'ix_{table}_search_vector', table, ['search_vector'], unique=False, postgresql_using='gin')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    for table in SEARCH_VECTORS:
+        op.drop_index(f'ix_{table}_search_vector', table_name=table)
+        op.drop_column(table, 'search_vector')
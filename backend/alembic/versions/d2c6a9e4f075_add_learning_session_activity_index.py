@@ -0,0 +1,32 @@
+"""add_learning_session_activity_index
+
+Revision ID: d2c6a9e4f075
+Revises: b8e1f4a6c392
+Create Date: 2026-10-17 16:20:37.815204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2c6a9e4f075'
+down_revision: Union[str, Sequence[str], None] = 'b8e1f4a6c392'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Serves the learning analytics streak and daily activity queries
+    op.create_index(
+        'ix_learning_sessions_user_started', 'learning_sessions',
+        ['user_id', 'started_at'], unique=False
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_learning_sessions_user_started', table_name='learning_sessions')
@@ -0,0 +1,44 @@
+"""add_keyset_pagination_indexes
+
+Revision ID: e4a9f2c6b813
+Revises: c17b4d9e2a58
+Create Date: 2026-10-17 14:21:09.482671
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4a9f2c6b813'
+down_revision: Union[str, Sequence[str], None] = 'c17b4d9e2a58'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Composite indexes matching the (…, created_at, id) keyset order of each list endpoint
+INDEXES = [
+    ('ix_messages_recipient_created', 'messages', ['recipient_id', 'created_at', 'id']),
+    ('ix_messages_sender_created', 'messages', ['sender_id', 'created_at', 'id']),
+    ('ix_notifications_user_created', 'notifications', ['user_id', 'created_at', 'id']),
+    ('ix_qa_posts_course_recent', 'qa_posts', ['course_id', 'parent_post_id', 'is_pinned', 'created_at', 'id']),
+    ('ix_content_generations_course_created', 'content_generations', ['course_id', 'created_at', 'id']),
+    ('ix_course_content_files_course_created', 'course_content_files', ['course_id', 'created_at', 'id']),
+    ('ix_users_created', 'users', ['created_at', 'id']),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Row comparisons on the pinned flag would skip NULLs
+    op.execute("UPDATE qa_posts SET is_pinned = false WHERE is_pinned IS NULL")
+
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns, unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for name, table, columns in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,57 @@
+"""add_daily_analytics_rollups
+
+Revision ID: f3b7d1c8e2a4
+Revises: d2c6a9e4f075
+Create Date: 2026-10-17 18:05:12.402518
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3b7d1c8e2a4'
+down_revision: Union[str, Sequence[str], None] = 'd2c6a9e4f075'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Additive metrics, so averages and rates can be recomputed over any range of days
+    op.add_column('platform_metrics', sa.Column('learning_sessions', sa.Integer(), nullable=True))
+    op.add_column('platform_metrics', sa.Column('assessments_passed', sa.Integer(), nullable=True))
+    op.add_column('course_analytics', sa.Column('learning_minutes', sa.Integer(), nullable=True))
+    op.add_column('course_analytics', sa.Column('assessment_score_total', sa.Integer(), nullable=True))
+    op.add_column('user_engagement_metrics', sa.Column('learning_sessions', sa.Integer(), nullable=True))
+    op.add_column('user_engagement_metrics', sa.Column('assessment_score_total', sa.Integer(), nullable=True))
+    op.add_column('user_engagement_metrics', sa.Column('courses_enrolled', sa.Integer(), nullable=True))
+
+    # One rollup row per course or user per day
+    op.create_index('ix_course_analytics_course_date', 'course_analytics', ['course_id', 'date'], unique=True)
+    op.create_index(
+        'ix_user_engagement_metrics_user_date', 'user_engagement_metrics', ['user_id', 'date'], unique=True
+    )
+
+    op.create_table('rollup_watermarks',
+        sa.Column('name', sa.String(length=50), nullable=False),
+        sa.Column('through_date', sa.Date(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.PrimaryKeyConstraint('name')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('rollup_watermarks')
+    op.drop_index('ix_user_engagement_metrics_user_date', table_name='user_engagement_metrics')
+    op.drop_index('ix_course_analytics_course_date', table_name='course_analytics')
+    op.drop_column('user_engagement_metrics', 'courses_enrolled')
+    op.drop_column('user_engagement_metrics', 'assessment_score_total')
+    op.drop_column('user_engagement_metrics', 'learning_sessions')
+    op.drop_column('course_analytics', 'assessment_score_total')
+    op.drop_column('course_analytics', 'learning_minutes')
+    op.drop_column('platform_metrics', 'assessments_passed')
+    op.drop_column('platform_metrics', 'learning_sessions')
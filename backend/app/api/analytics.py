@@ -1,15 +1,17 @@
 """
 Analytics and reporting API endpoints for admin dashboard.
 """
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import and_, or_, desc, asc, func, text
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from sqlalchemy import and_, or_, desc, asc, func, select, text
 from typing import List, Optional, Dict, Any
 from datetime import datetime, timedelta, date
 from dateutil.relativedelta import relativedelta
 
 from ..core.database import get_db
 from ..core.auth import get_current_user
+from ..core.pagination import paginate
 from ..models.user import User
 from ..models.analytics import (
     AnalyticsEvent, PlatformMetrics, CourseAnalytics, 
@@ -18,9 +20,24 @@ from ..models.analytics import (
 )
 from ..models.course import Course
 from ..models.learning import Enrollment, LearningSession, AssessmentAttempt
+from ..services.analytics_cache import analytics_cache
+from ..services.analytics_export import DATASETS, FORMATS as EXPORT_FORMATS, Columns, Rows, export_chunks
+from ..services.analytics_rollups import as_date, platform_daily, platform_totals
+from ..services.course_analytics import course_report
+from ..services.user_engagement import (
+    SORTS, engagement_query, engagement_row, iter_engagement_rows, sort_columns
+)
 
 router = APIRouter(tags=["Analytics & Reporting"])
 
+# Time series metric names and the daily platform rollup columns they read
+TIMESERIES_METRICS = {
+    "users": "new_registrations",
+    "enrollments": "course_enrollments",
+    "completions": "course_completions",
+    "learning_hours": "total_learning_hours",
+}
+
 
 # Helper functions for data aggregation
 def get_date_range(days: int = 30) -> tuple[date, date]:
@@ -30,100 +47,30 @@ def get_date_range(days: int = 30) -> tuple[date, date]:
     return start_date, end_date
 
 
-def calculate_user_retention_rate(db: Session, start_date: date, end_date: date) -> float:
-    """Calculate user retention rate for the given period."""
-    # Get users who registered before the start date
-    total_users = db.query(User).filter(
-        User.created_at < start_date,
-        User.is_active == True
-    ).count()
-    
-    if total_users == 0:
-        return 0.0
-    
-    # Get users who were active during the period
-    active_users = db.query(User).filter(
-        User.created_at < start_date,
-        User.is_active == True,
-        User.updated_at >= start_date
-    ).count()
-    
-    return (active_users / total_users) * 100 if total_users > 0 else 0.0
-
-
-# Platform Overview Metrics
-@router.get("/overview")
-async def get_platform_overview(
-    days: int = Query(30, ge=1, le=365),
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
-):
-    """Get platform overview metrics for admin dashboard."""
-    if current_user.role != "admin":
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Admin access required"
-        )
-    
+def platform_overview(db: Session, days: int) -> Dict[str, Any]:
+    """Platform overview metrics: current user and course counts in one statement, then period totals."""
     start_date, end_date = get_date_range(days)
-    
-    # User metrics
-    total_users = db.query(User).count()
-    active_users = db.query(User).filter(
-        User.is_active == True,
-        User.updated_at >= start_date
-    ).count()
-    new_registrations = db.query(User).filter(
-        User.created_at >= start_date
-    ).count()
-    retention_rate = calculate_user_retention_rate(db, start_date, end_date)
-    
-    # Course metrics
-    total_courses = db.query(Course).count()
-    active_courses = db.query(Course).filter(
-        Course.is_active == True,
-        Course.status == "published"
-    ).count()
-    
-    # Enrollment metrics
-    total_enrollments = db.query(Enrollment).filter(
-        Enrollment.created_at >= start_date
-    ).count()
-    
-    completed_enrollments = db.query(Enrollment).filter(
-        Enrollment.status == "completed",
-        Enrollment.updated_at >= start_date
-    ).count()
-    
-    # Learning metrics
-    total_learning_hours = db.query(func.sum(LearningSession.duration_minutes)).filter(
-        LearningSession.created_at >= start_date
-    ).scalar() or 0
-    total_learning_hours = total_learning_hours / 60  # Convert to hours
-    
-    # Assessment metrics
-    total_assessments = db.query(AssessmentAttempt).filter(
-        AssessmentAttempt.created_at >= start_date
-    ).count()
-    
-    passed_assessments = db.query(AssessmentAttempt).filter(
-        AssessmentAttempt.passed == True,
-        AssessmentAttempt.created_at >= start_date
-    ).count()
-    
+    count = lambda model, *criteria: select(func.count(model.id)).where(*criteria).scalar_subquery()
+    
+    counts = db.query(
+        count(User).label("total_users"),
+        count(User, User.is_active == True, User.updated_at >= start_date).label("active_users"),
+        count(User, User.created_at >= start_date).label("new_registrations"),
+        # Retention: users registered before the period who were active during it
+        count(User, User.created_at < start_date, User.is_active == True).label("retention_base"),
+        count(User, User.created_at < start_date, User.is_active == True,
+              User.updated_at >= start_date).label("retained_users"),
+        count(Course).label("total_courses"),
+        count(Course, Course.is_active == True, Course.status == "published").label("active_courses"),
+    ).one()
+    retention_rate = (counts.retained_users / counts.retention_base * 100) if counts.retention_base > 0 else 0.0
+    
+    # Period totals from the daily rollups plus today's live tail
+    totals = platform_totals(db, start_date)
+    total_assessments = totals["assessment_attempts"]
+    passed_assessments = totals["assessments_passed"]
     pass_rate = (passed_assessments / total_assessments * 100) if total_assessments > 0 else 0
     
-    # Engagement metrics
-    total_messages = db.query(AnalyticsEvent).filter(
-        AnalyticsEvent.event_type == "message_sent",
-        AnalyticsEvent.created_at >= start_date
-    ).count()
-    
-    total_qa_posts = db.query(AnalyticsEvent).filter(
-        AnalyticsEvent.event_type == "qa_post_created",
-        AnalyticsEvent.created_at >= start_date
-    ).count()
-    
     return {
         "period": {
             "start_date": start_date.isoformat(),
@@ -131,30 +78,73 @@ async def get_platform_overview(
             "days": days
         },
         "users": {
-            "total": total_users,
-            "active": active_users,
-            "new_registrations": new_registrations,
+            "total": counts.total_users,
+            "active": counts.active_users,
+            "new_registrations": counts.new_registrations,
             "retention_rate": round(retention_rate, 2)
         },
         "courses": {
-            "total": total_courses,
-            "active": active_courses,
-            "enrollments": total_enrollments,
-            "completions": completed_enrollments
+            "total": counts.total_courses,
+            "active": counts.active_courses,
+            "enrollments": int(totals["course_enrollments"]),
+            "completions": int(totals["course_completions"])
         },
         "learning": {
-            "total_hours": round(total_learning_hours, 2),
-            "assessments_attempted": total_assessments,
-            "assessments_passed": passed_assessments,
-            "pass_rate": round(pass_rate, 2)
+            "total_hours": round(float(totals["total_learning_hours"]), 2),
+            "assessments_attempted": int(total_assessments),
+            "assessments_passed": int(passed_assessments),
+            "pass_rate": round(float(pass_rate), 2)
         },
         "engagement": {
-            "messages_sent": total_messages,
-            "qa_posts_created": total_qa_posts
+            "messages_sent": int(totals["total_messages_sent"]),
+            "qa_posts_created": int(totals["qa_posts_created"])
         }
     }
 
 
+def export_response(format: str, columns: Columns, rows: Rows, filename: str) -> StreamingResponse:
+    """Stream rows as a file download in the requested format."""
+    try:
+        chunks = export_chunks(format, columns, rows)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except ImportError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Parquet export is not available on this server (pyarrow is not installed)"
+        )
+    
+    media_type, extension = EXPORT_FORMATS[format]
+    return StreamingResponse(
+        chunks,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{extension}"'}
+    )
+
+
+# Platform Overview Metrics
+@router.get("/overview")
+async def get_platform_overview(
+    days: int = Query(30, ge=1, le=365),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Get platform overview metrics for admin dashboard."""
+    if current_user.role != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin access required"
+        )
+    
+    # Cached per (endpoint, params, role); refreshed in the background once stale
+    return await analytics_cache.get_or_compute(
+        "overview", {"days": days}, current_user.role, lambda session: platform_overview(session, days), db
+    )
+
+
 # Course Analytics
 @router.get("/courses")
 async def get_course_analytics(
@@ -170,81 +160,21 @@ async def get_course_analytics(
             detail="Admin access required"
         )
     
-    start_date, end_date = get_date_range(days)
-    
-    query = db.query(Course).options(joinedload(Course.enrollments))
-    
-    if course_id:
-        query = query.filter(Course.id == course_id)
-    
-    courses = query.all()
-    
-    course_analytics = []
-    for course in courses:
-        # Enrollment metrics
-        total_enrollments = len(course.enrollments)
-        recent_enrollments = len([
-            e for e in course.enrollments 
-            if e.created_at.date() >= start_date
-        ])
-        completions = len([
-            e for e in course.enrollments 
-            if e.status == "completed"
-        ])
-        completion_rate = (completions / total_enrollments * 100) if total_enrollments > 0 else 0
-        
-        # Learning sessions for this course
-        learning_sessions = db.query(LearningSession).join(Enrollment).filter(
-            Enrollment.course_id == course.id,
-            LearningSession.created_at >= start_date
-        ).all()
-        
-        total_learning_time = sum(session.duration_minutes for session in learning_sessions) / 60
-        unique_learners = len(set(session.user_id for session in learning_sessions))
-        
-        # Assessment attempts for this course
-        assessment_attempts = db.query(AssessmentAttempt).join(Enrollment).filter(
-            Enrollment.course_id == course.id,
-            AssessmentAttempt.created_at >= start_date
-        ).all()
-        
-        total_attempts = len(assessment_attempts)
-        passed_attempts = len([a for a in assessment_attempts if a.passed])
-        avg_score = sum(a.score for a in assessment_attempts) / total_attempts if total_attempts > 0 else 0
-        
-        course_analytics.append({
-            "course_id": course.id,
-            "course_title": course.title,
-            "category": course.category,
-            "difficulty_level": course.difficulty_level,
-            "status": course.status,
-            "enrollments": {
-                "total": total_enrollments,
-                "recent": recent_enrollments,
-                "completions": completions,
-                "completion_rate": round(completion_rate, 2)
-            },
-            "learning": {
-                "total_hours": round(total_learning_time, 2),
-                "unique_learners": unique_learners,
-                "average_session_duration": round(total_learning_time / len(learning_sessions), 2) if learning_sessions else 0
+    # Grouped aggregates across all courses; summary rows only
+    def build(session: Session) -> Dict[str, Any]:
+        start_date, end_date = get_date_range(days)
+        return {
+            "period": {
+                "start_date": start_date.isoformat(),
+                "end_date": end_date.isoformat(),
+                "days": days
             },
-            "assessments": {
-                "total_attempts": total_attempts,
-                "passed_attempts": passed_attempts,
-                "pass_rate": round((passed_attempts / total_attempts * 100), 2) if total_attempts > 0 else 0,
-                "average_score": round(avg_score, 2)
-            }
-        })
+            "courses": course_report(session, start_date, course_id)
+        }
     
-    return {
-        "period": {
-            "start_date": start_date.isoformat(),
-            "end_date": end_date.isoformat(),
-            "days": days
-        },
-        "courses": course_analytics
-    }
+    return await analytics_cache.get_or_compute(
+        "courses", {"course_id": course_id, "days": days}, current_user.role, build, db
+    )
 
 
 # User Engagement Analytics
@@ -252,10 +182,14 @@ async def get_course_analytics(
 async def get_user_engagement_analytics(
     days: int = Query(30, ge=1, le=365),
     user_role: Optional[str] = Query(None),
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor value from the previous page"),
+    sort: str = Query("newest", description="newest, " + ", ".join(SORTS)),
+    response: Response = None,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Get user engagement analytics."""
+    """Get user engagement analytics, newest users (or highest of the sort metric) first."""
     if current_user.role != "admin":
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -264,63 +198,16 @@ async def get_user_engagement_analytics(
     
     start_date, end_date = get_date_range(days)
     
-    query = db.query(User)
-    if user_role:
-        query = query.filter(User.role == user_role)
-    
-    users = query.all()
-    
-    engagement_data = []
-    for user in users:
-        # Learning sessions
-        learning_sessions = db.query(LearningSession).filter(
-            LearningSession.user_id == user.id,
-            LearningSession.created_at >= start_date
-        ).all()
-        
-        total_learning_time = sum(session.duration_minutes for session in learning_sessions) / 60
-        session_count = len(learning_sessions)
-        
-        # Assessment attempts
-        assessment_attempts = db.query(AssessmentAttempt).filter(
-            AssessmentAttempt.user_id == user.id,
-            AssessmentAttempt.created_at >= start_date
-        ).all()
-        
-        passed_assessments = len([a for a in assessment_attempts if a.passed])
-        avg_score = sum(a.score for a in assessment_attempts) / len(assessment_attempts) if assessment_attempts else 0
-        
-        # Enrollments
-        enrollments = db.query(Enrollment).filter(
-            Enrollment.user_id == user.id,
-            Enrollment.created_at >= start_date
-        ).all()
-        
-        completed_courses = len([e for e in enrollments if e.status == "completed"])
-        
-        # Analytics events for engagement
-        login_events = db.query(AnalyticsEvent).filter(
-            AnalyticsEvent.user_id == user.id,
-            AnalyticsEvent.event_type == "login",
-            AnalyticsEvent.created_at >= start_date
-        ).count()
-        
-        engagement_data.append({
-            "user_id": user.id,
-            "email": user.email,
-            "role": user.role,
-            "is_active": user.is_active,
-            "engagement": {
-                "login_count": login_events,
-                "learning_hours": round(total_learning_time, 2),
-                "session_count": session_count,
-                "courses_enrolled": len(enrollments),
-                "courses_completed": completed_courses,
-                "assessments_attempted": len(assessment_attempts),
-                "assessments_passed": passed_assessments,
-                "average_score": round(avg_score, 2)
-            }
-        })
+    # One grouped statement per page, whatever the number of users
+    query = engagement_query(db, start_date, user_role)
+    try:
+        columns = sort_columns(query, sort)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    page = paginate(query, columns, limit, cursor, response=response)
     
     return {
         "period": {
@@ -328,10 +215,36 @@ async def get_user_engagement_analytics(
             "end_date": end_date.isoformat(),
             "days": days
         },
-        "users": engagement_data
+        "users": [engagement_row(row) for row in page.items]
     }
 
 
+@router.get("/users/engagement/export")
+async def export_user_engagement(
+    days: int = Query(30, ge=1, le=365),
+    user_role: Optional[str] = Query(None),
+    sort: str = Query("newest", description="newest, " + ", ".join(SORTS)),
+    format: str = Query("csv", description="Export format: " + ", ".join(EXPORT_FORMATS)),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Stream every user's engagement without building the report in memory."""
+    if current_user.role != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin access required"
+        )
+    if sort != "newest" and sort not in SORTS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown sort: {sort}"
+        )
+    
+    start_date, end_date = get_date_range(days)
+    rows = iter_engagement_rows(db, start_date, user_role, sort)
+    return export_response(format, DATASETS["users"].columns, rows, f"user_engagement_{days}days")
+
+
 # Time Series Data
 @router.get("/timeseries")
 async def get_timeseries_data(
@@ -348,110 +261,63 @@ async def get_timeseries_data(
             detail="Admin access required"
         )
     
-    start_date, end_date = get_date_range(days)
+    if metric not in TIMESERIES_METRICS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid metric. Use: users, enrollments, completions, learning_hours"
+        )
     
     # Determine date grouping based on granularity
     if granularity == "daily":
-        date_format = "%Y-%m-%d"
-        date_trunc = "day"
+        bucket = lambda day: day
     elif granularity == "weekly":
-        date_format = "%Y-%U"  # Year-Week
-        date_trunc = "week"
+        bucket = lambda day: day - timedelta(days=day.weekday())
     elif granularity == "monthly":
-        date_format = "%Y-%m"
-        date_trunc = "month"
+        bucket = lambda day: day.replace(day=1)
     else:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Invalid granularity. Use: daily, weekly, monthly"
         )
     
-    timeseries_data = []
-    
-    if metric == "users":
-        # New user registrations over time
-        result = db.query(
-            func.date_trunc(date_trunc, User.created_at).label('date'),
-            func.count(User.id).label('count')
-        ).filter(
-            User.created_at >= start_date
-        ).group_by(
-            func.date_trunc(date_trunc, User.created_at)
-        ).order_by('date').all()
-        
-        timeseries_data = [{"date": row.date.isoformat(), "value": row.count} for row in result]
-    
-    elif metric == "enrollments":
-        # Course enrollments over time
-        result = db.query(
-            func.date_trunc(date_trunc, Enrollment.created_at).label('date'),
-            func.count(Enrollment.id).label('count')
-        ).filter(
-            Enrollment.created_at >= start_date
-        ).group_by(
-            func.date_trunc(date_trunc, Enrollment.created_at)
-        ).order_by('date').all()
-        
-        timeseries_data = [{"date": row.date.isoformat(), "value": row.count} for row in result]
-    
-    elif metric == "completions":
-        # Course completions over time
-        result = db.query(
-            func.date_trunc(date_trunc, Enrollment.updated_at).label('date'),
-            func.count(Enrollment.id).label('count')
-        ).filter(
-            Enrollment.status == "completed",
-            Enrollment.updated_at >= start_date
-        ).group_by(
-            func.date_trunc(date_trunc, Enrollment.updated_at)
-        ).order_by('date').all()
-        
-        timeseries_data = [{"date": row.date.isoformat(), "value": row.count} for row in result]
-    
-    elif metric == "learning_hours":
-        # Learning hours over time
-        result = db.query(
-            func.date_trunc(date_trunc, LearningSession.created_at).label('date'),
-            func.sum(LearningSession.duration_minutes).label('total_minutes')
-        ).filter(
-            LearningSession.created_at >= start_date
-        ).group_by(
-            func.date_trunc(date_trunc, LearningSession.created_at)
-        ).order_by('date').all()
+    # Daily rows from the rollups plus today's live tail, bucketed here
+    def build(session: Session) -> Dict[str, Any]:
+        start_date, end_date = get_date_range(days)
+        column = TIMESERIES_METRICS[metric]
+        buckets: Dict[date, float] = {}
+        for row in platform_daily(session, start_date):
+            day = bucket(as_date(row.date))
+            buckets[day] = buckets.get(day, 0) + (getattr(row, column) or 0)
         
-        timeseries_data = [
-            {"date": row.date.isoformat(), "value": round(row.total_minutes / 60, 2)} 
-            for row in result
-        ]
-    
-    else:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Invalid metric. Use: users, enrollments, completions, learning_hours"
-        )
+        return {
+            "metric": metric,
+            "granularity": granularity,
+            "period": {
+                "start_date": start_date.isoformat(),
+                "end_date": end_date.isoformat(),
+                "days": days
+            },
+            "data": [
+                {"date": day.isoformat(), "value": round(float(value), 2) if metric == "learning_hours" else value}
+                for day, value in sorted(buckets.items())
+            ]
+        }
     
-    return {
-        "metric": metric,
-        "granularity": granularity,
-        "period": {
-            "start_date": start_date.isoformat(),
-            "end_date": end_date.isoformat(),
-            "days": days
-        },
-        "data": timeseries_data
-    }
+    return await analytics_cache.get_or_compute(
+        "timeseries", {"metric": metric, "days": days, "granularity": granularity}, current_user.role, build, db
+    )
 
 
 # Export functionality
 @router.get("/export")
 async def export_analytics_data(
-    format: str = Query("csv", description="Export format: csv, json"),
-    metric: str = Query("overview", description="Data to export"),
+    format: str = Query("csv", description="Export format: " + ", ".join(EXPORT_FORMATS)),
+    metric: str = Query("overview", description="Data to export: overview, " + ", ".join(DATASETS)),
     days: int = Query(30, ge=1, le=365),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Export analytics data in various formats."""
+    """Stream analytics data as CSV, JSON, JSON Lines or Parquet without building it in memory."""
     if current_user.role != "admin":
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -460,54 +326,25 @@ async def export_analytics_data(
     
     # Get data based on metric type
     if metric == "overview":
-        data = await get_platform_overview(days, current_user, db)
-    elif metric == "courses":
-        data = await get_course_analytics(None, days, current_user, db)
-    elif metric == "users":
-        data = await get_user_engagement_analytics(days, None, current_user, db)
+        # A few dozen figures, flattened to metric/value rows
+        data = await get_platform_overview(days=days, current_user=current_user, db=db)
+        columns = [("metric", "str"), ("value", "str")]
+        rows = [
+            {"metric": f"{category}_{key}", "value": value}
+            for category, metrics in data.items() if isinstance(metrics, dict)
+            for key, value in metrics.items()
+        ]
+    elif metric in DATASETS:
+        start_date, end_date = get_date_range(days)
+        columns = DATASETS[metric].columns
+        rows = DATASETS[metric].rows(db, start_date)
     else:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Invalid metric for export"
+            detail="Invalid metric for export. Use: overview, " + ", ".join(DATASETS)
         )
     
-    if format == "csv":
-        # Convert data to CSV format
-        import csv
-        import io
-        
-        output = io.StringIO()
-        writer = csv.writer(output)
-        
-        # Flatten the data structure for CSV
-        if metric == "overview":
-            writer.writerow(["Metric", "Value"])
-            for category, metrics in data.items():
-                if isinstance(metrics, dict):
-                    for key, value in metrics.items():
-                        writer.writerow([f"{category}_{key}", value])
-        
-        csv_content = output.getvalue()
-        output.close()
-        
-        return {
-            "content": csv_content,
-            "filename": f"analytics_{metric}_{days}days.csv",
-            "content_type": "text/csv"
-        }
-    
-    elif format == "json":
-        return {
-            "content": data,
-            "filename": f"analytics_{metric}_{days}days.json",
-            "content_type": "application/json"
-        }
-    
-    else:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Invalid format. Use: csv, json"
-        )
+    return export_response(format, columns, rows, f"analytics_{metric}_{days}days")
 
 
 # Report Templates
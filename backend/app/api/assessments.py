@@ -15,6 +15,7 @@ from ..api.auth import get_current_user
 from ..models.course import Course, CourseFileContent
 from ..models.learning import Enrollment, Assessment, AssessmentAttempt, AssessmentQuestion
 from ..models.user import User
+from ..services.analytics_cache import analytics_cache
 from ..schemas.learning import (
     AssessmentResponse,
     AssessmentQuestionResponse,
@@ -275,6 +276,7 @@ async def submit_assessment_attempt(
     )
     
     db.add(attempt)
+    analytics_cache.invalidate_on_commit(db)
     db.commit()
     db.refresh(attempt)
     
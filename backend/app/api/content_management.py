@@ -3,18 +3,20 @@ Course Content Management API
 Handles RAG-based content generation, document processing, and content management
 """
 
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, status
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Query, Response, status
 from sqlalchemy.orm import Session
 from typing import List, Dict, Any, Optional
 from pydantic import BaseModel
 
 from ..core.database import get_db
+from ..core.pagination import paginate
 from ..api.auth import get_current_user
 from ..models.user import User
 from ..models.course import Course, CourseFileContent, CourseContent, CourseModule
 from ..models.ai import ContentGeneration
 # from ..services.rag_service import RAGService  # Temporarily disabled
 from ..services.pdf_processor import PDFProcessor, CourseAccessManager
+from ..services.enrollment_progress import refresh_course_progress
 
 router = APIRouter()
 
@@ -168,6 +170,7 @@ async def upload_document(
         )
         
         db.add(content)
+        refresh_course_progress(db, course_id)
         db.commit()
         db.refresh(content)
         
@@ -288,10 +291,13 @@ async def generate_course_content(
 @router.get("/courses/{course_id}/generated-content", response_model=List[Dict[str, Any]])
 async def get_generated_content(
     course_id: int,
+    limit: int = Query(50, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor value from the previous page"),
+    response: Response = None,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Get all generated content for a course"""
+    """Get generated content for a course, newest first"""
     if current_user.role not in ["instructor", "admin"]:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -312,9 +318,10 @@ async def get_generated_content(
             )
         
         # Get generated content
-        generations = db.query(ContentGeneration).filter(
-            ContentGeneration.course_id == course_id
-        ).order_by(ContentGeneration.created_at.desc()).all()
+        page = paginate(
+            db.query(ContentGeneration).filter(ContentGeneration.course_id == course_id),
+            (ContentGeneration.created_at, ContentGeneration.id), limit, cursor, response=response
+        )
         
         return [
             {
@@ -326,9 +333,11 @@ async def get_generated_content(
                 "created_at": gen.created_at.isoformat(),
                 "approved_by": gen.approved_by
             }
-            for gen in generations
+            for gen in page.items
         ]
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -13,10 +13,12 @@ from ..core.database import get_db
 from ..core.auth import get_current_user
 from ..models.user import User, UserProfile
 from ..models.course import Course, CourseFileContent
-from ..models.learning import Enrollment
+from ..models.learning import Enrollment, EnrollmentProgress
 from ..services.pdf_processor import PDFProcessor, CourseAccessManager, LearningTimeTracker
 from ..services.ai_content_generator import AIContentGenerator
 from ..services.knowledge_test_generator import KnowledgeTestGenerator, LearningAnalytics
+from ..services.enrollment_progress import refresh_course_progress, progress_by_enrollment
+from ..services.analytics_cache import analytics_cache
 from ..models.course import CourseModule, CourseContent
 from ..schemas.course import CourseCreate, CourseResponse, CourseFileContentResponse, AccessGrantRequest
 from pydantic import BaseModel
@@ -83,6 +85,7 @@ async def upload_pdf_course(
         )
         
         db.add(content)
+        refresh_course_progress(db, course_id)
         db.commit()
         db.refresh(content)
         
@@ -310,6 +313,7 @@ async def get_course_students(
             Enrollment.status == "active"
         ).all()
         
+        progress = progress_by_enrollment(db, [enrollment.id for enrollment in enrollments])
         student_list = []
         for enrollment in enrollments:
             student = db.query(User).filter(User.id == enrollment.user_id).first()
@@ -327,7 +331,7 @@ async def get_course_students(
                     "cscs_card_number": student.cscs_card_number,
                     "is_active": student.is_active,
                     "enrolled_at": enrollment.enrolled_at,
-                    "progress": enrollment.progress
+                    "progress": progress.get(enrollment.id, 0.0)
                 })
         
         return {"students": student_list}
@@ -468,13 +472,15 @@ async def delete_course(
         for content in content_files:
             db.delete(content)
 
-        # Delete related enrollments
+        # Delete related enrollments and their materialised progress
+        db.query(EnrollmentProgress).filter(EnrollmentProgress.course_id == course_id).delete(synchronize_session=False)
         enrollments = db.query(Enrollment).filter(Enrollment.course_id == course_id).all()
         for enrollment in enrollments:
             db.delete(enrollment)
 
         # Delete the course
         db.delete(course)
+        analytics_cache.invalidate_on_commit(db)
         db.commit()
 
         return {"message": f"Course '{course.title}' deleted successfully"}
@@ -662,6 +668,7 @@ async def tweak_course_content(
         )
         
         db.add(new_content)
+        refresh_course_progress(db, course_id)
         db.commit()
         db.refresh(new_content)
         
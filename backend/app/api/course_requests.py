@@ -12,6 +12,7 @@ from ..models.user import User, UserProfile
 from ..models.course import Course
 from ..models.course_request import CourseRequest, RequestStatus
 from ..models.learning import Enrollment
+from ..services.analytics_cache import analytics_cache
 from ..schemas.course_request import CourseRequestCreate, CourseRequestResponse, CourseRequestUpdate
 
 router = APIRouter(tags=["Course Requests"])
@@ -118,6 +119,7 @@ async def update_course_request(
             progress=0.0
         )
         db.add(enrollment)
+        analytics_cache.invalidate_on_commit(db)
     
     db.commit()
     db.refresh(course_request)
@@ -9,6 +9,7 @@ from ..core.database import get_db
 from ..models.course import Course, CourseFileContent
 from ..models.user import User, UserProfile
 from ..models.learning import Enrollment
+from ..services.enrollment_progress import progress_by_enrollment
 from ..core.auth import get_current_user
 from ..schemas.course import CourseCreate, CourseResponse
 
@@ -212,6 +213,7 @@ async def get_course_students(
             Enrollment.status == "active"
         ).all()
         
+        progress = progress_by_enrollment(db, [enrollment.id for enrollment in enrollments])
         student_list = []
         for enrollment in enrollments:
             student = db.query(User).filter(User.id == enrollment.user_id).first()
@@ -229,7 +231,7 @@ async def get_course_students(
                     "cscs_card_number": student.cscs_card_number,
                     "is_active": student.is_active,
                     "enrolled_at": enrollment.enrolled_at,
-                    "progress": enrollment.progress
+                    "progress": progress.get(enrollment.id, 0.0)
                 })
         
         return {"students": student_list}
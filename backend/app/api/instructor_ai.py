@@ -3,7 +3,7 @@ Instructor AI Workflow API Endpoints
 Provides content generation and document processing for instructors
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form, Query, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
 import json
@@ -11,9 +11,11 @@ import os
 from pathlib import Path
 
 from ..core.database import get_db
+from ..core.pagination import paginate
 from ..api.auth import get_current_user
 from ..services.simple_ai_generator import SimpleAIContentGenerator
-from ..services.simple_rag_service import SimpleRAGService
+from ..services.simple_rag_service import SimpleRAGService, shared_simple_embedder
+from ..services.enrollment_progress import refresh_course_progress
 from ..models.course import Course, CourseFileContent
 from ..models.ai import ContentGeneration
 from ..core.config import settings
@@ -77,6 +79,7 @@ async def upload_document(
         )
         
         db.add(course_file)
+        refresh_course_progress(db, course_id)
         db.commit()
         db.refresh(course_file)
         
@@ -228,10 +231,13 @@ async def generate_content(
 async def get_content_generations(
     course_id: Optional[int] = None,
     content_type: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor value from the previous page"),
+    response: Response = None,
     db: Session = Depends(get_db),
     current_user = Depends(get_current_user)
 ):
-    """Get AI-generated content for instructor review"""
+    """Get AI-generated content for instructor review, newest first"""
     
     # Verify instructor access
     if current_user.role != "instructor":
@@ -264,7 +270,9 @@ async def get_content_generations(
             query = query.filter(ContentGeneration.content_type == content_type)
         
         # Get content generations
-        generations = query.order_by(ContentGeneration.created_at.desc()).all()
+        page = paginate(
+            query, (ContentGeneration.created_at, ContentGeneration.id), limit, cursor, response=response
+        )
         
         return [
             {
@@ -279,9 +287,11 @@ async def get_content_generations(
                 "approved_at": gen.approved_at,
                 "approved_by": gen.approved_by
             }
-            for gen in generations
+            for gen in page.items
         ]
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -408,13 +418,13 @@ async def reject_content(
 
 @router.get("/search-content")
 async def search_content(
-    course_id: int,
     query: str,
+    course_id: Optional[int] = None,
     top_k: int = 5,
     db: Session = Depends(get_db),
     current_user = Depends(get_current_user)
 ):
-    """Search for relevant content in course documents"""
+    """Search for relevant content in course documents, or across all of the instructor's courses"""
     
     # Verify instructor access
     if current_user.role != "instructor":
@@ -424,25 +434,33 @@ async def search_content(
         )
     
     # Verify course ownership
-    course = db.query(Course).filter(
-        Course.id == course_id,
-        Course.instructor_id == current_user.id
-    ).first()
-    
-    if not course:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Course not found or access denied"
-        )
+    if course_id is not None:
+        course = db.query(Course).filter(
+            Course.id == course_id,
+            Course.instructor_id == current_user.id
+        ).first()
+        
+        if not course:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Course not found or access denied"
+            )
     
     try:
         # Search content using RAG service
         rag_service = SimpleRAGService(db)
-        results = rag_service.search_course_content(
-            course_id=course_id,
-            query=query,
-            top_k=top_k
-        )
+        if course_id is not None:
+            results = rag_service.search_course_content(
+                course_id=course_id,
+                query=query,
+                top_k=top_k
+            )
+        else:
+            results = rag_service.search_instructor_content(
+                instructor_id=current_user.id,
+                query=query,
+                top_k=top_k
+            )
         
         return {
             "status": "success",
@@ -458,13 +476,31 @@ async def search_content(
         )
 
 
+@router.get("/embedder-stats")
+async def get_embedder_stats(
+    current_user = Depends(get_current_user)
+):
+    """Report whether the shared embedder is loaded and its cold vs warm latency"""
+    
+    if current_user.role not in ["instructor", "admin"]:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only instructors can view embedder statistics"
+        )
+    
+    return shared_simple_embedder.stats()
+
+
 @router.get("/course-documents")
 async def get_course_documents(
     course_id: int,
+    limit: int = Query(50, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor value from the previous page"),
+    response: Response = None,
     db: Session = Depends(get_db),
     current_user = Depends(get_current_user)
 ):
-    """Get all documents for a course"""
+    """Get documents for a course, newest first"""
     
     # Verify instructor access
     if current_user.role != "instructor":
@@ -486,10 +522,13 @@ async def get_course_documents(
         )
     
     try:
-        documents = db.query(CourseFileContent).filter(
-            CourseFileContent.course_id == course_id,
-            CourseFileContent.is_active == True
-        ).order_by(CourseFileContent.created_at.desc()).all()
+        page = paginate(
+            db.query(CourseFileContent).filter(
+                CourseFileContent.course_id == course_id,
+                CourseFileContent.is_active == True
+            ),
+            (CourseFileContent.created_at, CourseFileContent.id), limit, cursor, response=response
+        )
         
         return [
             {
@@ -501,9 +540,11 @@ async def get_course_documents(
                 "created_at": doc.created_at,
                 "is_processed": doc.file_path is not None
             }
-            for doc in documents
+            for doc in page.items
         ]
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -7,6 +7,7 @@ from typing import List
 
 from ..core.database import get_db
 from ..models.learning import Enrollment, LearningSession, Assessment
+from ..services.enrollment_progress import progress_by_enrollment
 from ..models.course import Course, CourseModule, CourseContent, CourseFileContent
 from ..api.auth import get_current_user
 
@@ -35,6 +36,7 @@ async def get_available_courses(
     
     # Create enrollment lookup
     enrollment_lookup = {e.course_id: e for e in enrollments}
+    progress_lookup = progress_by_enrollment(db, [e.id for e in enrollments])
     
     # Build course list with enrollment status
     course_list = []
@@ -43,7 +45,7 @@ async def get_available_courses(
         
         if enrollment:
             status = "active" if enrollment.status == "active" else "paused"
-            progress_percentage = enrollment.progress or 0
+            progress_percentage = progress_lookup.get(enrollment.id, 0)
             enrolled_at = enrollment.enrolled_at.isoformat() if enrollment.enrolled_at else None
             last_accessed = enrollment.updated_at.isoformat() if enrollment.updated_at else None
         else:
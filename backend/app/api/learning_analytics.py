@@ -5,9 +5,9 @@ Provides detailed analytics and progress tracking for students
 
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, desc, func, extract
+from sqlalchemy import Date, Integer, and_, cast, desc, func, extract, literal
 from typing import List, Dict, Any, Optional
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from pydantic import BaseModel
 
 from ..core.database import get_db
@@ -15,6 +15,7 @@ from ..api.auth import get_current_user
 from ..models.course import Course
 from ..models.learning import Enrollment, LearningSession, AssessmentAttempt
 from ..models.user import User
+from ..services.enrollment_progress import progress_by_enrollment
 
 router = APIRouter()
 
@@ -79,21 +80,11 @@ async def get_learning_analytics(
     
     overall_progress = 0.0
     if enrollments:
-        total_progress = sum(enrollment.progress for enrollment in enrollments)
-        overall_progress = total_progress / len(enrollments)
+        progress = progress_by_enrollment(db, [enrollment.id for enrollment in enrollments])
+        overall_progress = sum(progress.values()) / len(enrollments)
     
     # Get total learning time
-    learning_sessions = db.query(LearningSession).filter(
-        and_(
-            LearningSession.user_id == current_user.id,
-            LearningSession.started_at >= start_date,
-            LearningSession.ended_at.isnot(None)
-        )
-    ).all()
-    
-    total_learning_time_minutes = sum(
-        session.duration_minutes or 0 for session in learning_sessions
-    )
+    total_learning_time_minutes = _learning_minutes(db, current_user.id, start_date)
     
     # Calculate current streak (simplified - consecutive days with learning activity)
     current_streak_days = calculate_learning_streak(db, current_user.id)
@@ -127,73 +118,76 @@ async def get_learning_analytics(
     )
 
 
+def _activity_day(db: Session, column):
+    """The calendar day of a timestamp, truncated in SQL"""
+    if db.get_bind().dialect.name == "sqlite":
+        return func.date(column)
+    return cast(func.date_trunc("day", column), Date)
+
+
+def _day_number(db: Session, day):
+    """Days since a fixed epoch, so consecutive days differ by one"""
+    if db.get_bind().dialect.name == "sqlite":
+        return cast(func.julianday(day), Integer)
+    return day - literal(date(1970, 1, 1), Date)
+
+
+def _learning_minutes(db: Session, user_id: int, since: Optional[datetime] = None) -> int:
+    """Minutes of completed learning sessions, summed in SQL"""
+    query = db.query(func.coalesce(func.sum(LearningSession.duration_minutes), 0)).filter(
+        LearningSession.user_id == user_id,
+        LearningSession.ended_at.isnot(None)
+    )
+    if since is not None:
+        query = query.filter(LearningSession.started_at >= since)
+    return int(query.scalar() or 0)
+
+
 def calculate_learning_streak(db: Session, user_id: int) -> int:
     """Calculate current learning streak in days."""
-    # Get all learning sessions for the user
-    sessions = db.query(LearningSession).filter(
+    # Gaps and islands: on the distinct active days, newest first, day + row number
+    # is constant across a run of consecutive days, so the run ending today is the
+    # rows where it equals today + 1
+    day = _activity_day(db, LearningSession.started_at).label("day")
+    days = db.query(day).filter(
         and_(
             LearningSession.user_id == user_id,
             LearningSession.ended_at.isnot(None)
         )
-    ).order_by(desc(LearningSession.started_at)).all()
-    
-    if not sessions:
-        return 0
+    ).distinct().subquery()
     
-    # Group sessions by date
-    session_dates = set()
-    for session in sessions:
-        session_date = session.started_at.date()
-        session_dates.add(session_date)
+    position = func.row_number().over(order_by=desc(days.c.day))
+    islands = db.query((_day_number(db, days.c.day) + position).label("island")).subquery()
     
-    # Calculate consecutive days
-    streak = 0
-    current_date = datetime.utcnow().date()
-    
-    while current_date in session_dates:
-        streak += 1
-        current_date -= timedelta(days=1)
-    
-    return streak
+    today = _day_number(db, literal(datetime.utcnow().date(), Date))
+    return db.query(func.count()).select_from(islands).filter(islands.c.island == today + 1).scalar() or 0
 
 
 def get_weekly_activity(db: Session, user_id: int, start_date: datetime, end_date: datetime) -> List[Dict[str, Any]]:
     """Get weekly learning activity data."""
-    # Get learning sessions in the date range
-    sessions = db.query(LearningSession).filter(
+    # Group the date range's sessions by day in SQL
+    day = _activity_day(db, LearningSession.started_at).label("day")
+    rows = db.query(
+        day,
+        func.coalesce(func.sum(LearningSession.duration_minutes), 0),
+        func.count(func.distinct(LearningSession.course_id))
+    ).filter(
         and_(
             LearningSession.user_id == user_id,
             LearningSession.started_at >= start_date,
             LearningSession.started_at <= end_date,
             LearningSession.ended_at.isnot(None)
         )
-    ).all()
-    
-    # Group by date
-    daily_activity = {}
-    for session in sessions:
-        date_key = session.started_at.date().isoformat()
-        if date_key not in daily_activity:
-            daily_activity[date_key] = {
-                "date": date_key,
-                "minutes": 0,
-                "courses_accessed": set()
-            }
-        
-        daily_activity[date_key]["minutes"] += session.duration_minutes or 0
-        daily_activity[date_key]["courses_accessed"].add(session.course_id)
-    
-    # Convert sets to counts and sort by date
-    weekly_activity = []
-    for date_key in sorted(daily_activity.keys()):
-        activity = daily_activity[date_key]
-        weekly_activity.append({
-            "date": activity["date"],
-            "minutes": activity["minutes"],
-            "courses_accessed": len(activity["courses_accessed"])
-        })
-    
-    return weekly_activity
+    ).group_by(day).order_by(day).all()
+    
+    return [
+        {
+            "date": day if isinstance(day, str) else day.isoformat(),
+            "minutes": int(minutes),
+            "courses_accessed": courses_accessed
+        }
+        for day, minutes, courses_accessed in rows
+    ]
 
 
 def get_category_progress(db: Session, user_id: int) -> List[Dict[str, Any]]:
@@ -208,6 +202,8 @@ def get_category_progress(db: Session, user_id: int) -> List[Dict[str, Any]]:
         )
     ).all()
     
+    progress = progress_by_enrollment(db, [enrollment.id for enrollment, course in enrollments])
+    
     # Group by category
     category_stats = {}
     for enrollment, course in enrollments:
@@ -224,7 +220,7 @@ def get_category_progress(db: Session, user_id: int) -> List[Dict[str, Any]]:
         if enrollment.status == "completed":
             category_stats[category]["courses_completed"] += 1
         
-        category_stats[category]["total_progress"] += enrollment.progress
+        category_stats[category]["total_progress"] += progress.get(enrollment.id, 0.0)
     
     # Calculate percentages
     category_progress = []
@@ -280,7 +276,7 @@ def get_learning_goals(db: Session, user_id: int, enrollments: List[Enrollment])
     goals = []
     
     # Active courses goal
-    active_courses = len([e for e in enrollments if e.status == "active"])
+    completed_courses = len([e for e in enrollments if e.status == "completed"])
     goals.append({
         "id": 1,
         "title": "Complete Active Courses",
@@ -291,9 +287,7 @@ def get_learning_goals(db: Session, user_id: int, enrollments: List[Enrollment])
     })
     
     # Learning time goal
-    total_time = sum(session.duration_minutes or 0 for session in db.query(LearningSession).filter(
-        LearningSession.user_id == user_id
-    ).all())
+    total_time = _learning_minutes(db, user_id)
     
     goals.append({
         "id": 2,
@@ -334,15 +328,7 @@ async def get_progress_summary(
     
     # Get this week's learning time
     week_start = datetime.utcnow() - timedelta(days=7)
-    weekly_sessions = db.query(LearningSession).filter(
-        and_(
-            LearningSession.user_id == current_user.id,
-            LearningSession.started_at >= week_start,
-            LearningSession.ended_at.isnot(None)
-        )
-    ).all()
-    
-    weekly_learning_time = sum(session.duration_minutes or 0 for session in weekly_sessions)
+    weekly_learning_time = _learning_minutes(db, current_user.id, week_start)
     
     return {
         "total_courses": total_courses,
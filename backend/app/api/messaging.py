@@ -1,7 +1,7 @@
 """
 Messaging and Q&A API endpoints.
 """
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
 from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session, joinedload
 from sqlalchemy import and_, or_, desc, asc, func
@@ -10,8 +10,10 @@ from datetime import datetime, timedelta
 import asyncio
 import json
 
+from ..core.config import settings
 from ..core.database import get_db
 from ..core.auth import get_current_user
+from ..core.pagination import paginate, set_next_cursor
 from ..models.user import User
 from ..models.messaging import Message, QAPost, QAVote, Notification, MessageThread
 from ..schemas.auth import UserResponse
@@ -24,13 +26,15 @@ from ..schemas.messaging import (
     MessagingSummary, QASummary,
     BulkMessageAction, BulkQAAction
 )
+from ..services.messaging_hydration import hydrate_messages, hydrate_qa_posts, hydrate_notifications
+from ..services.qa_counters import apply_vote_change, adjust_reply_count
+from ..services.notification_broker import notification_broker
+from ..services.notification_dispatch import create_notifications
+from ..services import message_search
 
 router = APIRouter(tags=["Messaging & Q&A"])
 
 
-# Global dictionary to store active SSE connections
-active_connections: dict = {}
-
 # Helper function to create notifications
 def create_notification(
     db: Session,
@@ -44,92 +48,17 @@ def create_notification(
     send_email: bool = True
 ) -> Notification:
     """Create a new notification and send real-time update."""
-    notification = Notification(
-        user_id=user_id,
+    return create_notifications(
+        db,
+        [user_id],
         title=title,
         content=content,
         notification_type=notification_type,
         related_entity_type=related_entity_type,
         related_entity_id=related_entity_id,
-        course_id=course_id
-    )
-    
-    db.add(notification)
-    db.commit()
-    db.refresh(notification)
-    
-    # Send real-time notification if user is connected
-    if user_id in active_connections:
-        try:
-            notification_data = {
-                "id": notification.id,
-                "title": notification.title,
-                "content": notification.content,
-                "notification_type": notification.notification_type,
-                "is_read": notification.is_read,
-                "created_at": notification.created_at.isoformat(),
-                "course_id": notification.course_id
-            }
-            active_connections[user_id].put_nowait(notification_data)
-        except:
-            # Remove disconnected client
-            active_connections.pop(user_id, None)
-    
-    # Send email notification if enabled and user preferences allow
-    if send_email:
-        try:
-            from ..core.email import email_service
-            from ..models.course import Course
-            
-            # Get user and check preferences
-            user = db.query(User).filter(User.id == user_id).first()
-            if user and user.email and user.email_notifications:
-                # Check specific notification type preference
-                preferences = user.notification_preferences or {}
-                notification_key = notification_type.replace("_", "_")
-                
-                # Map notification types to preference keys
-                type_mapping = {
-                    "message": "messages",
-                    "qa_reply": "qa_replies", 
-                    "course_update": "course_updates",
-                    "test_result": "test_results",
-                    "system": "system"
-                }
-                
-                pref_key = type_mapping.get(notification_type, "system")
-                if not preferences.get(pref_key, True):  # Default to True if not set
-                    return notification
-                
-                # Get course title if applicable
-                course_title = None
-                if course_id:
-                    course = db.query(Course).filter(Course.id == course_id).first()
-                    if course:
-                        course_title = course.title
-                
-                # Create action URL based on notification type
-                action_url = None
-                if notification_type == "message":
-                    action_url = f"http://localhost:3000/messaging"
-                elif notification_type == "qa_reply":
-                    action_url = f"http://localhost:3000/courses/{course_id}/qa" if course_id else "http://localhost:3000/qa"
-                elif notification_type == "course_update":
-                    action_url = f"http://localhost:3000/courses/{course_id}" if course_id else "http://localhost:3000/courses"
-                
-                # Send email notification
-                email_service.send_notification_email(
-                    to_email=user.email,
-                    notification_type=notification_type,
-                    title=title,
-                    content=content,
-                    course_title=course_title,
-                    action_url=action_url
-                )
-        except Exception as e:
-            print(f"Failed to send email notification: {str(e)}")
-    
-    return notification
+        course_id=course_id,
+        send_email=send_email
+    )[0]
 
 # Helper function to get relevant recipients
 def get_relevant_recipients(current_user: User, course_id: Optional[int], db: Session) -> List[User]:
@@ -163,7 +92,9 @@ async def options_notifications_stream():
 
 @router.get("/notifications/stream")
 async def stream_notifications(
+    request: Request,
     token: str = Query(..., description="JWT token for authentication"),
+    last_event_id: Optional[int] = Query(None, description="Replay notifications after this id"),
     db: Session = Depends(get_db)
 ):
     """Stream real-time notifications using Server-Sent Events."""
@@ -180,28 +111,47 @@ async def stream_notifications(
     except Exception as e:
         raise HTTPException(status_code=401, detail="Invalid token")
     
+    # Browsers resend the last seen id in this header when EventSource reconnects
+    header_event_id = request.headers.get("last-event-id")
+    if header_event_id and header_event_id.isdigit():
+        last_event_id = int(header_event_id)
+    
     async def event_generator():
-        # Create a queue for this user
-        queue = asyncio.Queue()
-        active_connections[current_user.id] = queue
+        # Several tabs or devices can be connected for the same user
+        subscription = await notification_broker.subscribe(current_user.id)
+        last_sent_id = last_event_id or 0
         
         try:
             # Send initial connection confirmation
             yield f"data: {json.dumps({'type': 'connected', 'message': 'Real-time notifications enabled'})}\n\n"
             
+            # Catch up on notifications missed while disconnected
+            if last_event_id is not None:
+                for event_id, notification in await notification_broker.replay(current_user.id, last_event_id):
+                    yield f"id: {event_id}\ndata: {json.dumps(notification)}\n\n"
+                    last_sent_id = event_id
+            
             # Keep connection alive and send notifications
-            while True:
+            while not subscription.overflowed:
                 try:
                     # Wait for notification with timeout
-                    notification = await asyncio.wait_for(queue.get(), timeout=30.0)
-                    yield f"data: {json.dumps(notification)}\n\n"
+                    event_id, notification = await asyncio.wait_for(
+                        subscription.queue.get(), timeout=settings.sse_heartbeat_seconds
+                    )
                 except asyncio.TimeoutError:
                     # Send heartbeat to keep connection alive
                     yield f"data: {json.dumps({'type': 'heartbeat', 'timestamp': datetime.now().isoformat()})}\n\n"
-        except asyncio.CancelledError:
-            # Clean up when client disconnects
-            active_connections.pop(current_user.id, None)
-            raise
+                    continue
+                
+                # Skip events already sent during replay
+                if event_id <= last_sent_id:
+                    continue
+                yield f"id: {event_id}\ndata: {json.dumps(notification)}\n\n"
+                last_sent_id = event_id
+            
+            # Too slow to keep up: close so the client reconnects and replays from its last id
+        finally:
+            notification_broker.unsubscribe(subscription)
     
     return StreamingResponse(
         event_generator(),
@@ -299,13 +249,19 @@ async def get_messages(
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=100),
     search: Optional[str] = Query(None),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor value from the previous page"),
     course_id: Optional[int] = Query(None),
     is_read: Optional[bool] = Query(None),
     is_archived: Optional[bool] = Query(False),
+    response: Response = None,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Get messages for current user."""
+    """Get messages for current user, newest first.
+    
+    Further pages are fetched by passing the ``X-Next-Cursor`` response header
+    as ``cursor``. With ``search``, results are ranked by relevance and highlighted.
+    """
     query = db.query(Message).filter(
         or_(
             Message.sender_id == current_user.id,
@@ -313,14 +269,6 @@ async def get_messages(
         )
     )
     
-    if search:
-        query = query.filter(
-            or_(
-                Message.subject.ilike(f"%{search}%"),
-                Message.content.ilike(f"%{search}%")
-            )
-        )
-    
     if course_id:
         query = query.filter(Message.course_id == course_id)
     
@@ -330,9 +278,13 @@ async def get_messages(
     if is_archived is not None:
         query = query.filter(Message.is_archived == is_archived)
     
-    messages = query.order_by(desc(Message.created_at)).offset(skip).limit(limit).all()
+    if search:
+        page = _search_page(db, query, Message, search, limit, cursor, response)
+        return hydrate_messages(page.items, db, hits=page.hits)
+    
+    page = paginate(query, (Message.created_at, Message.id), limit, cursor, skip, response)
     
-    return [_format_message_response(msg, db) for msg in messages]
+    return hydrate_messages(page.items, db)
 
 
 @router.get("/messages/{message_id}", response_model=MessageResponse)
@@ -467,6 +419,7 @@ async def create_qa_post(
     )
     
     db.add(post)
+    adjust_reply_count(db, post.parent_post_id, 1)
     db.commit()
     db.refresh(post)
     
@@ -484,12 +437,20 @@ async def get_qa_posts(
     tags: Optional[str] = Query(None),
     is_resolved: Optional[bool] = Query(None),
     is_pinned: Optional[bool] = Query(None),
+    sort: str = Query("recent", pattern="^(recent|top)$"),
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor value from the previous page"),
+    response: Response = None,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Get Q&A posts."""
+    """Get Q&A posts.
+    
+    Further pages are fetched by passing the ``X-Next-Cursor`` response header
+    as ``cursor``. With ``search``, results are ranked by relevance (ignoring
+    ``sort``) and highlighted.
+    """
     query = db.query(QAPost).filter(QAPost.parent_post_id.is_(None))  # Only top-level posts
     
     if course_id:
@@ -498,14 +459,6 @@ async def get_qa_posts(
     if post_type:
         query = query.filter(QAPost.post_type == post_type)
     
-    if search:
-        query = query.filter(
-            or_(
-                QAPost.title.ilike(f"%{search}%"),
-                QAPost.content.ilike(f"%{search}%")
-            )
-        )
-    
     if tags:
         tag_list = [tag.strip() for tag in tags.split(",")]
         query = query.filter(QAPost.tags.contains(tag_list))
@@ -516,9 +469,19 @@ async def get_qa_posts(
     if is_pinned is not None:
         query = query.filter(QAPost.is_pinned == is_pinned)
     
-    posts = query.order_by(desc(QAPost.is_pinned), desc(QAPost.created_at)).offset(skip).limit(limit).all()
+    if search:
+        page = _search_page(db, query, QAPost, search, limit, cursor, response)
+        return hydrate_qa_posts(page.items, current_user.id, db, hits=page.hits)
+    
+    if sort == "top":
+        # Served from the (course_id, parent_post_id, vote_score, created_at, id) index
+        order = (QAPost.vote_score, QAPost.created_at, QAPost.id)
+    else:
+        order = (QAPost.is_pinned, QAPost.created_at, QAPost.id)
+    
+    page = paginate(query, order, limit, cursor, skip, response)
     
-    return [_format_qa_post_response(post, current_user.id, db) for post in posts]
+    return hydrate_qa_posts(page.items, current_user.id, db)
 
 
 @router.get("/qa/posts/{post_id}", response_model=QAPostResponse)
@@ -595,6 +558,7 @@ async def delete_qa_post(
             detail="Access denied"
         )
     
+    adjust_reply_count(db, post.parent_post_id, -1)
     db.delete(post)
     db.commit()
     
@@ -625,6 +589,7 @@ async def create_vote(
     
     if existing_vote:
         # Update existing vote
+        apply_vote_change(db, post.id, existing_vote.vote_type, vote_data.vote_type)
         existing_vote.vote_type = vote_data.vote_type
         db.commit()
         db.refresh(existing_vote)
@@ -637,6 +602,7 @@ async def create_vote(
             vote_type=vote_data.vote_type
         )
         db.add(vote)
+        apply_vote_change(db, post.id, None, vote_data.vote_type)
         db.commit()
         db.refresh(vote)
         return vote
@@ -660,6 +626,7 @@ async def delete_vote(
             detail="Vote not found"
         )
     
+    apply_vote_change(db, post_id, vote.vote_type, None)
     db.delete(vote)
     db.commit()
     
@@ -672,18 +639,20 @@ async def get_notifications(
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=100),
     is_read: Optional[bool] = Query(None),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor value from the previous page"),
+    response: Response = None,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Get notifications for current user."""
+    """Get notifications for current user, newest first."""
     query = db.query(Notification).filter(Notification.user_id == current_user.id)
     
     if is_read is not None:
         query = query.filter(Notification.is_read == is_read)
     
-    notifications = query.order_by(desc(Notification.created_at)).offset(skip).limit(limit).all()
+    page = paginate(query, (Notification.created_at, Notification.id), limit, cursor, skip, response)
     
-    return [_format_notification_response(notif, db) for notif in notifications]
+    return hydrate_notifications(page.items, db)
 
 
 @router.put("/notifications/{notification_id}", response_model=NotificationResponse)
@@ -824,8 +793,8 @@ async def get_messaging_summary(
     return MessagingSummary(
         unread_messages=unread_messages,
         unread_notifications=unread_notifications,
-        recent_messages=[_format_message_response(msg, db) for msg in recent_messages],
-        recent_notifications=[_format_notification_response(notif, db) for notif in recent_notifications]
+        recent_messages=hydrate_messages(recent_messages, db),
+        recent_notifications=hydrate_notifications(recent_notifications, db)
     )
 
 
@@ -867,126 +836,39 @@ async def get_qa_summary(
     return QASummary(
         total_questions=total_questions,
         unanswered_questions=unanswered_questions,
-        recent_posts=[_format_qa_post_response(post, current_user.id, db) for post in recent_posts],
+        recent_posts=hydrate_qa_posts(recent_posts, current_user.id, db),
         popular_tags=popular_tags
     )
 
 
 # Helper functions
+def _search_page(db: Session, query, model, terms: str, limit: int,
+                 cursor: Optional[str], response: Optional[Response]) -> message_search.SearchPage:
+    """Run a ranked search and expose the next page's cursor as a response header."""
+    try:
+        page = message_search.search(db, query, model, terms, limit, cursor)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+    set_next_cursor(response, page.next_cursor)
+    return page
+
+
 def _format_message_response(message: Message, db: Session) -> MessageResponse:
     """Format message for response with related data."""
-    # Get sender and recipient names
-    sender = db.query(User).filter(User.id == message.sender_id).first()
-    recipient = db.query(User).filter(User.id == message.recipient_id).first()
-    
-    # Get course title if applicable
-    course_title = None
-    if message.course_id:
-        from ..models.course import Course
-        course = db.query(Course).filter(Course.id == message.course_id).first()
-        course_title = course.title if course else None
-    
-    # Count replies
-    reply_count = db.query(Message).filter(Message.parent_message_id == message.id).count()
-    
-    return MessageResponse(
-        id=message.id,
-        sender_id=message.sender_id,
-        recipient_id=message.recipient_id,
-        subject=message.subject,
-        content=message.content,
-        message_type=message.message_type,
-        course_id=message.course_id,
-        parent_message_id=message.parent_message_id,
-        is_read=message.is_read,
-        is_archived=message.is_archived,
-        attachments=message.attachments,
-        created_at=message.created_at,
-        updated_at=message.updated_at,
-        sender_name=f"{sender.email}" if sender else None,
-        recipient_name=f"{recipient.email}" if recipient else None,
-        course_title=course_title,
-        reply_count=reply_count
-    )
+    return hydrate_messages([message], db)[0]
 
 
 def _format_qa_post_response(post: QAPost, user_id: int, db: Session) -> QAPostResponse:
     """Format Q&A post for response with related data."""
-    # Get author name
-    author = db.query(User).filter(User.id == post.author_id).first()
-    
-    # Get course title
-    from ..models.course import Course
-    course = db.query(Course).filter(Course.id == post.course_id).first()
-    
-    # Count replies
-    reply_count = db.query(QAPost).filter(QAPost.parent_post_id == post.id).count()
-    
-    # Calculate vote score
-    upvotes = db.query(QAVote).filter(
-        QAVote.post_id == post.id,
-        QAVote.vote_type == "up"
-    ).count()
-    downvotes = db.query(QAVote).filter(
-        QAVote.post_id == post.id,
-        QAVote.vote_type == "down"
-    ).count()
-    vote_score = upvotes - downvotes
-    
-    # Get user's vote
-    user_vote = db.query(QAVote).filter(
-        QAVote.post_id == post.id,
-        QAVote.user_id == user_id
-    ).first()
-    
-    return QAPostResponse(
-        id=post.id,
-        course_id=post.course_id,
-        author_id=post.author_id,
-        title=post.title,
-        content=post.content,
-        post_type=post.post_type,
-        parent_post_id=post.parent_post_id,
-        is_pinned=post.is_pinned,
-        is_resolved=post.is_resolved,
-        is_archived=post.is_archived,
-        tags=post.tags,
-        attachments=post.attachments,
-        view_count=post.view_count,
-        created_at=post.created_at,
-        updated_at=post.updated_at,
-        author_name=f"{author.email}" if author else None,
-        course_title=course.title if course else None,
-        reply_count=reply_count,
-        vote_score=vote_score,
-        user_vote=user_vote.vote_type if user_vote else None
-    )
+    return hydrate_qa_posts([post], user_id, db)[0]
 
 
 def _format_notification_response(notification: Notification, db: Session) -> NotificationResponse:
     """Format notification for response with related data."""
-    # Get course title if applicable
-    course_title = None
-    if notification.course_id:
-        from ..models.course import Course
-        course = db.query(Course).filter(Course.id == notification.course_id).first()
-        course_title = course.title if course else None
-    
-    return NotificationResponse(
-        id=notification.id,
-        user_id=notification.user_id,
-        title=notification.title,
-        content=notification.content,
-        notification_type=notification.notification_type,
-        related_entity_type=notification.related_entity_type,
-        related_entity_id=notification.related_entity_id,
-        course_id=notification.course_id,
-        is_read=notification.is_read,
-        is_archived=notification.is_archived,
-        created_at=notification.created_at,
-        read_at=notification.read_at,
-        course_title=course_title
-    )
+    return hydrate_notifications([notification], db)[0]
 
 
 def _create_qa_notifications(post: QAPost, db: Session):
@@ -995,27 +877,28 @@ def _create_qa_notifications(post: QAPost, db: Session):
     from ..models.course import Course
     
     # Get course participants
-    enrollments = db.query(Enrollment).filter(
+    enrollments = db.query(Enrollment.user_id).filter(
         Enrollment.course_id == post.course_id,
         Enrollment.status == "active"
     ).all()
     
     # Get course instructors
-    course = db.query(Course).filter(Course.id == post.course_id).first()
-    instructor_ids = [course.instructor_id] if course else []
+    instructor_ids = [
+        instructor_id for (instructor_id,) in
+        db.query(Course.instructor_id).filter(Course.id == post.course_id).all()
+    ]
     
     # Create notifications for all participants
     all_user_ids = set([e.user_id for e in enrollments] + instructor_ids)
     all_user_ids.discard(post.author_id)  # Don't notify the author
     
-    for user_id in all_user_ids:
-        create_notification(
-            db=db,
-            user_id=user_id,
-            title=f"New {post.post_type} in course discussion",
-            content=f"{post.title[:50]}..." if len(post.title) > 50 else post.title,
-            notification_type="qa_reply",
-            related_entity_type="qa_post",
-            related_entity_id=post.id,
-            course_id=post.course_id
-        )
+    create_notifications(
+        db,
+        sorted(all_user_ids),
+        title=f"New {post.post_type} in course discussion",
+        content=f"{post.title[:50]}..." if len(post.title) > 50 else post.title,
+        notification_type="qa_reply",
+        related_entity_type="qa_post",
+        related_entity_id=post.id,
+        course_id=post.course_id
+    )
@@ -12,6 +12,8 @@ from ..core.database import get_db
 from ..api.auth import get_current_user
 from ..models.course import Course
 from ..models.learning import Enrollment
+from ..services.analytics_cache import analytics_cache
+from ..services.enrollment_progress import progress_by_enrollment
 from ..models.user import User
 from ..schemas.learning import StudentCourseResponse
 
@@ -93,7 +95,7 @@ async def get_available_courses(
             ).first()
             
             status = "completed" if enrollment.status == "completed" else "active"
-            progress = enrollment.progress if enrollment else 0.0
+            progress = progress_by_enrollment(db, [enrollment.id]).get(enrollment.id, 0.0) if enrollment else 0.0
             enrolled_at = enrollment.enrolled_at if enrollment else datetime.utcnow()
             last_accessed = enrollment.updated_at if enrollment else datetime.utcnow()
         else:
@@ -181,6 +183,7 @@ async def enroll_in_course(
     )
     
     db.add(enrollment)
+    analytics_cache.invalidate_on_commit(db)
     db.commit()
     
     return {"message": "Successfully enrolled in course", "course_id": course_id}
@@ -13,6 +13,10 @@ from ..api.auth import get_current_user
 from ..models.course import Course, CourseFileContent
 from ..models.learning import Enrollment, LearningSession, Assessment, AssessmentAttempt
 from ..models.user import User
+from ..services.analytics_cache import analytics_cache
+from ..services.enrollment_progress import (
+    load_student_progress, record_session_started, record_session_ended, find_enrollment_id
+)
 from ..schemas.learning import (
     StudentCourseResponse,
     LearningSessionCreate,
@@ -37,58 +41,22 @@ async def get_my_courses(
             detail="Access denied. Student role required."
         )
     
-    # Get enrolled courses
-    enrollments = db.query(Enrollment).filter(
-        and_(
-            Enrollment.user_id == current_user.id,
-            Enrollment.status == "active"
+    # Enrollments, courses and progress figures in one query
+    return [
+        StudentCourseResponse(
+            id=progress.course.id,
+            title=progress.course.title,
+            description=progress.course.description,
+            category=progress.course.category,
+            duration_hours=progress.course.duration_hours,
+            difficulty_level=progress.course.difficulty_level,
+            progress_percentage=round(progress.progress_percentage, 2),
+            enrolled_at=progress.enrollment.created_at,
+            last_accessed=progress.last_accessed,
+            status="active" if progress.progress_percentage < 100 else "completed"
         )
-    ).all()
-    
-    courses = []
-    for enrollment in enrollments:
-        course = db.query(Course).filter(Course.id == enrollment.course_id).first()
-        if course:
-            # Calculate progress
-            total_content = db.query(CourseFileContent).filter(
-                CourseFileContent.course_id == course.id,
-                CourseFileContent.is_active == True
-            ).count()
-            
-            completed_sessions = db.query(LearningSession).filter(
-                and_(
-                    LearningSession.user_id == current_user.id,
-                    LearningSession.course_id == course.id,
-                    LearningSession.ended_at.isnot(None)
-                )
-            ).count()
-            
-            progress_percentage = (completed_sessions / total_content * 100) if total_content > 0 else 0
-            
-            # Get last accessed time
-            last_session = db.query(LearningSession).filter(
-                and_(
-                    LearningSession.user_id == current_user.id,
-                    LearningSession.course_id == course.id
-                )
-            ).order_by(desc(LearningSession.started_at)).first()
-            
-            last_accessed = last_session.started_at if last_session else enrollment.created_at
-            
-            courses.append(StudentCourseResponse(
-                id=course.id,
-                title=course.title,
-                description=course.description,
-                category=course.category,
-                duration_hours=course.duration_hours,
-                difficulty_level=course.difficulty_level,
-                progress_percentage=round(progress_percentage, 2),
-                enrolled_at=enrollment.created_at,
-                last_accessed=last_accessed,
-                status="active" if progress_percentage < 100 else "completed"
-            ))
-    
-    return courses
+        for progress in load_student_progress(db, current_user.id)
+    ]
 
 
 @router.get("/courses/{course_id}/content", response_model=List[ContentResponse])
@@ -264,11 +232,14 @@ async def start_learning_session(
     session = LearningSession(
         user_id=current_user.id,
         course_id=content.course_id,
+        enrollment_id=enrollment.id,
         duration_minutes=0,  # Will be updated when session ends
         started_at=datetime.utcnow()
     )
     
     db.add(session)
+    record_session_started(db, enrollment.id, session.started_at)
+    analytics_cache.invalidate_on_commit(db)
     db.commit()
     db.refresh(session)
     
@@ -321,6 +292,9 @@ async def end_learning_session(
         session.session_data = {}
     session.session_data["progress_percentage"] = session_data.get("progress_percentage", 100)
     
+    enrollment_id = session.enrollment_id or find_enrollment_id(db, session.user_id, session.course_id)
+    record_session_ended(db, enrollment_id, session.duration_minutes, session.ended_at)
+    analytics_cache.invalidate_on_commit(db)
     db.commit()
     db.refresh(session)
     
@@ -442,47 +416,12 @@ async def get_learning_progress(
             detail="Access denied. Student role required."
         )
     
-    # Get enrolled courses
-    enrollments = db.query(Enrollment).filter(
-        and_(
-            Enrollment.user_id == current_user.id,
-            Enrollment.status == "active"
-        )
-    ).all()
-    
-    total_courses = len(enrollments)
-    completed_courses = 0
-    total_learning_time = 0
+    # Progress rows are kept current by session events, so this is one query
+    courses = load_student_progress(db, current_user.id)
     
-    for enrollment in enrollments:
-        # Check if course is completed
-        total_content = db.query(CourseFileContent).filter(
-            CourseFileContent.course_id == enrollment.course_id,
-            CourseFileContent.is_active == True
-        ).count()
-        
-        completed_sessions = db.query(LearningSession).filter(
-            and_(
-                LearningSession.user_id == current_user.id,
-                LearningSession.course_id == enrollment.course_id,
-                LearningSession.ended_at.isnot(None)
-            )
-        ).count()
-        
-        if completed_sessions >= total_content and total_content > 0:
-            completed_courses += 1
-        
-        # Calculate total learning time
-        course_sessions = db.query(LearningSession).filter(
-            and_(
-                LearningSession.user_id == current_user.id,
-                LearningSession.course_id == enrollment.course_id,
-                LearningSession.ended_at.isnot(None)
-            )
-        ).all()
-        
-        for session in course_sessions:
-            total_learning_time += session.duration_minutes or 0
+    total_courses = len(courses)
+    completed_courses = sum(1 for course in courses if course.progress_percentage >= 100)
+    total_learning_time = sum(course.progress.learning_minutes for course in courses if course.progress)
     
     overall_progress = (completed_courses / total_courses * 100) if total_courses > 0 else 0
     
@@ -11,6 +11,7 @@ from ..core.database import get_db
 from ..core.auth import get_current_user
 from ..models.learning import LearningTimeTracking, Enrollment
 from ..models.user import User
+from ..services.enrollment_progress import record_session_started, record_time_tracked, find_enrollment_id
 from ..schemas.time_tracking import (
     TimeTrackingStart,
     TimeTrackingUpdate,
@@ -61,6 +62,7 @@ async def start_time_tracking(
     )
     
     db.add(time_tracking)
+    record_session_started(db, enrollment.id, time_tracking.started_at)
     db.commit()
     db.refresh(time_tracking)
     
@@ -155,6 +157,10 @@ async def end_time_tracking(
     if data.tracking_metadata is not None:
         time_tracking.tracking_metadata = data.tracking_metadata
     
+    record_time_tracked(
+        db, find_enrollment_id(db, current_user.id, time_tracking.course_id),
+        time_tracking.time_spent_seconds, time_tracking.ended_at
+    )
     db.commit()
     db.refresh(time_tracking)
     
@@ -21,6 +21,12 @@ class Settings(BaseSettings):
     # Redis
     redis_url: str = "redis://localhost:6379"
     
+    # Real-time notifications (SSE)
+    sse_broker: str = "auto"  # auto (Redis when reachable), redis or memory
+    sse_replay_buffer_size: int = 100
+    sse_queue_size: int = 256
+    sse_heartbeat_seconds: int = 30
+    
     # Security
     secret_key: str = "your-secret-key-change-in-production"  # MUST be changed in production
     algorithm: str = "HS256"
@@ -57,11 +63,40 @@ class Settings(BaseSettings):
     ai_max_tokens: int = 2000
     ai_temperature: float = 0.7
     ai_embedding_model: str = "all-MiniLM-L6-v2"
+    ai_embedding_batch_size: int = 64
+    # Hashing embedder used by the lightweight RAG service (changing these requires re-embedding)
+    ai_hashing_ngram_max: int = 2
+    ai_hashing_idf: bool = True
+    ai_chunk_max_tokens: int = 256  # capped at the embedding model's sequence length
+    ai_chunk_overlap_tokens: int = 32
     
     # Vector Store Configuration
     vector_store_path: str = "data/vector_store"
     vector_dimension: int = 384
-    vector_index_type: str = "faiss"
+    vector_index_type: str = "faiss"  # faiss/flat (exact), hnsw or ivfpq
+    vector_hnsw_m: int = 32
+    vector_hnsw_ef_construction: int = 80
+    vector_hnsw_ef_search: int = 64
+    vector_ivf_nlist: int = 256
+    vector_ivf_nprobe: int = 16
+    vector_pq_m: int = 48  # must divide vector_dimension
+    vector_pq_bits: int = 8
+    vector_ann_min_vectors: int = 10000
+    
+    # RAG Search Caching
+    rag_query_cache_size: int = 1024
+    rag_result_cache_size: int = 512
+    rag_cache_ttl_seconds: int = 600
+    vector_store_compact_segments: int = 16
+    
+    # PDF Text Extraction
+    pdf_text_cache_path: str = "data/pdf_text_cache"
+    pdf_text_cache_size: int = 64
+    pdf_text_cache_ttl_seconds: int = 3600
+    # Extraction processes forked by each web worker; 1 extracts in process, without a pool
+    pdf_extract_workers: int = 1
+    pdf_parallel_min_pages: int = 40
+    pdf_pages_per_task: int = 8
     
     # Content Generation Settings
     default_question_count: int = 10
@@ -84,6 +119,27 @@ class Settings(BaseSettings):
     smtp_username: Optional[str] = None
     smtp_password: Optional[str] = None
     
+    # Outbound email queue (notifications are sent by a background worker)
+    email_queue_enabled: bool = True
+    email_batch_size: int = 50
+    email_poll_interval_seconds: int = 5
+    email_digest_window_seconds: int = 60  # Notifications for one user within this window go out as a digest
+    email_max_attempts: int = 5
+    email_retry_base_seconds: int = 30
+    email_smtp_idle_seconds: int = 60
+
+    # Daily analytics rollups (reports read these plus a live tail since the last rolled-up day)
+    analytics_rollup_enabled: bool = True
+    analytics_rollup_interval_seconds: int = 3600
+    analytics_rollup_lookback_days: int = 2  # Re-roll recent days to pick up late updates, e.g. sessions ended later
+
+    # Admin analytics response cache (Redis when reachable, otherwise in process)
+    analytics_cache_enabled: bool = True
+    analytics_cache_backend: str = "auto"  # auto, redis or memory
+    analytics_cache_size: int = 256
+    analytics_cache_ttl_seconds: int = 300
+    analytics_cache_stale_seconds: int = 1800  # Expired entries are served this long while refreshed in the background
+
     # Payment Processing
     stripe_secret_key: Optional[str] = None
     stripe_webhook_secret: Optional[str] = None
@@ -3,9 +3,11 @@ Email notification system.
 """
 import smtplib
 import ssl
+import time
+import threading
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from typing import Optional, List
+from typing import Optional, List, Dict, Any
 import os
 from ..core.config import settings
 
@@ -15,8 +17,19 @@ class EmailService:
         self.smtp_port = int(os.getenv("SMTP_PORT", "587"))
         self.smtp_username = os.getenv("SMTP_USERNAME", "")
         self.smtp_password = os.getenv("SMTP_PASSWORD", "")
+        # Disable for a local relay or SMTP stub that speaks plain SMTP without auth
+        self.smtp_use_tls = os.getenv("SMTP_USE_TLS", "true").lower() == "true"
         self.from_email = os.getenv("FROM_EMAIL", "noreply@operatorskillshub.com")
         self.from_name = os.getenv("FROM_NAME", "Operator Skills Hub")
+        # One SMTP connection is kept open and reused between sends
+        self._connection: Optional[smtplib.SMTP] = None
+        self._connection_used_at = 0.0
+        self._lock = threading.Lock()
+    
+    @property
+    def is_configured(self) -> bool:
+        """Whether there is an SMTP server we can send through."""
+        return bool(self.smtp_username and self.smtp_password) or not self.smtp_use_tls
     
     def send_email(
         self,
@@ -26,33 +39,12 @@ class EmailService:
         text_content: Optional[str] = None
     ) -> bool:
         """Send an email notification."""
-        if not self.smtp_username or not self.smtp_password:
+        if not self.is_configured:
             print("Email configuration not set, skipping email notification")
             return False
         
         try:
-            # Create message
-            message = MIMEMultipart("alternative")
-            message["Subject"] = subject
-            message["From"] = f"{self.from_name} <{self.from_email}>"
-            message["To"] = to_email
-            
-            # Add text content
-            if text_content:
-                text_part = MIMEText(text_content, "plain")
-                message.attach(text_part)
-            
-            # Add HTML content
-            html_part = MIMEText(html_content, "html")
-            message.attach(html_part)
-            
-            # Create secure connection and send email
-            context = ssl.create_default_context()
-            with smtplib.SMTP(self.smtp_server, self.smtp_port) as server:
-                server.starttls(context=context)
-                server.login(self.smtp_username, self.smtp_password)
-                server.sendmail(self.from_email, to_email, message.as_string())
-            
+            self.deliver(to_email, subject, html_content, text_content)
             print(f"Email sent successfully to {to_email}")
             return True
             
@@ -60,6 +52,72 @@ class EmailService:
             print(f"Failed to send email to {to_email}: {str(e)}")
             return False
     
+    def deliver(
+        self,
+        to_email: str,
+        subject: str,
+        html_content: str,
+        text_content: Optional[str] = None
+    ) -> None:
+        """Send an email over the pooled connection, raising on failure."""
+        # Create message
+        message = MIMEMultipart("alternative")
+        message["Subject"] = subject
+        message["From"] = f"{self.from_name} <{self.from_email}>"
+        message["To"] = to_email
+        
+        # Add text content
+        if text_content:
+            text_part = MIMEText(text_content, "plain")
+            message.attach(text_part)
+        
+        # Add HTML content
+        html_part = MIMEText(html_content, "html")
+        message.attach(html_part)
+        
+        with self._lock:
+            try:
+                self._get_connection().sendmail(self.from_email, to_email, message.as_string())
+            except smtplib.SMTPServerDisconnected:
+                # The server dropped an idle connection; reconnect once
+                self._close_connection()
+                self._get_connection().sendmail(self.from_email, to_email, message.as_string())
+            self._connection_used_at = time.monotonic()
+    
+    def close(self) -> None:
+        """Close the pooled SMTP connection."""
+        with self._lock:
+            self._close_connection()
+    
+    def close_if_idle(self, idle_seconds: float) -> None:
+        """Close the pooled connection after it has been unused for a while."""
+        with self._lock:
+            if self._connection is not None and time.monotonic() - self._connection_used_at > idle_seconds:
+                self._close_connection()
+    
+    def _get_connection(self) -> smtplib.SMTP:
+        """Return the open SMTP connection, connecting and logging in if needed."""
+        if self._connection is not None:
+            return self._connection
+        
+        server = smtplib.SMTP(self.smtp_server, self.smtp_port, timeout=30)
+        if self.smtp_use_tls:
+            server.starttls(context=ssl.create_default_context())
+        if self.smtp_username and self.smtp_password:
+            server.login(self.smtp_username, self.smtp_password)
+        self._connection = server
+        return server
+    
+    def _close_connection(self) -> None:
+        """Quit the current connection, ignoring errors from a dead socket."""
+        if self._connection is None:
+            return
+        try:
+            self._connection.quit()
+        except Exception:
+            pass
+        self._connection = None
+    
     def send_notification_email(
         self,
         to_email: str,
@@ -83,6 +141,76 @@ class EmailService:
         
         return self.send_email(to_email, title, html_content, text_content)
     
+    def deliver_notification_email(
+        self,
+        to_email: str,
+        notification_type: str,
+        title: str,
+        content: str,
+        course_title: Optional[str] = None,
+        action_url: Optional[str] = None
+    ) -> None:
+        """Send a formatted notification email, raising on failure."""
+        self.deliver(
+            to_email,
+            title,
+            self._create_notification_html(title, content, course_title, action_url, notification_type),
+            self._create_notification_text(title, content, course_title, action_url, notification_type)
+        )
+    
+    def deliver_digest_email(self, to_email: str, notifications: List[Dict[str, Any]]) -> None:
+        """Send several notifications for one recipient as a single digest, raising on failure."""
+        subject = f"You have {len(notifications)} new notifications"
+        
+        items_html = "".join(
+            f"""
+                    <div style="padding: 15px 0; border-bottom: 1px solid #e2e8f0;">
+                        <p style="font-size: 16px; font-weight: bold; margin: 0 0 5px;">{item['title']}</p>
+                        <p style="margin: 0;">{item['content']}</p>
+                        {f'<p style="font-size: 14px; color: #6B7280; margin: 5px 0 0;"><strong>Course:</strong> {item["course_title"]}</p>' if item.get('course_title') else ''}
+                        {f'<a href="{item["action_url"]}" style="font-size: 14px;">View Details</a>' if item.get('action_url') else ''}
+                    </div>"""
+            for item in notifications
+        )
+        html_content = f"""
+        <!DOCTYPE html>
+        <html>
+        <head>
+            <meta charset="utf-8">
+            <meta name="viewport" content="width=device-width, initial-scale=1.0">
+            <title>{subject}</title>
+        </head>
+        <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333; max-width: 600px; margin: 0 auto; padding: 20px;">
+            <div style="background: linear-gradient(135deg, #6B7280, #1E40AF); padding: 30px; text-align: center; border-radius: 10px 10px 0 0;">
+                <h1 style="color: white; margin: 0; font-size: 24px;">🔔 {subject}</h1>
+            </div>
+            
+            <div style="background: #f8fafc; padding: 30px; border-radius: 0 0 10px 10px; border: 1px solid #e2e8f0;">
+                <div style="background: white; padding: 25px; border-radius: 8px; box-shadow: 0 2px 4px rgba(0,0,0,0.1);">
+                    {items_html}
+                    
+                    <p style="font-size: 14px; color: #6B7280; text-align: center; margin-top: 30px;">
+                        This is an automated notification from Operator Skills Hub.<br>
+                        You can manage your notification preferences in your account settings.
+                    </p>
+                </div>
+            </div>
+        </body>
+        </html>
+        """
+        
+        text_content = f"{subject}\n\n"
+        for item in notifications:
+            text_content += f"- {item['title']}\n  {item['content']}\n"
+            if item.get("course_title"):
+                text_content += f"  Course: {item['course_title']}\n"
+            if item.get("action_url"):
+                text_content += f"  View Details: {item['action_url']}\n"
+        text_content += "\nThis is an automated notification from Operator Skills Hub.\n"
+        text_content += "You can manage your notification preferences in your account settings."
+        
+        self.deliver(to_email, subject, html_content, text_content)
+    
     def _create_notification_html(
         self,
         title: str,
@@ -0,0 +1,113 @@
+"""
+Keyset pagination cursors.
+"""
+import json
+import base64
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, List, NamedTuple, Optional, Sequence
+
+from fastapi import HTTPException, Response, status
+from sqlalchemy import DateTime, desc, func, literal, tuple_
+from sqlalchemy.orm import Query
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+class CursorPage(NamedTuple):
+    """One page of rows and the cursor for the page after it (None on the last page)."""
+    items: List[Any]
+    next_cursor: Optional[str]
+
+
+def encode_cursor(*values: Any) -> str:
+    """Pack the sort key of the last row on a page into an opaque cursor."""
+    values = [
+        value.isoformat() if isinstance(value, datetime) else float(value) if isinstance(value, Decimal) else value
+        for value in values
+    ]
+    payload = json.dumps(values, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> List[Any]:
+    """Unpack a cursor into its ``size`` sort key values; raises ValueError if it is malformed."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {e}")
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError("Invalid cursor")
+    return values
+
+
+def keyset_paginate(query: Query, columns: Sequence, limit: int,
+                    cursor: Optional[str] = None, skip: int = 0) -> CursorPage:
+    """Return a page of ``query`` ordered by ``columns``, all descending.
+
+    ``columns`` are mapped attributes ending in a unique one, normally
+    ``(Model.created_at, Model.id)``. With a cursor the page starts right after
+    the row it was taken from, via a row comparison that a composite index on the
+    same columns serves directly, so deep pages cost the same as the first and
+    rows inserted meanwhile cannot shift later pages. Without one, ``skip``
+    still works as a plain offset. Raises ValueError for a malformed cursor.
+    """
+    sqlite = query.session.get_bind().dialect.name == "sqlite"
+    keys = [_sort_key(column, sqlite) for column in columns]
+
+    if cursor:
+        values = decode_cursor(cursor, len(columns))
+        try:
+            values = [
+                _sort_key(literal(_parse(column, value), column.type), sqlite, column)
+                for column, value in zip(columns, values)
+            ]
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"Invalid cursor: {e}")
+        query = query.filter(tuple_(*keys) < tuple_(*values))
+    elif skip:
+        query = query.offset(skip)
+
+    rows = query.order_by(*[desc(key) for key in keys]).limit(limit + 1).all()
+    if len(rows) <= limit:
+        return CursorPage(rows, None)
+
+    rows = rows[:limit]
+    last = rows[-1]
+    return CursorPage(rows, encode_cursor(*[getattr(last, column.key) for column in columns]))
+
+
+def paginate(query: Query, columns: Sequence, limit: int, cursor: Optional[str] = None,
+             skip: int = 0, response: Optional[Response] = None) -> CursorPage:
+    """keyset_paginate for an endpoint: 400 on a bad cursor, next cursor in the X-Next-Cursor header."""
+    try:
+        page = keyset_paginate(query, columns, limit, cursor, skip)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+    set_next_cursor(response, page.next_cursor)
+    return page
+
+
+def set_next_cursor(response: Optional[Response], next_cursor: Optional[str]) -> None:
+    """Expose the next page's cursor as a response header."""
+    if next_cursor and response is not None:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+
+
+def _parse(column, value: Any) -> Any:
+    """Turn a decoded cursor value back into the column's Python type."""
+    if isinstance(column.type, DateTime) and value is not None:
+        return datetime.fromisoformat(value)
+    return value
+
+
+def _sort_key(value, sqlite: bool, column=None):
+    """Compare timestamps as numbers on SQLite, where stored and bound text formats differ."""
+    column = column if column is not None else value
+    if sqlite and isinstance(getattr(column, "type", None), DateTime):
+        return func.julianday(value)
+    return value
@@ -8,6 +8,8 @@ from contextlib import asynccontextmanager
 
 from .core.config import settings
 from .core.database import create_tables
+from .services.analytics_rollups import rollup_worker
+from .services.email_queue import email_worker
 from .api import auth, courses, users, learning, ai, course_management, user_profiles, content_management, instructor_ai, pdf_serve, student_learning, student_enrollment, assessments, learning_analytics, course_requests, web_content, image_serve, course_images, messaging, analytics, time_tracking, security, schedule, seed
 
 # Import all models to ensure they are registered with SQLAlchemy
@@ -59,9 +61,16 @@ async def lifespan(app: FastAPI):
     # Seed database if empty
     await seed_database_if_empty()
     
+    # Send queued notification emails in the background
+    email_worker.start()
+    
+    # Keep the daily analytics rollups current
+    rollup_worker.start()
+    
     yield
     # Shutdown
-    pass
+    rollup_worker.stop()
+    email_worker.stop()
 
 
 # Create FastAPI application
@@ -97,7 +106,7 @@ app.add_middleware(
         "Access-Control-Request-Method",
         "Access-Control-Request-Headers"
     ],
-    expose_headers=["X-Total-Count", "X-Page-Count"]
+    expose_headers=["X-Total-Count", "X-Page-Count", "X-Next-Cursor", "Content-Disposition"]
 )
 
 # Add trusted host middleware with enhanced security
@@ -3,7 +3,7 @@ Database models for the Operator Skills Hub application.
 """
 from .user import User, UserProfile
 from .course import Course, CourseModule, CourseContent, CourseFileContent
-from .learning import Enrollment, LearningSession, Assessment, AssessmentAttempt
+from .learning import Enrollment, LearningSession, Assessment, AssessmentAttempt, EnrollmentProgress
 from .course_request import CourseRequest
 from .ai import ContentGeneration, PredictiveScore, InstructorMetric
 
@@ -18,6 +18,7 @@ __all__ = [
     "LearningSession",
     "Assessment",
     "AssessmentAttempt",
+    "EnrollmentProgress",
     "CourseRequest",
     "ContentGeneration",
     "PredictiveScore",
@@ -1,7 +1,7 @@
 """
 AI and analytics models.
 """
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, ForeignKey, Float, JSON
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, ForeignKey, Float, JSON, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from ..core.database import Base
@@ -24,6 +24,11 @@ class ContentGeneration(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
+    # Review lists page newest first within a course
+    __table_args__ = (
+        Index("ix_content_generations_course_created", "course_id", "created_at", "id"),
+    )
+    
     # Relationships
     approver = relationship("User", foreign_keys=[approved_by])
 
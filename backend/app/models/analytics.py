@@ -1,7 +1,7 @@
 """
 Analytics and reporting models for admin dashboard.
 """
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, ForeignKey, Float, JSON, Date
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, ForeignKey, Float, JSON, Date, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from ..core.database import Base
@@ -48,8 +48,10 @@ class PlatformMetrics(Base):
     
     # Learning metrics
     total_learning_hours = Column(Float, default=0.0)
+    learning_sessions = Column(Integer, default=0)
     average_session_duration = Column(Float, default=0.0)
     assessment_attempts = Column(Integer, default=0)
+    assessments_passed = Column(Integer, default=0)
     assessment_pass_rate = Column(Float, default=0.0)
     
     # Engagement metrics
@@ -85,11 +87,13 @@ class CourseAnalytics(Base):
     total_views = Column(Integer, default=0)
     unique_viewers = Column(Integer, default=0)
     average_time_spent = Column(Float, default=0.0)
+    learning_minutes = Column(Integer, default=0)
     content_interactions = Column(Integer, default=0)
     
     # Assessment metrics
     total_assessments = Column(Integer, default=0)
     passed_assessments = Column(Integer, default=0)
+    assessment_score_total = Column(Integer, default=0)
     average_score = Column(Float, default=0.0)
     retake_rate = Column(Float, default=0.0)
     
@@ -101,6 +105,11 @@ class CourseAnalytics(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
+    # One row per course per day
+    __table_args__ = (
+        Index("ix_course_analytics_course_date", "course_id", "date", unique=True),
+    )
+    
     # Relationships
     course = relationship("Course")
 
@@ -121,9 +130,11 @@ class UserEngagementMetrics(Base):
     
     # Learning metrics
     courses_accessed = Column(Integer, default=0)
-    learning_time = Column(Float, default=0.0)
+    learning_sessions = Column(Integer, default=0)
+    learning_time = Column(Float, default=0.0)  # Minutes
     assessments_completed = Column(Integer, default=0)
     assessments_passed = Column(Integer, default=0)
+    assessment_score_total = Column(Integer, default=0)
     
     # Social metrics
     messages_sent = Column(Integer, default=0)
@@ -131,6 +142,7 @@ class UserEngagementMetrics(Base):
     qa_replies_posted = Column(Integer, default=0)
     
     # Progress metrics
+    courses_enrolled = Column(Integer, default=0)
     courses_completed = Column(Integer, default=0)
     certificates_earned = Column(Integer, default=0)
     skill_points_earned = Column(Integer, default=0)
@@ -138,10 +150,25 @@ class UserEngagementMetrics(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
+    # One row per user per day
+    __table_args__ = (
+        Index("ix_user_engagement_metrics_user_date", "user_id", "date", unique=True),
+    )
+    
     # Relationships
     user = relationship("User")
 
 
+class RollupWatermark(Base):
+    """Last day rolled up into the daily metrics tables by a rollup job."""
+    
+    __tablename__ = "rollup_watermarks"
+    
+    name = Column(String(50), primary_key=True)
+    through_date = Column(Date, nullable=True)  # Days up to and including this one are rolled up
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
 class SystemPerformanceMetrics(Base):
     """System performance and technical metrics."""
     
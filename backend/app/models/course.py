@@ -1,7 +1,7 @@
 """
 Course management models.
 """
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, ForeignKey, Float, JSON
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, ForeignKey, Float, JSON, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from ..core.database import Base
@@ -95,6 +95,11 @@ class CourseFileContent(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
+    # Document lists page newest first within a course
+    __table_args__ = (
+        Index("ix_course_content_files_course_created", "course_id", "created_at", "id"),
+    )
+    
     # Relationships
     course = relationship("Course")
     instructor = relationship("User")
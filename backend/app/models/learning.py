@@ -1,7 +1,7 @@
 """
 Learning and progress tracking models.
 """
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, ForeignKey, Float, JSON
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, ForeignKey, Float, JSON, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from ..core.database import Base
@@ -44,6 +44,12 @@ class LearningSession(Base):
     started_at = Column(DateTime(timezone=True), server_default=func.now())
     ended_at = Column(DateTime(timezone=True), nullable=True)
     
+    # Per-course progress and last access, and daily activity, for a student
+    __table_args__ = (
+        Index("ix_learning_sessions_user_course_started", "user_id", "course_id", "started_at"),
+        Index("ix_learning_sessions_user_started", "user_id", "started_at"),
+    )
+    
     # Relationships
     user = relationship("User", back_populates="learning_sessions")
     enrollment = relationship("Enrollment", back_populates="learning_sessions")
@@ -136,3 +142,19 @@ class LearningTimeTracking(Base):
     user = relationship("User", back_populates="learning_time_tracking")
     course = relationship("Course", back_populates="learning_time_tracking")
 
+
+class EnrollmentProgress(Base):
+    """Materialised progress for one enrollment, kept current by learning-session events."""
+    
+    __tablename__ = "enrollment_progress"
+    
+    enrollment_id = Column(Integer, ForeignKey("enrollments.id", ondelete="CASCADE"), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    course_id = Column(Integer, ForeignKey("courses.id"), nullable=False, index=True)
+    total_content = Column(Integer, nullable=False, default=0, server_default="0")  # Active content files in the course
+    completed_sessions = Column(Integer, nullable=False, default=0, server_default="0")
+    learning_minutes = Column(Integer, nullable=False, default=0, server_default="0")  # Ended learning sessions
+    tracked_seconds = Column(Integer, nullable=False, default=0, server_default="0")  # Ended time tracking sessions
+    progress_percentage = Column(Float, nullable=False, default=0.0, server_default="0")
+    last_accessed_at = Column(DateTime(timezone=True), nullable=True)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
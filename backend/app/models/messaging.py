@@ -1,7 +1,7 @@
 """
 Messaging and Q&A system models.
 """
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, ForeignKey, JSON
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, ForeignKey, JSON, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from ..core.database import Base
@@ -26,6 +26,12 @@ class Message(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
+    # Inbox and sent lists page newest first
+    __table_args__ = (
+        Index("ix_messages_recipient_created", "recipient_id", "created_at", "id"),
+        Index("ix_messages_sender_created", "sender_id", "created_at", "id"),
+    )
+    
     # Relationships
     sender = relationship("User", foreign_keys=[sender_id])
     recipient = relationship("User", foreign_keys=[recipient_id])
@@ -52,9 +58,20 @@ class QAPost(Base):
     tags = Column(JSON, nullable=True)  # List of tags for categorization
     attachments = Column(JSON, nullable=True)  # List of file attachments
     view_count = Column(Integer, default=0)
+    # Denormalised counters, kept in step by the Q&A endpoints (see services/qa_counters.py)
+    reply_count = Column(Integer, nullable=False, default=0, server_default="0")
+    upvote_count = Column(Integer, nullable=False, default=0, server_default="0")
+    downvote_count = Column(Integer, nullable=False, default=0, server_default="0")
+    vote_score = Column(Integer, nullable=False, default=0, server_default="0")
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
+    # "Top questions" pages sort by score within a course; "recent" pages by pinned, then newest
+    __table_args__ = (
+        Index("ix_qa_posts_course_score", "course_id", "parent_post_id", "vote_score", "created_at", "id"),
+        Index("ix_qa_posts_course_recent", "course_id", "parent_post_id", "is_pinned", "created_at", "id"),
+    )
+    
     # Relationships
     course = relationship("Course")
     author = relationship("User")
@@ -97,6 +114,11 @@ class Notification(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     read_at = Column(DateTime(timezone=True), nullable=True)
     
+    # Notification lists page newest first
+    __table_args__ = (
+        Index("ix_notifications_user_created", "user_id", "created_at", "id"),
+    )
+    
     # Relationships
     user = relationship("User")
     course = relationship("Course")
@@ -118,3 +140,29 @@ class MessageThread(Base):
     # Relationships
     course = relationship("Course")
     # Note: messages relationship will be added later to avoid circular import issues
+
+
+class OutboundEmail(Base):
+    """Queued notification email, sent by the background email worker."""
+    
+    __tablename__ = "outbound_emails"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    to_email = Column(String(255), nullable=False)
+    notification_type = Column(String(50), nullable=False)
+    title = Column(String(255), nullable=False)
+    content = Column(Text, nullable=False)
+    course_title = Column(String(255), nullable=True)
+    action_url = Column(String(500), nullable=True)
+    status = Column(String(20), nullable=False, default="pending")  # pending, sending, sent, failed
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime(timezone=True), server_default=func.now())
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    sent_at = Column(DateTime(timezone=True), nullable=True)
+    
+    # The worker polls for due rows in send order
+    __table_args__ = (
+        Index("ix_outbound_emails_status_next_attempt", "status", "next_attempt_at"),
+    )
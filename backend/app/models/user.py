@@ -1,7 +1,7 @@
 """
 User management models.
 """
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, ForeignKey, JSON
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, ForeignKey, JSON, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from ..core.database import Base
@@ -34,6 +34,11 @@ class User(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
+    # Admin user lists page newest first
+    __table_args__ = (
+        Index("ix_users_created", "created_at", "id"),
+    )
+    
     # Relationships
     profile = relationship("UserProfile", back_populates="user", uselist=False)
     enrollments = relationship("Enrollment", back_populates="user")
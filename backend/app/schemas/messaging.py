@@ -68,6 +68,10 @@ class MessageResponse(MessageBase):
     course_title: Optional[str] = None
     reply_count: int = 0
     
+    # Search results only
+    search_rank: Optional[float] = None
+    highlight: Optional[str] = None
+    
     class Config:
         from_attributes = True
 
@@ -113,6 +117,10 @@ class QAPostResponse(QAPostBase):
     vote_score: int = 0
     user_vote: Optional[VoteType] = None
     
+    # Search results only
+    search_rank: Optional[float] = None
+    highlight: Optional[str] = None
+    
     class Config:
         from_attributes = True
 
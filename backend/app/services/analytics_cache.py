@@ -0,0 +1,229 @@
+"""
+Analytics Cache
+Caches admin analytics responses with stale-while-revalidate, shared through Redis when reachable
+"""
+
+import json
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Callable, Dict, Optional, Set, Tuple
+
+import redis
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from ..core.cache import TTLCache
+from ..core.config import settings
+from ..core.database import SessionLocal
+
+KEY_PREFIX = "analytics:cache:"
+GENERATION_KEY = "analytics:cache:generation"
+
+Compute = Callable[[Session], Any]
+
+
+def cache_key(endpoint: str, params: Dict[str, Any], role: str) -> str:
+    """The cache key for one endpoint called with ``params`` by a user with ``role``"""
+    return f"{KEY_PREFIX}{endpoint}:{role}:{json.dumps(params, sort_keys=True, default=str)}"
+
+
+def _json_default(value: Any) -> Any:
+    """Encode the non-JSON values analytics responses can contain"""
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"Cannot cache {type(value).__name__}")
+
+
+class AnalyticsCache:
+    """Response cache for the analytics endpoints.
+
+    Entries are fresh for ``analytics_cache_ttl_seconds``; for a further
+    ``analytics_cache_stale_seconds`` they are still served while one
+    background refresh recomputes them. ``invalidate`` drops every entry by
+    bumping a generation counter, so writes that change the figures are seen
+    on the next request. With Redis reachable the entries and the generation
+    are shared by all workers; otherwise they live in an in-process LRU.
+    Redis calls made from the event loop run on one cache thread, in order.
+    """
+
+    def __init__(self, session_factory: Callable[[], Session] = SessionLocal):
+        self.session_factory = session_factory
+        self._memory = TTLCache(settings.analytics_cache_size, settings.analytics_cache_ttl_seconds)
+        self._generation = 0
+        self._refreshing: Set[str] = set()
+        self._lock = threading.Lock()
+        self._redis: Optional[redis.Redis] = None
+        self._backend: Optional[str] = None
+        # One thread keeps the Redis round trips off the event loop, and in order,
+        # so a read always follows the invalidations queued before it
+        self._io = ThreadPoolExecutor(max_workers=1, thread_name_prefix="analytics-cache")
+
+    @property
+    def backend(self) -> str:
+        """'redis' or 'memory', decided on first use"""
+        if self._backend is None:
+            with self._lock:
+                if self._backend is None:
+                    self._backend = self._select_backend()
+        return self._backend
+
+    def _select_backend(self) -> str:
+        """Use Redis when configured and reachable, otherwise stay in process"""
+        if settings.analytics_cache_backend == "memory" or not settings.redis_url:
+            return "memory"
+        try:
+            client = redis.from_url(settings.redis_url, socket_connect_timeout=1)
+            client.ping()
+            self._redis = client
+            return "redis"
+        except Exception as e:
+            if settings.analytics_cache_backend == "redis":
+                raise
+            print(f"Redis unavailable for the analytics cache, using in-process cache: {e}")
+            return "memory"
+
+    async def get_or_compute(self, endpoint: str, params: Dict[str, Any], role: str, compute: Compute,
+                             db: Session) -> Any:
+        """The cached response, computing it with ``db`` on a miss.
+
+        A stale entry is returned as is and refreshed in the background with a
+        session of its own, since ``db`` is closed when the request ends.
+        """
+        if not settings.analytics_cache_enabled:
+            return compute(db)
+
+        key = cache_key(endpoint, params, role)
+        try:
+            entry, generation = await self._call(self._read, key)
+        except Exception as e:
+            print(f"Analytics cache read error: {str(e)}")
+            return compute(db)
+
+        if entry is not None:
+            fresh_until, value = entry
+            if fresh_until <= time.time():
+                self._refresh_in_background(key, compute, generation)
+            return value
+
+        value = compute(db)
+        await self._call(self._store, key, value, generation)
+        return value
+
+    async def _call(self, function: Callable[..., Any], *args: Any) -> Any:
+        """Run a cache operation inline in process, or on the cache thread when it may reach Redis"""
+        if self._backend == "memory":
+            return function(*args)
+        return await asyncio.wrap_future(self._io.submit(function, *args))
+
+    def invalidate(self) -> None:
+        """Drop every cached response.
+
+        Called from the event loop (a commit in a request handler), the Redis
+        increment is queued on the cache thread instead of blocking the loop.
+        """
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            self._invalidate()
+            return
+        if self._backend == "memory":
+            self._invalidate()
+            return
+        self._io.submit(self._invalidate)
+
+    def _invalidate(self) -> None:
+        try:
+            if self.backend == "redis":
+                self._redis.incr(GENERATION_KEY)
+                return
+        except Exception as e:
+            print(f"Analytics cache invalidation error: {str(e)}")
+        with self._lock:
+            self._generation += 1
+        self._memory.clear()
+
+    def invalidate_on_commit(self, db: Session) -> None:
+        """Drop every cached response once ``db`` commits its current transaction"""
+        if db.info.get("invalidate_analytics_cache"):
+            return
+        db.info["invalidate_analytics_cache"] = True
+        event.listen(db, "after_commit", self._after_commit, once=True)
+
+    def clear(self) -> None:
+        """Forget the in-process entries and the chosen backend (for tests and reconfiguration)"""
+        with self._lock:
+            self._backend = None
+            self._redis = None
+            self._generation += 1
+        self._memory = TTLCache(settings.analytics_cache_size, settings.analytics_cache_ttl_seconds)
+
+    def stats(self) -> Dict[str, Any]:
+        """Backend, generation and in-process hit counters"""
+        return {"backend": self.backend, "generation": self._generation, **self._memory.stats()}
+
+    def _after_commit(self, db: Session) -> None:
+        db.info.pop("invalidate_analytics_cache", None)
+        self.invalidate()
+
+    def _read(self, key: str) -> Tuple[Optional[Tuple[float, Any]], int]:
+        """The (fresh_until, value) entry for a key if it is from the current generation, and that generation"""
+        if self.backend == "redis":
+            generation, raw = self._redis.mget(GENERATION_KEY, key)
+            generation = int(generation or 0)
+            if raw is None:
+                return None, generation
+            entry = json.loads(raw)
+            if entry["generation"] != generation:
+                return None, generation
+            return (entry["fresh_until"], entry["value"]), generation
+
+        generation = self._generation
+        entry = self._memory.get(key)
+        if entry is None or entry[0] != generation:
+            return None, generation
+        return entry[1:], generation
+
+    def _store(self, key: str, value: Any, generation: int) -> None:
+        """Cache a value computed while ``generation`` was current"""
+        fresh_until = time.time() + settings.analytics_cache_ttl_seconds
+        ttl = settings.analytics_cache_ttl_seconds + settings.analytics_cache_stale_seconds
+        try:
+            if self.backend == "redis":
+                entry = {"generation": generation, "fresh_until": fresh_until, "value": value}
+                self._redis.set(key, json.dumps(entry, default=_json_default), ex=max(int(ttl), 1))
+                return
+        except Exception as e:
+            print(f"Analytics cache write error: {str(e)}")
+            return
+        self._memory.set(key, (generation, fresh_until, value), ttl_seconds=ttl)
+
+    def _refresh_in_background(self, key: str, compute: Compute, generation: int) -> None:
+        """Recompute a stale entry once, in a daemon thread"""
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+        threading.Thread(
+            target=self._refresh, args=(key, compute, generation), name="analytics-cache-refresh", daemon=True
+        ).start()
+
+    def _refresh(self, key: str, compute: Compute, generation: int) -> None:
+        db = self.session_factory()
+        try:
+            self._store(key, compute(db), generation)
+        except Exception as e:
+            print(f"Analytics cache refresh error: {str(e)}")
+        finally:
+            db.close()
+            with self._lock:
+                self._refreshing.discard(key)
+
+
+# One cache per worker process, shared through Redis when available
+analytics_cache = AnalyticsCache()
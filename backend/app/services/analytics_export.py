@@ -0,0 +1,238 @@
+"""
+Analytics Export
+Streams analytics datasets as CSV, JSON, JSON Lines or Parquet, a batch at a time
+"""
+
+import csv
+import io
+import json
+from datetime import date, datetime, time, timezone
+from decimal import Decimal
+from typing import Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Tuple, Union
+
+from sqlalchemy.orm import Session
+
+from ..models.learning import Assessment, AssessmentAttempt, LearningSession
+from .course_analytics import course_report
+from .user_engagement import ENGAGEMENT_COLUMNS, iter_engagement_rows
+
+EXPORT_BATCH_SIZE = 5000
+# Text formats are flushed to the client in chunks of about this size
+CHUNK_BYTES = 64 * 1024
+
+# Format name -> (media type, file extension)
+FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "json": ("application/json", "json"),
+    "jsonl": ("application/x-ndjson", "jsonl"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+# (name, type) pairs; the type is one of int, float, bool, str or datetime
+Columns = List[Tuple[str, str]]
+Rows = Iterable[Dict[str, Any]]
+
+
+class Dataset(NamedTuple):
+    """An exportable dataset: its typed columns and a row generator taking (db, start_date)"""
+    columns: Columns
+    rows: Callable[[Session, date], Rows]
+
+
+def _query_rows(query) -> Iterator[Dict[str, Any]]:
+    """Rows of a column query, fetched from a server-side cursor in batches"""
+    for row in query.yield_per(EXPORT_BATCH_SIZE):
+        yield dict(row._mapping)
+
+
+def _session_rows(db: Session, start_date: date) -> Iterator[Dict[str, Any]]:
+    since = datetime.combine(start_date, time.min)
+    return _query_rows(db.query(
+        LearningSession.id.label("session_id"), LearningSession.user_id, LearningSession.course_id,
+        LearningSession.enrollment_id, LearningSession.duration_minutes,
+        LearningSession.started_at, LearningSession.ended_at
+    ).filter(LearningSession.started_at >= since).order_by(LearningSession.id))
+
+
+def _attempt_rows(db: Session, start_date: date) -> Iterator[Dict[str, Any]]:
+    since = datetime.combine(start_date, time.min)
+    return _query_rows(db.query(
+        AssessmentAttempt.id.label("attempt_id"), AssessmentAttempt.user_id, AssessmentAttempt.assessment_id,
+        Assessment.course_id, AssessmentAttempt.score, AssessmentAttempt.total_score, AssessmentAttempt.percentage,
+        AssessmentAttempt.passed, AssessmentAttempt.started_at, AssessmentAttempt.completed_at,
+        AssessmentAttempt.time_taken_minutes
+    ).join(Assessment, Assessment.id == AssessmentAttempt.assessment_id)
+        .filter(AssessmentAttempt.started_at >= since).order_by(AssessmentAttempt.id))
+
+
+def _course_rows(db: Session, start_date: date) -> Iterator[Dict[str, Any]]:
+    """The course report (one summary row per course) with its sections flattened"""
+    for course in course_report(db, start_date):
+        row = {key: value for key, value in course.items() if not isinstance(value, dict)}
+        for section in ("enrollments", "learning", "assessments"):
+            row.update({f"{section}_{key}": value for key, value in course[section].items()})
+        yield row
+
+
+def _user_rows(db: Session, start_date: date) -> Iterator[Dict[str, Any]]:
+    return iter_engagement_rows(db, start_date)
+
+
+USER_COLUMN_TYPES = {"email": "str", "role": "str", "is_active": "bool", "learning_hours": "float",
+                     "average_score": "float"}
+
+DATASETS = {
+    "courses": Dataset([
+        ("course_id", "int"), ("course_title", "str"), ("category", "str"), ("difficulty_level", "str"),
+        ("status", "str"), ("enrollments_total", "int"), ("enrollments_recent", "int"),
+        ("enrollments_completions", "int"), ("enrollments_completion_rate", "float"),
+        ("learning_total_hours", "float"), ("learning_unique_learners", "int"),
+        ("learning_average_session_duration", "float"), ("assessments_total_attempts", "int"),
+        ("assessments_passed_attempts", "int"), ("assessments_pass_rate", "float"),
+        ("assessments_average_score", "float"),
+    ], _course_rows),
+    "users": Dataset([(name, USER_COLUMN_TYPES.get(name, "int")) for name in ENGAGEMENT_COLUMNS], _user_rows),
+    "sessions": Dataset([
+        ("session_id", "int"), ("user_id", "int"), ("course_id", "int"), ("enrollment_id", "int"),
+        ("duration_minutes", "int"), ("started_at", "datetime"), ("ended_at", "datetime"),
+    ], _session_rows),
+    "attempts": Dataset([
+        ("attempt_id", "int"), ("user_id", "int"), ("assessment_id", "int"), ("course_id", "int"),
+        ("score", "int"), ("total_score", "int"), ("percentage", "float"), ("passed", "bool"),
+        ("started_at", "datetime"), ("completed_at", "datetime"), ("time_taken_minutes", "int"),
+    ], _attempt_rows),
+}
+
+
+def _batches(rows: Rows, size: int) -> Iterator[List[Dict[str, Any]]]:
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _json_value(value: Any) -> Any:
+    """JSON encoding for dates and decimals"""
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"Cannot export {type(value).__name__}")
+
+
+def csv_chunks(columns: Columns, rows: Rows) -> Iterator[str]:
+    """A header line then the rows as CSV, in chunks of about CHUNK_BYTES"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=[name for name, _ in columns], extrasaction="ignore")
+    writer.writeheader()
+    for row in rows:
+        writer.writerow(row)
+        if buffer.tell() >= CHUNK_BYTES:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def jsonl_chunks(columns: Columns, rows: Rows) -> Iterator[str]:
+    """One JSON object per line, in chunks of about CHUNK_BYTES"""
+    names = [name for name, _ in columns]
+    lines, size = [], 0
+    for row in rows:
+        line = json.dumps({name: row.get(name) for name in names}, default=_json_value)
+        lines.append(line)
+        size += len(line) + 1
+        if size >= CHUNK_BYTES:
+            yield "\n".join(lines) + "\n"
+            lines, size = [], 0
+    if lines:
+        yield "\n".join(lines) + "\n"
+
+
+def json_chunks(columns: Columns, rows: Rows) -> Iterator[str]:
+    """A JSON array of row objects, written out incrementally"""
+    yield "["
+    first = True
+    for chunk in jsonl_chunks(columns, rows):
+        items = ",\n".join(chunk.rstrip("\n").split("\n"))
+        yield ("\n" if first else ",\n") + items
+        first = False
+    yield "\n]\n"
+
+
+class _ChunkSink:
+    """Write-only file that hands back what was written since the last drain"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        # Parquet metadata records absolute offsets, so this counts drained bytes too
+        return self._position
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def parquet_chunks(columns: Columns, rows: Rows) -> Iterator[bytes]:
+    """A Parquet file with one row group per EXPORT_BATCH_SIZE rows, streamed as each group is written.
+
+    Requires pyarrow; raises ImportError before anything is written if it is missing.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    types = {"int": pa.int64(), "float": pa.float64(), "bool": pa.bool_(), "str": pa.string(),
+             "datetime": pa.timestamp("us")}
+    converters = {"int": int, "float": float, "bool": bool, "str": str, "datetime": _naive_utc}
+    schema = pa.schema([(name, types[kind]) for name, kind in columns])
+
+    def generate():
+        sink = _ChunkSink()
+        with pq.ParquetWriter(sink, schema, compression="snappy") as writer:
+            for batch in _batches(rows, EXPORT_BATCH_SIZE):
+                arrays = [
+                    pa.array([None if row.get(name) is None else converters[kind](row[name]) for row in batch],
+                             type=types[kind])
+                    for name, kind in columns
+                ]
+                writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=schema))
+                yield sink.drain()
+        yield sink.drain()
+
+    return generate()
+
+
+def _naive_utc(value: datetime) -> datetime:
+    """Timestamps are exported as naive UTC"""
+    if value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def export_chunks(format: str, columns: Columns, rows: Rows) -> Iterator[Union[str, bytes]]:
+    """The rows encoded in ``format``; raises ValueError for an unknown format"""
+    writers = {"csv": csv_chunks, "json": json_chunks, "jsonl": jsonl_chunks, "parquet": parquet_chunks}
+    if format not in writers:
+        raise ValueError(f"Unknown export format: {format}. Use: {', '.join(FORMATS)}")
+    return writers[format](columns, rows)
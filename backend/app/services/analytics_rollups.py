@@ -0,0 +1,372 @@
+"""
+Analytics Rollups
+Daily metric buckets built incrementally from the raw learning tables, and read back with a live tail
+"""
+
+import threading
+from datetime import date, datetime, time, timedelta
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+from sqlalchemy import Date, and_, case, cast, delete, func, insert, literal, select, type_coerce, union_all, update
+from sqlalchemy.orm import Session
+
+from ..core.config import settings
+from ..core.database import SessionLocal
+from ..models.analytics import (
+    AnalyticsEvent, CourseAnalytics, PlatformMetrics, RollupWatermark, UserEngagementMetrics
+)
+from ..models.course import Course
+from ..models.learning import Assessment, AssessmentAttempt, Enrollment, LearningSession
+from ..models.user import User
+
+WATERMARK = "daily_metrics"
+
+
+class Family(NamedTuple):
+    """A rollup table, its key columns and metrics, and the raw queries that produce them.
+
+    ``metrics`` can be summed over any range of days. ``daily_distinct`` metrics
+    are distinct counts that only hold for their own day, so they are stored in
+    the rollup rows but not returned by ``daily_metrics``.
+    """
+    model: type
+    keys: List[str]
+    metrics: List[str]
+    parts: Callable
+    daily_distinct: List[str] = []
+
+    @property
+    def stored(self) -> List[str]:
+        """Every metric column written to the rollup table"""
+        return self.metrics + self.daily_distinct
+
+
+def day_bucket(db: Session, column):
+    """The UTC calendar day of a timestamp, truncated in SQL"""
+    if db.get_bind().dialect.name == "sqlite":
+        return type_coerce(func.date(column), Date)
+    return cast(func.date_trunc("day", column), Date)
+
+
+def _completed_at():
+    """When an enrollment was completed; older rows only have updated_at or created_at"""
+    return func.coalesce(Enrollment.completion_date, Enrollment.updated_at, Enrollment.created_at)
+
+
+def _part(db: Session, family_metrics: List[str], keys: list, timestamp, values: dict, criteria: list,
+          since: Optional[datetime], until: Optional[datetime], join=None):
+    """One raw source aggregated per key and day, with 0 for the metrics it does not provide"""
+    day = day_bucket(db, timestamp)
+    columns = [expression.label(name) for name, expression in keys] + [day.label("date")]
+    columns += [values.get(metric, literal(0)).label(metric) for metric in family_metrics]
+    query = select(*columns)
+    if join is not None:
+        query = query.select_from(join[0]).join(*join[1:])
+    if since is not None:
+        criteria = criteria + [timestamp >= since]
+    if until is not None:
+        criteria = criteria + [timestamp < until]
+    return query.where(*criteria).group_by(*[expression for _, expression in keys], day)
+
+
+PLATFORM_METRICS = [
+    "new_registrations", "course_enrollments", "course_completions", "learning_sessions", "total_learning_hours",
+    "assessment_attempts", "assessments_passed", "total_messages_sent", "qa_posts_created",
+]
+
+
+def _platform_parts(db: Session, since: Optional[datetime], until: Optional[datetime]) -> list:
+    part = lambda *args, **kwargs: _part(db, PLATFORM_METRICS, [], *args, since=since, until=until, **kwargs)
+    return [
+        part(User.created_at, {"new_registrations": func.count(User.id)}, []),
+        part(Enrollment.created_at, {"course_enrollments": func.count(Enrollment.id)}, []),
+        part(_completed_at(), {"course_completions": func.count(Enrollment.id)}, [Enrollment.status == "completed"]),
+        part(LearningSession.started_at, {
+            "learning_sessions": func.count(LearningSession.id),
+            "total_learning_hours": func.coalesce(func.sum(LearningSession.duration_minutes), 0) / 60.0,
+        }, []),
+        part(AssessmentAttempt.started_at, {
+            "assessment_attempts": func.count(AssessmentAttempt.id),
+            "assessments_passed": func.sum(case((AssessmentAttempt.passed == True, 1), else_=0)),
+        }, []),
+        part(AnalyticsEvent.created_at, {
+            "total_messages_sent": func.sum(case((AnalyticsEvent.event_type == "message_sent", 1), else_=0)),
+            "qa_posts_created": func.sum(case((AnalyticsEvent.event_type == "qa_post_created", 1), else_=0)),
+        }, [AnalyticsEvent.event_type.in_(["message_sent", "qa_post_created"])]),
+    ]
+
+
+COURSE_METRICS = [
+    "new_enrollments", "completions", "total_views", "learning_minutes",
+    "total_assessments", "passed_assessments", "assessment_score_total",
+]
+COURSE_DAILY_DISTINCT = ["unique_viewers"]
+
+
+def _course_parts(db: Session, since: Optional[datetime], until: Optional[datetime]) -> list:
+    def part(course_id, *args, **kwargs):
+        return _part(db, COURSE_METRICS + COURSE_DAILY_DISTINCT, [("course_id", course_id)], *args,
+                     since=since, until=until, **kwargs)
+    return [
+        part(Enrollment.course_id, Enrollment.created_at, {"new_enrollments": func.count(Enrollment.id)}, []),
+        part(Enrollment.course_id, _completed_at(), {"completions": func.count(Enrollment.id)},
+             [Enrollment.status == "completed"]),
+        part(LearningSession.course_id, LearningSession.started_at, {
+            "total_views": func.count(LearningSession.id),
+            "unique_viewers": func.count(func.distinct(LearningSession.user_id)),
+            "learning_minutes": func.coalesce(func.sum(LearningSession.duration_minutes), 0),
+        }, []),
+        part(Assessment.course_id, AssessmentAttempt.started_at, {
+            "total_assessments": func.count(AssessmentAttempt.id),
+            "passed_assessments": func.sum(case((AssessmentAttempt.passed == True, 1), else_=0)),
+            "assessment_score_total": func.coalesce(func.sum(AssessmentAttempt.score), 0),
+        }, [], join=(AssessmentAttempt, Assessment, Assessment.id == AssessmentAttempt.assessment_id)),
+    ]
+
+
+USER_METRICS = [
+    "login_count", "messages_sent", "qa_posts_created", "learning_sessions", "learning_time",
+    "courses_enrolled", "courses_completed", "assessments_completed", "assessments_passed", "assessment_score_total",
+]
+USER_DAILY_DISTINCT = ["courses_accessed"]
+
+
+def _user_parts(db: Session, since: Optional[datetime], until: Optional[datetime]) -> list:
+    def part(user_id, *args, **kwargs):
+        return _part(db, USER_METRICS + USER_DAILY_DISTINCT, [("user_id", user_id)], *args,
+                     since=since, until=until, **kwargs)
+    event_count = lambda event_type: func.sum(case((AnalyticsEvent.event_type == event_type, 1), else_=0))
+    return [
+        part(AnalyticsEvent.user_id, AnalyticsEvent.created_at, {
+            "login_count": event_count("login"),
+            "messages_sent": event_count("message_sent"),
+            "qa_posts_created": event_count("qa_post_created"),
+        }, [AnalyticsEvent.user_id.isnot(None),
+            AnalyticsEvent.event_type.in_(["login", "message_sent", "qa_post_created"])]),
+        part(LearningSession.user_id, LearningSession.started_at, {
+            "learning_sessions": func.count(LearningSession.id),
+            "learning_time": func.coalesce(func.sum(LearningSession.duration_minutes), 0),
+            "courses_accessed": func.count(func.distinct(LearningSession.course_id)),
+        }, []),
+        part(Enrollment.user_id, Enrollment.created_at, {"courses_enrolled": func.count(Enrollment.id)}, []),
+        part(Enrollment.user_id, _completed_at(), {"courses_completed": func.count(Enrollment.id)},
+             [Enrollment.status == "completed"]),
+        part(AssessmentAttempt.user_id, AssessmentAttempt.started_at, {
+            "assessments_completed": func.count(AssessmentAttempt.id),
+            "assessments_passed": func.sum(case((AssessmentAttempt.passed == True, 1), else_=0)),
+            "assessment_score_total": func.coalesce(func.sum(AssessmentAttempt.score), 0),
+        }, []),
+    ]
+
+
+PLATFORM = Family(PlatformMetrics, [], PLATFORM_METRICS, _platform_parts)
+COURSES = Family(CourseAnalytics, ["course_id"], COURSE_METRICS, _course_parts, COURSE_DAILY_DISTINCT)
+USERS = Family(UserEngagementMetrics, ["user_id"], USER_METRICS, _user_parts, USER_DAILY_DISTINCT)
+# Users first: the platform's active user count is read from the user rollups
+FAMILIES = [USERS, COURSES, PLATFORM]
+
+
+def _daily(db: Session, family: Family, since: Optional[datetime], until: Optional[datetime],
+           metrics: Optional[List[str]] = None):
+    """The family's raw sources combined into one row per key and day, with ``metrics`` (default all stored)"""
+    combined = union_all(*family.parts(db, since, until)).subquery()
+    keys = [combined.c[key] for key in family.keys] + [combined.c.date]
+    metrics = metrics if metrics is not None else family.stored
+    return select(*keys, *[func.sum(combined.c[metric]).label(metric) for metric in metrics]).group_by(*keys)
+
+
+def rollup_through(db: Session) -> Optional[date]:
+    """The last day covered by the rollup tables, or None before the first run"""
+    return db.query(RollupWatermark.through_date).filter(RollupWatermark.name == WATERMARK).scalar()
+
+
+def run_rollups(db: Session, through: Optional[date] = None, rebuild: bool = False) -> int:
+    """Roll raw activity up into daily buckets, from the watermark to ``through`` (default yesterday).
+
+    The last ``analytics_rollup_lookback_days`` already-rolled days are rebuilt
+    too, so sessions ended or enrollments completed after a day was rolled up
+    are picked up. Each day range is replaced with one DELETE and one
+    INSERT ... SELECT per rollup table. Returns the number of days rolled up.
+    """
+    through = through or datetime.utcnow().date() - timedelta(days=1)
+    watermark = _lock_watermark(db)
+
+    if rebuild or watermark.through_date is None:
+        first = _first_activity_day(db)
+    else:
+        first = watermark.through_date + timedelta(days=1 - max(settings.analytics_rollup_lookback_days, 0))
+    if first is None or first > through:
+        db.commit()
+        return 0
+
+    since = datetime.combine(first, time.min)
+    until = datetime.combine(through + timedelta(days=1), time.min)
+    for family in FAMILIES:
+        model = family.model
+        db.execute(delete(model).where(model.date >= first, model.date <= through))
+        db.execute(insert(model).from_select(family.keys + ["date"] + family.stored, _daily(db, family, since, until)))
+        _fill_derived(db, family, first, through)
+
+    if rebuild or watermark.through_date is None or watermark.through_date < through:
+        watermark.through_date = through
+    db.commit()
+    return (through - first).days + 1
+
+
+def _lock_watermark(db: Session) -> RollupWatermark:
+    """The watermark row, locked so concurrent jobs run one after another"""
+    watermark = db.query(RollupWatermark).filter(RollupWatermark.name == WATERMARK).with_for_update().first()
+    if watermark is None:
+        watermark = RollupWatermark(name=WATERMARK)
+        db.add(watermark)
+        db.flush()
+    return watermark
+
+
+def _first_activity_day(db: Session) -> Optional[date]:
+    """The earliest day with any raw activity"""
+    firsts = db.query(
+        select(func.min(day_bucket(db, User.created_at))).scalar_subquery(),
+        select(func.min(day_bucket(db, Enrollment.created_at))).scalar_subquery(),
+        select(func.min(day_bucket(db, LearningSession.started_at))).scalar_subquery(),
+        select(func.min(day_bucket(db, AssessmentAttempt.started_at))).scalar_subquery(),
+        select(func.min(day_bucket(db, AnalyticsEvent.created_at))).scalar_subquery(),
+    ).one()
+    days = [as_date(day) for day in firsts if day is not None]
+    return min(days) if days else None
+
+
+def _fill_derived(db: Session, family: Family, first: date, through: date) -> None:
+    """Averages, rates and running totals for the freshly rolled-up days"""
+    model = family.model
+    in_range = and_(model.date >= first, model.date <= through)
+    ratio = lambda numerator, denominator, scale=1.0: case(
+        (denominator > 0, numerator * scale / denominator), else_=0.0
+    )
+
+    if family is PLATFORM:
+        values = {
+            "average_session_duration": ratio(model.total_learning_hours, model.learning_sessions, 60.0),
+            "assessment_pass_rate": ratio(model.assessments_passed, model.assessment_attempts, 100.0),
+            "active_users": select(func.count(UserEngagementMetrics.id))
+            .where(UserEngagementMetrics.date == model.date).scalar_subquery(),
+            "total_users": select(func.count(User.id))
+            .where(day_bucket(db, User.created_at) <= model.date).scalar_subquery(),
+            "total_courses": select(func.count(Course.id))
+            .where(day_bucket(db, Course.created_at) <= model.date).scalar_subquery(),
+        }
+    elif family is COURSES:
+        values = {
+            "average_time_spent": ratio(model.learning_minutes, model.total_views),
+            "average_score": ratio(model.assessment_score_total, model.total_assessments),
+            "completion_rate": ratio(model.completions, model.new_enrollments, 100.0),
+        }
+    else:
+        values = {"session_duration": ratio(model.learning_time, model.learning_sessions)}
+
+    db.execute(update(model).where(in_range).values(**values).execution_options(synchronize_session=False))
+
+
+def daily_metrics(db: Session, family: Family, start_date: Optional[date] = None):
+    """Rolled-up days from ``start_date`` (or all time), plus a live tail from the raw tables.
+
+    Returns a subquery of (keys..., date, metrics...) rows: the rollup rows up to
+    the watermark, then raw activity aggregated on the fly for the days after it
+    (normally just today). A key and day can appear once from each side, so
+    callers sum over the columns they group by. Only the summable ``metrics``
+    are returned; distinct counts over a range must be computed from raw rows.
+    """
+    through = rollup_through(db)
+    model = family.model
+    parts = []
+
+    tail_start = start_date
+    if through is not None and (start_date is None or start_date <= through):
+        rolled = select(
+            *[getattr(model, key) for key in family.keys], model.date,
+            *[getattr(model, metric) for metric in family.metrics]
+        ).where(model.date <= through)
+        if start_date is not None:
+            rolled = rolled.where(model.date >= start_date)
+        parts.append(rolled)
+        tail_start = through + timedelta(days=1)
+
+    since = datetime.combine(tail_start, time.min) if tail_start is not None else None
+    parts.append(_daily(db, family, since, None, family.metrics))
+    return union_all(*parts).subquery()
+
+
+def platform_totals(db: Session, start_date: date) -> Dict[str, float]:
+    """Platform metrics summed from ``start_date`` to now"""
+    rows = daily_metrics(db, PLATFORM, start_date)
+    totals = db.query(*[func.coalesce(func.sum(rows.c[metric]), 0).label(metric) for metric in PLATFORM_METRICS]).one()
+    return dict(totals._mapping)
+
+
+def platform_daily(db: Session, start_date: date) -> List:
+    """One row of platform metrics per day from ``start_date`` to now, oldest first"""
+    rows = daily_metrics(db, PLATFORM, start_date)
+    return db.query(
+        rows.c.date, *[func.sum(rows.c[metric]).label(metric) for metric in PLATFORM_METRICS]
+    ).group_by(rows.c.date).order_by(rows.c.date).all()
+
+
+def as_date(value) -> date:
+    """A date from a SQL day value (SQLite returns text for computed days)"""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, str):
+        return date.fromisoformat(value[:10])
+    return value
+
+
+class RollupWorker:
+    """Background thread that keeps the daily rollups current.
+
+    Runs ``run_rollups`` every ``analytics_rollup_interval_seconds``. The
+    watermark row is locked for the duration of a run, so several app workers
+    can each run the job without rolling up the same days at once.
+    """
+
+    def __init__(self, session_factory: Callable[[], Session] = SessionLocal):
+        self.session_factory = session_factory
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def start(self) -> None:
+        """Start rolling up in a daemon thread"""
+        if not settings.analytics_rollup_enabled or (self._thread and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="analytics-rollups", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10) -> None:
+        """Stop after the current run"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def run_once(self) -> int:
+        """Bring the rollups up to yesterday; returns the number of days rolled up"""
+        db = self.session_factory()
+        try:
+            return run_rollups(db)
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def _run(self) -> None:
+        """Run until stopped"""
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"Analytics rollup error: {str(e)}")
+            self._stop.wait(settings.analytics_rollup_interval_seconds)
+
+
+rollup_worker = RollupWorker()
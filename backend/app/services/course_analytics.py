@@ -0,0 +1,97 @@
+"""
+Course Analytics
+Per-course enrollment, learning and assessment figures from the daily course rollups
+"""
+
+from datetime import date, datetime, time
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import Date, case, func, literal
+from sqlalchemy.orm import Session
+
+from ..models.course import Course
+from ..models.learning import LearningSession
+from .analytics_rollups import COURSES, daily_metrics
+
+
+def course_report(db: Session, start_date: date, course_id: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Analytics for every course (or one), from grouped queries across all courses.
+
+    Enrollment, learning and assessment totals are summed from the daily
+    course rollups plus a live tail in one GROUP BY course_id; unique learners
+    come from the raw sessions. The cost does not grow with the number of
+    courses and only summary rows are loaded.
+    """
+    since = datetime.combine(start_date, time.min)
+
+    courses = db.query(
+        Course.id, Course.title, Course.category, Course.difficulty_level, Course.status
+    )
+    if course_id:
+        courses = courses.filter(Course.id == course_id)
+    courses = courses.order_by(Course.id).all()
+    if not courses:
+        return []
+
+    # All-time rollups plus the live tail, with the reporting period picked out per column
+    rows = daily_metrics(db, COURSES, None)
+    in_period = rows.c.date >= literal(start_date, Date)
+    period_sum = lambda metric: func.sum(case((in_period, rows.c[metric]), else_=0))
+    totals = db.query(
+        rows.c.course_id,
+        func.sum(rows.c.new_enrollments), period_sum("new_enrollments"), func.sum(rows.c.completions),
+        period_sum("total_views"), period_sum("learning_minutes"),
+        period_sum("total_assessments"), period_sum("passed_assessments"), period_sum("assessment_score_total"),
+    )
+    if course_id:
+        totals = totals.filter(rows.c.course_id == course_id)
+    totals = {row[0]: tuple(row[1:]) for row in totals.group_by(rows.c.course_id).all()}
+
+    # Distinct learners over a period cannot be summed from daily buckets
+    learners = _by_course(db, LearningSession.course_id, course_id, [
+        func.count(func.distinct(LearningSession.user_id)),
+    ], LearningSession.started_at >= since)
+
+    report = []
+    for course in courses:
+        (total_enrollments, recent_enrollments, completions, sessions, minutes,
+         total_attempts, passed_attempts, score_total) = [value or 0 for value in totals.get(course.id, (0,) * 8)]
+        unique_learners = learners.get(course.id, (0,))[0]
+        avg_score = score_total / total_attempts if total_attempts else 0
+        completion_rate = (completions / total_enrollments * 100) if total_enrollments > 0 else 0
+        total_hours = float(minutes) / 60
+
+        report.append({
+            "course_id": course.id,
+            "course_title": course.title,
+            "category": course.category,
+            "difficulty_level": course.difficulty_level,
+            "status": course.status,
+            "enrollments": {
+                "total": total_enrollments,
+                "recent": recent_enrollments,
+                "completions": completions,
+                "completion_rate": round(completion_rate, 2)
+            },
+            "learning": {
+                "total_hours": round(total_hours, 2),
+                "unique_learners": unique_learners,
+                "average_session_duration": round(total_hours / sessions, 2) if sessions else 0
+            },
+            "assessments": {
+                "total_attempts": total_attempts,
+                "passed_attempts": passed_attempts,
+                "pass_rate": round((passed_attempts / total_attempts * 100), 2) if total_attempts > 0 else 0,
+                "average_score": round(float(avg_score), 2)
+            }
+        })
+    return report
+
+
+def _by_course(db: Session, course_column, course_id: Optional[int], aggregates: list, *criteria):
+    """One GROUP BY course query, as {course_id: aggregate values}"""
+    query = db.query(course_column, *aggregates).select_from(course_column.class_)
+    if course_id:
+        query = query.filter(course_column == course_id)
+    rows = query.filter(*criteria).group_by(course_column).all()
+    return {row[0]: tuple(row[1:]) for row in rows}
@@ -0,0 +1,229 @@
+"""
+Outbound Email Queue
+Durable notification email queue drained by a background worker with retries and digests
+"""
+
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from ..core.config import settings
+from ..core.database import SessionLocal
+from ..core.email import EmailService, email_service
+from ..models.messaging import OutboundEmail
+
+# A claimed row that is still 'sending' after this long belonged to a worker that died
+SEND_LEASE_SECONDS = 300
+MAX_ERROR_LENGTH = 1000
+
+
+def _queued_row(to_email: str, notification_type: str, title: str, content: str,
+                user_id: Optional[int] = None, course_title: Optional[str] = None,
+                action_url: Optional[str] = None) -> Dict[str, Any]:
+    """Column values for a new queue row.
+
+    The row becomes due after the digest window, so further notifications for the
+    same address that arrive in the meantime go out with it as one digest.
+    """
+    now = datetime.now(timezone.utc)
+    return {
+        "user_id": user_id,
+        "to_email": to_email,
+        "notification_type": notification_type,
+        "title": title,
+        "content": content,
+        "course_title": course_title,
+        "action_url": action_url,
+        "status": "pending",
+        "attempts": 0,
+        "next_attempt_at": now + timedelta(seconds=settings.email_digest_window_seconds),
+        "created_at": now
+    }
+
+
+def enqueue_notification_email(
+    db: Session,
+    to_email: str,
+    notification_type: str,
+    title: str,
+    content: str,
+    user_id: Optional[int] = None,
+    course_title: Optional[str] = None,
+    action_url: Optional[str] = None
+) -> OutboundEmail:
+    """Queue a notification email; the caller commits"""
+    email = OutboundEmail(**_queued_row(
+        to_email, notification_type, title, content, user_id, course_title, action_url
+    ))
+    db.add(email)
+    return email
+
+
+def enqueue_notification_emails(db: Session, emails: List[Dict[str, Any]]) -> None:
+    """Queue many notification emails in one multi-row INSERT; the caller commits.
+
+    Each item takes the keyword arguments of ``enqueue_notification_email``.
+    """
+    if emails:
+        db.execute(insert(OutboundEmail), [_queued_row(**email) for email in emails])
+
+
+class EmailWorker:
+    """Background thread that sends queued notification emails.
+
+    Each poll claims up to ``email_batch_size`` due rows (``SKIP LOCKED`` on
+    Postgres, so several app workers can drain the queue side by side), plus any
+    other pending rows for the same addresses, and sends one email per address
+    over the email service's pooled SMTP connection: the notification itself, or
+    a digest when several are waiting. Failed sends are retried with exponential
+    backoff until ``email_max_attempts``.
+    """
+
+    def __init__(self, session_factory: Callable[[], Session] = SessionLocal,
+                 sender: EmailService = email_service):
+        self.session_factory = session_factory
+        self.sender = sender
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def start(self) -> None:
+        """Start polling in a daemon thread"""
+        if not settings.email_queue_enabled or (self._thread and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="email-worker", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10) -> None:
+        """Stop polling and close the SMTP connection"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self.sender.close()
+
+    def run_once(self) -> int:
+        """Claim and send one batch; returns the number of queued emails sent"""
+        db = self.session_factory()
+        try:
+            claimed = self._claim(db)
+            if not claimed:
+                return 0
+
+            by_recipient: Dict[str, List[OutboundEmail]] = {}
+            for email in claimed:
+                by_recipient.setdefault(email.to_email, []).append(email)
+
+            sent = 0
+            for to_email, emails in by_recipient.items():
+                try:
+                    self._send(to_email, emails)
+                except Exception as e:
+                    print(f"Failed to send email to {to_email}: {str(e)}")
+                    self._schedule_retry(emails, str(e))
+                else:
+                    now = datetime.now(timezone.utc)
+                    for email in emails:
+                        email.status = "sent"
+                        email.sent_at = now
+                        email.last_error = None
+                    sent += len(emails)
+                # Record each recipient's outcome so a crash mid-batch cannot resend it
+                db.commit()
+            return sent
+        finally:
+            db.close()
+
+    def _run(self) -> None:
+        """Poll until stopped, draining full batches without waiting"""
+        while not self._stop.is_set():
+            try:
+                if self.run_once() >= settings.email_batch_size:
+                    continue
+            except Exception as e:
+                print(f"Email worker error: {str(e)}")
+            self.sender.close_if_idle(settings.email_smtp_idle_seconds)
+            self._stop.wait(settings.email_poll_interval_seconds)
+
+    def _claim(self, db: Session) -> List[OutboundEmail]:
+        """Lock due rows and the other pending rows for their addresses, marking them as sending"""
+        now = datetime.now(timezone.utc)
+        due = (
+            db.query(OutboundEmail)
+            .filter(
+                OutboundEmail.status.in_(["pending", "sending"]),
+                OutboundEmail.next_attempt_at <= now
+            )
+            .order_by(OutboundEmail.next_attempt_at)
+            .limit(settings.email_batch_size)
+            .with_for_update(skip_locked=True)
+            .all()
+        )
+        if not due:
+            db.commit()
+            return []
+
+        # Notifications still inside their digest window ride along with a due one
+        due_ids = {email.id for email in due}
+        waiting = (
+            db.query(OutboundEmail)
+            .filter(
+                OutboundEmail.status == "pending",
+                OutboundEmail.to_email.in_({email.to_email for email in due}),
+                OutboundEmail.id.notin_(due_ids)
+            )
+            .with_for_update(skip_locked=True)
+            .all()
+        )
+
+        claimed = due + waiting
+        lease_until = now + timedelta(seconds=SEND_LEASE_SECONDS)
+        for email in claimed:
+            email.status = "sending"
+            email.next_attempt_at = lease_until
+        db.commit()
+        return claimed
+
+    def _send(self, to_email: str, emails: List[OutboundEmail]) -> None:
+        """Send a single notification, or a digest of several"""
+        if len(emails) == 1:
+            email = emails[0]
+            self.sender.deliver_notification_email(
+                to_email=to_email,
+                notification_type=email.notification_type,
+                title=email.title,
+                content=email.content,
+                course_title=email.course_title,
+                action_url=email.action_url
+            )
+            return
+
+        self.sender.deliver_digest_email(to_email, [
+            {
+                "title": email.title,
+                "content": email.content,
+                "course_title": email.course_title,
+                "action_url": email.action_url
+            }
+            for email in sorted(emails, key=lambda e: e.id)
+        ])
+
+    def _schedule_retry(self, emails: List[OutboundEmail], error: str) -> None:
+        """Back off exponentially, giving up after the maximum number of attempts"""
+        now = datetime.now(timezone.utc)
+        for email in emails:
+            email.attempts = (email.attempts or 0) + 1
+            email.last_error = error[:MAX_ERROR_LENGTH]
+            if email.attempts >= settings.email_max_attempts:
+                email.status = "failed"
+            else:
+                email.status = "pending"
+                delay = settings.email_retry_base_seconds * 2 ** (email.attempts - 1)
+                email.next_attempt_at = now + timedelta(seconds=delay)
+
+
+# One worker thread per app process
+email_worker = EmailWorker()
@@ -0,0 +1,229 @@
+"""
+Enrollment Progress
+Materialised per-enrollment progress, updated incrementally by learning-session events
+"""
+
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+from sqlalchemy import and_, case, func, literal, select, update
+from sqlalchemy.orm import Session
+
+from ..models.course import Course, CourseFileContent
+from ..models.learning import Enrollment, EnrollmentProgress, LearningSession, LearningTimeTracking
+
+REBUILD_BATCH_SIZE = 1000
+
+
+class CourseProgress(NamedTuple):
+    """An enrollment with its course and materialised progress (None if not built yet)"""
+    enrollment: Enrollment
+    course: Course
+    progress: Optional[EnrollmentProgress]
+
+    @property
+    def progress_percentage(self) -> float:
+        return self.progress.progress_percentage if self.progress else 0.0
+
+    @property
+    def last_accessed(self) -> Optional[datetime]:
+        """Latest learning activity, or the enrollment date"""
+        if self.progress and self.progress.last_accessed_at:
+            return self.progress.last_accessed_at
+        return self.enrollment.created_at
+
+
+def progress_percentage(completed_sessions: int, total_content: int) -> float:
+    """The one progress formula: completed sessions per active content file, capped at 100"""
+    if not total_content:
+        return 0.0
+    return min(100.0, completed_sessions / total_content * 100)
+
+
+def _progress_expression(completed_sessions, total_content):
+    """progress_percentage as a SQL expression"""
+    raw = completed_sessions * 100.0 / total_content
+    return case((total_content <= 0, 0.0), (raw > 100.0, 100.0), else_=raw)
+
+
+def _content_count(course_id):
+    """Active content files in a course, as a scalar subquery"""
+    return (
+        select(func.count(CourseFileContent.id))
+        .where(CourseFileContent.course_id == course_id, CourseFileContent.is_active == True)
+        .scalar_subquery()
+    )
+
+
+def find_enrollment_id(db: Session, user_id: int, course_id: int) -> Optional[int]:
+    """The user's enrollment in a course, preferring an active one"""
+    row = (
+        db.query(Enrollment.id)
+        .filter(Enrollment.user_id == user_id, Enrollment.course_id == course_id)
+        .order_by(case((Enrollment.status == "active", 0), else_=1), Enrollment.id)
+        .first()
+    )
+    return row[0] if row else None
+
+
+def record_session_started(db: Session, enrollment_id: Optional[int], started_at: datetime) -> None:
+    """Note learning activity for an enrollment. The caller commits."""
+    _apply(db, enrollment_id, last_accessed_at=started_at)
+
+
+def record_session_ended(db: Session, enrollment_id: Optional[int], duration_minutes: int,
+                         ended_at: datetime) -> None:
+    """Count a completed learning session towards an enrollment's progress. The caller commits."""
+    _apply(db, enrollment_id, completed_sessions=1, learning_minutes=duration_minutes or 0,
+           last_accessed_at=ended_at)
+
+
+def record_time_tracked(db: Session, enrollment_id: Optional[int], seconds: int, ended_at: datetime) -> None:
+    """Add a finished time-tracking session to an enrollment. The caller commits."""
+    _apply(db, enrollment_id, tracked_seconds=seconds or 0, last_accessed_at=ended_at)
+
+
+def refresh_course_progress(db: Session, course_id: int) -> None:
+    """Re-count a course's active content and rescale its enrollments' progress. The caller commits.
+
+    Called when content files are added to or removed from a course.
+    """
+    # The count runs in SQL, so pending content changes must reach the database first
+    db.flush()
+    total = _content_count(course_id)
+    db.execute(
+        update(EnrollmentProgress)
+        .where(EnrollmentProgress.course_id == course_id)
+        .values(
+            total_content=total,
+            progress_percentage=_progress_expression(EnrollmentProgress.completed_sessions, total)
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _apply(db: Session, enrollment_id: Optional[int], completed_sessions: int = 0, learning_minutes: int = 0,
+           tracked_seconds: int = 0, last_accessed_at: Optional[datetime] = None) -> None:
+    """Apply an event as one relative UPDATE, building the row from history if it is missing"""
+    if enrollment_id is None:
+        return
+
+    total = _content_count(EnrollmentProgress.course_id)
+    completed = EnrollmentProgress.completed_sessions + completed_sessions
+    values = {
+        "completed_sessions": completed,
+        "learning_minutes": EnrollmentProgress.learning_minutes + learning_minutes,
+        "tracked_seconds": EnrollmentProgress.tracked_seconds + tracked_seconds,
+        "total_content": total,
+        "progress_percentage": _progress_expression(completed, total),
+    }
+    if last_accessed_at is not None:
+        values["last_accessed_at"] = case(
+            (EnrollmentProgress.last_accessed_at.is_(None), literal(last_accessed_at, EnrollmentProgress.last_accessed_at.type)),
+            (EnrollmentProgress.last_accessed_at < last_accessed_at, literal(last_accessed_at, EnrollmentProgress.last_accessed_at.type)),
+            else_=EnrollmentProgress.last_accessed_at
+        )
+
+    result = db.execute(
+        update(EnrollmentProgress)
+        .where(EnrollmentProgress.enrollment_id == enrollment_id)
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount == 0:
+        # First event for this enrollment: history (including this event) gives the full row
+        db.flush()
+        rebuild_enrollment_progress(db, [enrollment_id])
+
+
+def rebuild_enrollment_progress(db: Session, enrollment_ids: Optional[Iterable[int]] = None) -> int:
+    """Recompute progress rows from session history, for some or all enrollments.
+
+    Used for the backfill and for enrollments seen for the first time. Returns
+    the number of rows written. The caller commits.
+    """
+    same_enrollment = and_(
+        LearningSession.user_id == Enrollment.user_id, LearningSession.course_id == Enrollment.course_id
+    )
+    ended = and_(same_enrollment, LearningSession.ended_at.isnot(None))
+    same_tracking = and_(
+        LearningTimeTracking.user_id == Enrollment.user_id, LearningTimeTracking.course_id == Enrollment.course_id
+    )
+    columns = [
+        Enrollment.id,
+        Enrollment.user_id,
+        Enrollment.course_id,
+        _content_count(Enrollment.course_id),
+        select(func.count(LearningSession.id)).where(ended).scalar_subquery(),
+        select(func.coalesce(func.sum(LearningSession.duration_minutes), 0)).where(ended).scalar_subquery(),
+        select(func.max(LearningSession.started_at)).where(same_enrollment).scalar_subquery(),
+        select(func.coalesce(func.sum(LearningTimeTracking.time_spent_seconds), 0))
+        .where(same_tracking, LearningTimeTracking.is_active == False).scalar_subquery(),
+        select(func.max(LearningTimeTracking.last_activity)).where(same_tracking).scalar_subquery(),
+    ]
+
+    ids = list(enrollment_ids) if enrollment_ids is not None else None
+    query = db.query(*columns).order_by(Enrollment.id)
+    if ids is not None:
+        query = query.filter(Enrollment.id.in_(ids))
+
+    written = 0
+    batch = []
+    for row in query.yield_per(REBUILD_BATCH_SIZE):
+        enrollment_id, user_id, course_id, total, completed, minutes, last_session, seconds, last_tracked = row
+        accessed = [at for at in (last_session, last_tracked) if at is not None]
+        batch.append({
+            "enrollment_id": enrollment_id,
+            "user_id": user_id,
+            "course_id": course_id,
+            "total_content": total or 0,
+            "completed_sessions": completed or 0,
+            "learning_minutes": int(minutes or 0),
+            "tracked_seconds": int(seconds or 0),
+            "progress_percentage": progress_percentage(completed or 0, total or 0),
+            "last_accessed_at": max(accessed, key=_comparable) if accessed else None,
+        })
+        if len(batch) >= REBUILD_BATCH_SIZE:
+            written += _replace_rows(db, batch)
+            batch = []
+    if batch:
+        written += _replace_rows(db, batch)
+    return written
+
+
+def _comparable(value: datetime) -> datetime:
+    """Compare naive and aware timestamps (naive ones are UTC)"""
+    return value if value.tzinfo is None else value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _replace_rows(db: Session, rows: List[dict]) -> int:
+    """Swap in freshly computed progress rows"""
+    db.query(EnrollmentProgress).filter(
+        EnrollmentProgress.enrollment_id.in_([row["enrollment_id"] for row in rows])
+    ).delete(synchronize_session=False)
+    db.bulk_insert_mappings(EnrollmentProgress, rows)
+    return len(rows)
+
+
+def progress_by_enrollment(db: Session, enrollment_ids: Iterable[int]) -> Dict[int, float]:
+    """Progress percentages for some enrollments, by primary key; missing rows read as 0"""
+    ids = list(enrollment_ids)
+    if not ids:
+        return {}
+    rows = db.query(EnrollmentProgress.enrollment_id, EnrollmentProgress.progress_percentage).filter(
+        EnrollmentProgress.enrollment_id.in_(ids)
+    ).all()
+    return dict(rows)
+
+
+def load_student_progress(db: Session, user_id: int, status: str = "active") -> List[CourseProgress]:
+    """A student's enrollments with their courses and progress rows, in one query"""
+    rows = (
+        db.query(Enrollment, Course, EnrollmentProgress)
+        .join(Course, Course.id == Enrollment.course_id)
+        .outerjoin(EnrollmentProgress, EnrollmentProgress.enrollment_id == Enrollment.id)
+        .filter(Enrollment.user_id == user_id, Enrollment.status == status)
+        .order_by(Enrollment.id)
+        .all()
+    )
+    return [CourseProgress(enrollment, course, progress) for enrollment, course, progress in rows]
@@ -0,0 +1,89 @@
+"""
+Hashing Embedder
+Deterministic, vectorised feature-hashing embeddings for the lightweight RAG service
+"""
+
+import re
+import zlib
+from typing import List, Optional
+import numpy as np
+
+TOKEN_PATTERN = re.compile(r"\w+")
+NGRAM_MULTIPLIER = np.uint64(1000003)
+HASH_MASK = np.uint64(0xFFFFFFFF)
+
+
+class HashingEmbedder:
+    """Embeds text with the hashing trick.
+
+    Tokens (and optionally word n-grams) are hashed with CRC32, which unlike
+    Python's salted ``hash()`` gives the same bucket in every process, so stored
+    vectors stay valid across restarts. Each feature adds +/-1 to its bucket
+    (the sign comes from the hash to reduce collision bias), counts are damped
+    with log1p and rows are L2-normalised. A whole batch is turned into a dense
+    matrix with a single ``np.bincount``; n-gram hashes are derived from the
+    token hashes in numpy rather than by joining strings.
+    """
+
+    def __init__(self, dimension: int, ngram_max: int = 1):
+        self.dimension = dimension
+        self.ngram_max = max(1, ngram_max)
+
+    def _hash_features(self, texts: List[str]):
+        """CRC32 hashes of every token and word n-gram, with the row each came from"""
+        tokens_per_text = [TOKEN_PATTERN.findall(text.lower()) for text in texts]
+        lengths = np.fromiter((len(tokens) for tokens in tokens_per_text), dtype=np.int64, count=len(texts))
+        tokens = [token for text_tokens in tokens_per_text for token in text_tokens]
+
+        hashes = np.fromiter(map(zlib.crc32, map(str.encode, tokens)), dtype=np.uint64, count=len(tokens))
+        rows = np.repeat(np.arange(len(texts), dtype=np.int64), lengths)
+
+        # N-gram hashes are rolled from the token hashes so they never leave numpy;
+        # windows that would span two texts are dropped
+        all_hashes, all_rows = [hashes], [rows]
+        for n in range(2, self.ngram_max + 1):
+            count = len(tokens) - n + 1
+            if count <= 0:
+                break
+            combined = hashes[:count] ^ np.uint64(n)
+            for offset in range(1, n):
+                combined = (combined * NGRAM_MULTIPLIER + hashes[offset:offset + count]) & HASH_MASK
+            same_text = rows[:count] == rows[n - 1:]
+            all_hashes.append(combined[same_text])
+            all_rows.append(rows[:count][same_text])
+
+        return np.concatenate(all_hashes).astype(np.int64), np.concatenate(all_rows)
+
+    def embed_batch(self, texts: List[str]) -> np.ndarray:
+        """Embed texts into an (n, dimension) float32 matrix of unit vectors"""
+        hashes, rows = self._hash_features(texts)
+        buckets = hashes % self.dimension
+        signs = np.where((hashes // self.dimension) & 1, -1.0, 1.0)
+
+        counts = np.bincount(
+            rows * self.dimension + buckets,
+            weights=signs,
+            minlength=len(texts) * self.dimension
+        ).reshape(len(texts), self.dimension)
+        matrix = np.sign(counts) * np.log1p(np.abs(counts))
+
+        return self.normalize(matrix)
+
+    def embed(self, text: str, idf: Optional[np.ndarray] = None) -> np.ndarray:
+        """Embed a single text, optionally re-weighting buckets by IDF"""
+        embedding = self.embed_batch([text])
+        if idf is not None:
+            embedding = self.normalize(embedding * idf)
+        return embedding[0]
+
+    @staticmethod
+    def idf(document_frequency: np.ndarray, document_count: int) -> np.ndarray:
+        """Smoothed inverse document frequency per bucket"""
+        return (np.log((1 + document_count) / (1 + document_frequency)) + 1).astype(np.float32)
+
+    @staticmethod
+    def normalize(matrix: np.ndarray) -> np.ndarray:
+        """L2-normalise each row, leaving all-zero rows untouched"""
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1
+        return (matrix / norms).astype(np.float32)
@@ -335,6 +335,7 @@ class LearningAnalytics:
             
             # Get enrollment statistics
             from ..models.learning import Enrollment
+            from .enrollment_progress import progress_by_enrollment
             enrollments = self.db.query(Enrollment).filter(Enrollment.course_id == course_id).all()
             
             total_enrollments = len(enrollments)
@@ -343,7 +344,8 @@ class LearningAnalytics:
             
             # Calculate average progress
             if enrollments:
-                avg_progress = sum(e.progress for e in enrollments) / len(enrollments)
+                progress = progress_by_enrollment(self.db, [e.id for e in enrollments])
+                avg_progress = sum(progress.values()) / len(enrollments)
             else:
                 avg_progress = 0
             
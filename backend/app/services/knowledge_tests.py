@@ -11,6 +11,7 @@ from sqlalchemy.orm import Session
 from ..models.learning import Assessment, AssessmentAttempt
 from ..models.course import CourseContent
 from ..core.config import settings
+from .analytics_cache import analytics_cache
 
 
 class KnowledgeTestGenerator:
@@ -215,6 +216,7 @@ class TestManager:
             )
             
             self.db.add(attempt)
+            analytics_cache.invalidate_on_commit(self.db)
             self.db.commit()
             
             return {
@@ -280,6 +282,7 @@ class TestManager:
             attempt.status = "completed"
             attempt.answers = answers
             
+            analytics_cache.invalidate_on_commit(self.db)
             self.db.commit()
             
             return {
@@ -0,0 +1,176 @@
+"""
+Message and Q&A Search
+Ranked, highlighted full-text search with keyset pagination
+"""
+
+import re
+import html
+from typing import Dict, List, NamedTuple, Optional
+
+from sqlalchemy import Float, and_, case, cast, desc, func, inspect, literal_column, or_
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import Query, Session
+
+from ..core.pagination import decode_cursor, encode_cursor
+from ..models.messaging import Message, QAPost
+
+SEARCH_CONFIG = literal_column("'english'::regconfig")
+# ts_headline marks matches with private-use characters so the snippet can be HTML-escaped afterwards
+START_SEL, STOP_SEL = "\ue000", "\ue001"
+HEADLINE_OPTIONS = f"StartSel={START_SEL}, StopSel={STOP_SEL}, MaxWords=30, MinWords=10, MaxFragments=2"
+TERM_PATTERN = re.compile(r"\w+")
+# The SQLite fallback matches at most this many words of the query
+MAX_FALLBACK_TERMS = 8
+SNIPPET_RADIUS = 80
+
+# Searchable (title, body) columns per model; the Postgres search_vector column is built from them
+SEARCH_FIELDS = {
+    Message: (Message.subject, Message.content),
+    QAPost: (QAPost.title, QAPost.content),
+}
+
+_vector_columns: Dict[str, bool] = {}
+
+
+class SearchHit(NamedTuple):
+    """Relevance and highlighted snippet for a matching row"""
+    rank: float
+    highlight: str
+
+
+class SearchPage(NamedTuple):
+    """One page of search results in rank order"""
+    items: List
+    hits: Dict[int, SearchHit]
+    next_cursor: Optional[str]
+
+
+def search(db: Session, query: Query, model, terms: str, limit: int,
+           cursor: Optional[str] = None) -> SearchPage:
+    """Run a full-text search over an already filtered query of ``model``.
+
+    Results are ordered by rank, then id, and paginated on that key: pass the
+    returned ``next_cursor`` back to get the following page. On Postgres this
+    uses the GIN-indexed ``search_vector`` column with ``websearch_to_tsquery``
+    syntax and ``ts_headline`` snippets; other databases fall back to matching
+    every word with LIKE. Raises ValueError for a malformed cursor.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        match, rank, headline = _postgres_terms(db, model, terms)
+    else:
+        match, rank, headline = _fallback_terms(model, terms)
+    if match is None:
+        return SearchPage([], {}, None)
+
+    rank = rank.label("search_rank")
+    query = query.filter(match).add_columns(rank)
+    if headline is not None:
+        query = query.add_columns(headline.label("search_headline"))
+
+    if cursor:
+        last_rank, last_id = decode_cursor(cursor, 2)
+        query = query.filter(or_(rank < last_rank, and_(rank == last_rank, model.id < last_id)))
+
+    rows = query.order_by(desc(rank), desc(model.id)).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    items, hits = [], {}
+    for row in rows:
+        item = row[0]
+        item_rank = float(row[1])
+        if headline is not None:
+            highlight = _mark(row[2] or "")
+        else:
+            highlight = _highlight(SEARCH_FIELDS[model], item, terms)
+        items.append(item)
+        hits[item.id] = SearchHit(item_rank, highlight or "")
+
+    next_cursor = encode_cursor(float(rows[-1][1]), rows[-1][0].id) if has_more else None
+    return SearchPage(items, hits, next_cursor)
+
+
+def _postgres_terms(db: Session, model, terms: str):
+    """Match, rank and headline expressions using the tsvector column"""
+    title, body = SEARCH_FIELDS[model]
+    tsquery = func.websearch_to_tsquery(SEARCH_CONFIG, terms)
+    vector = _search_vector(db, model)
+    headline = func.ts_headline(
+        SEARCH_CONFIG, func.coalesce(title, "") + " — " + func.coalesce(body, ""), tsquery, HEADLINE_OPTIONS
+    )
+    # ts_rank_cd is float4; as double precision the rank survives the cursor round trip exactly
+    rank = cast(func.ts_rank_cd(vector, tsquery), Float)
+    return vector.op("@@")(tsquery), rank, headline
+
+
+def _search_vector(db: Session, model):
+    """The generated ``search_vector`` column, or the same expression computed inline.
+
+    Tables created with ``create_all`` rather than the migration have no
+    generated column; search still works there, just without the GIN index.
+    """
+    table = model.__tablename__
+    if table not in _vector_columns:
+        columns = inspect(db.get_bind()).get_columns(table)
+        _vector_columns[table] = any(column["name"] == "search_vector" for column in columns)
+
+    if _vector_columns[table]:
+        return literal_column(f"{table}.search_vector", type_=TSVECTOR)
+
+    title, body = SEARCH_FIELDS[model]
+    return func.setweight(func.to_tsvector(SEARCH_CONFIG, func.coalesce(title, "")), literal_column("'A'")).op("||")(
+        func.setweight(func.to_tsvector(SEARCH_CONFIG, func.coalesce(body, "")), literal_column("'B'"))
+    )
+
+
+def _fallback_terms(model, terms: str):
+    """Every query word must appear; title hits weigh double (no headline expression)"""
+    words = _words(terms)
+    if not words:
+        return None, None, None
+
+    title, body = SEARCH_FIELDS[model]
+    match = and_(*[or_(title.ilike(f"%{word}%"), body.ilike(f"%{word}%")) for word in words])
+    rank = sum(
+        case((title.ilike(f"%{word}%"), 2.0), else_=0.0) + case((body.ilike(f"%{word}%"), 1.0), else_=0.0)
+        for word in words
+    )
+    return match, cast(rank / (2.0 + len(words)), Float), None
+
+
+def _mark(headline: str) -> str:
+    """Escape a ts_headline snippet and turn its match delimiters into <mark> tags"""
+    return html.escape(headline).replace(START_SEL, "<mark>").replace(STOP_SEL, "</mark>")
+
+
+def _words(terms: str) -> List[str]:
+    """Distinct lower-case words of a search query"""
+    return list(dict.fromkeys(word.lower() for word in TERM_PATTERN.findall(terms)))[:MAX_FALLBACK_TERMS]
+
+
+def _highlight(fields, item, terms: str) -> str:
+    """ts_headline-style snippet: escaped text around the first match with <mark> tags"""
+    words = _words(terms)
+    title_column, body_column = fields
+    title = getattr(item, title_column.key) or ""
+    body = getattr(item, body_column.key) or ""
+    if not words:
+        return html.escape(body[:2 * SNIPPET_RADIUS])
+
+    pattern = re.compile("|".join(re.escape(word) for word in words), re.IGNORECASE)
+    match = pattern.search(body)
+    if match is None:
+        text = title
+    else:
+        start = max(0, match.start() - SNIPPET_RADIUS)
+        end = min(len(body), match.end() + SNIPPET_RADIUS)
+        text = ("…" if start else "") + body[start:end] + ("…" if end < len(body) else "")
+
+    parts = []
+    position = 0
+    for found in pattern.finditer(text):
+        parts.append(html.escape(text[position:found.start()]))
+        parts.append(f"<mark>{html.escape(found.group())}</mark>")
+        position = found.end()
+    parts.append(html.escape(text[position:]))
+    return "".join(parts)
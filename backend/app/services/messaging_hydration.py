@@ -0,0 +1,160 @@
+"""
+Messaging Response Hydration
+Builds message, Q&A post and notification responses for a whole page in a fixed number of queries
+"""
+
+from typing import Dict, Iterable, List, Optional
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from ..models.user import User
+from ..models.course import Course
+from ..models.messaging import Message, QAPost, QAVote, Notification
+from ..schemas.messaging import MessageResponse, QAPostResponse, NotificationResponse
+from .message_search import SearchHit
+
+
+def _ids(values: Iterable[Optional[int]]) -> List[int]:
+    """Distinct non-null ids"""
+    return list({value for value in values if value is not None})
+
+
+def load_user_emails(db: Session, user_ids: Iterable[Optional[int]]) -> Dict[int, str]:
+    """Map user id -> email with one IN-list query"""
+    ids = _ids(user_ids)
+    if not ids:
+        return {}
+    return dict(db.query(User.id, User.email).filter(User.id.in_(ids)).all())
+
+
+def load_course_titles(db: Session, course_ids: Iterable[Optional[int]]) -> Dict[int, str]:
+    """Map course id -> title with one IN-list query"""
+    ids = _ids(course_ids)
+    if not ids:
+        return {}
+    return dict(db.query(Course.id, Course.title).filter(Course.id.in_(ids)).all())
+
+
+def load_message_reply_counts(db: Session, message_ids: List[int]) -> Dict[int, int]:
+    """Map message id -> number of replies with one grouped count"""
+    if not message_ids:
+        return {}
+    return dict(
+        db.query(Message.parent_message_id, func.count(Message.id))
+        .filter(Message.parent_message_id.in_(message_ids))
+        .group_by(Message.parent_message_id)
+        .all()
+    )
+
+
+def load_user_votes(db: Session, post_ids: List[int], user_id: int) -> Dict[int, str]:
+    """Map post id -> the user's own vote with one IN-list query"""
+    if not post_ids:
+        return {}
+    return dict(
+        db.query(QAVote.post_id, QAVote.vote_type)
+        .filter(QAVote.post_id.in_(post_ids), QAVote.user_id == user_id)
+        .all()
+    )
+
+
+def _search_fields(hits: Optional[Dict[int, SearchHit]], item_id: int) -> Dict[str, object]:
+    """Rank and highlight response fields for a search hit"""
+    hit = hits.get(item_id) if hits else None
+    if hit is None:
+        return {}
+    return {"search_rank": hit.rank, "highlight": hit.highlight}
+
+
+def hydrate_messages(messages: List[Message], db: Session,
+                     hits: Optional[Dict[int, SearchHit]] = None) -> List[MessageResponse]:
+    """Format a page of messages using four queries in total"""
+    emails = load_user_emails(db, [m.sender_id for m in messages] + [m.recipient_id for m in messages])
+    course_titles = load_course_titles(db, [m.course_id for m in messages])
+    reply_counts = load_message_reply_counts(db, [m.id for m in messages])
+
+    return [
+        MessageResponse(
+            id=message.id,
+            sender_id=message.sender_id,
+            recipient_id=message.recipient_id,
+            subject=message.subject,
+            content=message.content,
+            message_type=message.message_type,
+            course_id=message.course_id,
+            parent_message_id=message.parent_message_id,
+            is_read=message.is_read,
+            is_archived=message.is_archived,
+            attachments=message.attachments,
+            created_at=message.created_at,
+            updated_at=message.updated_at,
+            sender_name=emails.get(message.sender_id),
+            recipient_name=emails.get(message.recipient_id),
+            course_title=course_titles.get(message.course_id),
+            reply_count=reply_counts.get(message.id, 0),
+            **_search_fields(hits, message.id)
+        )
+        for message in messages
+    ]
+
+
+def hydrate_qa_posts(posts: List[QAPost], user_id: int, db: Session,
+                     hits: Optional[Dict[int, SearchHit]] = None) -> List[QAPostResponse]:
+    """Format a page of Q&A posts using three queries in total.
+
+    Reply counts and vote scores come from the posts' own counter columns.
+    """
+    emails = load_user_emails(db, [post.author_id for post in posts])
+    course_titles = load_course_titles(db, [post.course_id for post in posts])
+    user_votes = load_user_votes(db, [post.id for post in posts], user_id)
+
+    return [
+        QAPostResponse(
+            id=post.id,
+            course_id=post.course_id,
+            author_id=post.author_id,
+            title=post.title,
+            content=post.content,
+            post_type=post.post_type,
+            parent_post_id=post.parent_post_id,
+            is_pinned=post.is_pinned,
+            is_resolved=post.is_resolved,
+            is_archived=post.is_archived,
+            tags=post.tags,
+            attachments=post.attachments,
+            view_count=post.view_count,
+            created_at=post.created_at,
+            updated_at=post.updated_at,
+            author_name=emails.get(post.author_id),
+            course_title=course_titles.get(post.course_id),
+            reply_count=post.reply_count or 0,
+            vote_score=post.vote_score or 0,
+            user_vote=user_votes.get(post.id),
+            **_search_fields(hits, post.id)
+        )
+        for post in posts
+    ]
+
+
+def hydrate_notifications(notifications: List[Notification], db: Session) -> List[NotificationResponse]:
+    """Format a page of notifications using one query in total"""
+    course_titles = load_course_titles(db, [n.course_id for n in notifications])
+
+    return [
+        NotificationResponse(
+            id=notification.id,
+            user_id=notification.user_id,
+            title=notification.title,
+            content=notification.content,
+            notification_type=notification.notification_type,
+            related_entity_type=notification.related_entity_type,
+            related_entity_id=notification.related_entity_id,
+            course_id=notification.course_id,
+            is_read=notification.is_read,
+            is_archived=notification.is_archived,
+            created_at=notification.created_at,
+            read_at=notification.read_at,
+            course_title=course_titles.get(notification.course_id)
+        )
+        for notification in notifications
+    ]
@@ -0,0 +1,233 @@
+"""
+Notification Broker
+Fans real-time notification events out to SSE connections across all workers
+"""
+
+import json
+import asyncio
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple
+
+import redis
+import redis.asyncio as aioredis
+
+from ..core.config import settings
+
+CHANNEL = "notifications:events"
+BUFFER_KEY = "notifications:buffer:{user_id}"
+# Replay buffers outlive any reasonable reconnect gap
+BUFFER_TTL_SECONDS = 24 * 60 * 60
+
+Event = Tuple[int, Dict[str, Any]]
+
+
+class Subscription:
+    """One SSE connection's bounded queue of pending events"""
+
+    def __init__(self, user_id: int, loop: asyncio.AbstractEventLoop):
+        self.user_id = user_id
+        self.loop = loop
+        self.queue: "asyncio.Queue[Event]" = asyncio.Queue(maxsize=settings.sse_queue_size)
+        self.overflowed = False
+
+    def offer(self, event: Event) -> None:
+        """Queue an event; a consumer that falls a full queue behind is cut off"""
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # The client reconnects with Last-Event-ID and catches up from the replay buffer
+            self.overflowed = True
+
+
+class NotificationBroker:
+    """Publishes notification events to every connection of a user.
+
+    With Redis reachable, events go through a pub/sub channel that each worker
+    listens on, and the bounded per-user replay buffer lives in Redis so a client
+    can reconnect to any worker. Without Redis (single-worker development) the
+    same API works in process. Event ids are notification ids, so they increase
+    per user and double as ``Last-Event-ID`` values.
+    """
+
+    def __init__(self):
+        self._subscriptions: Dict[int, Set[Subscription]] = {}
+        self._buffers: Dict[int, Deque[Event]] = {}
+        self._lock = threading.Lock()
+        self._redis: Optional[redis.Redis] = None
+        self._backend: Optional[str] = None
+        self._listener: Optional[asyncio.Task] = None
+        self._listener_ready: Optional[asyncio.Event] = None
+        # One thread keeps publishes in order while their Redis round trips stay off the event loop
+        self._publisher = ThreadPoolExecutor(max_workers=1, thread_name_prefix="notification-publish")
+
+    @property
+    def backend(self) -> str:
+        """'redis' or 'memory', decided on first use"""
+        if self._backend is None:
+            with self._lock:
+                if self._backend is None:
+                    self._backend = self._select_backend()
+        return self._backend
+
+    async def _resolve_backend(self) -> str:
+        """``backend`` from async code: the first choice pings Redis in a thread, not on the event loop"""
+        if self._backend is None:
+            return await asyncio.to_thread(lambda: self.backend)
+        return self._backend
+
+    def _select_backend(self) -> str:
+        """Use Redis when configured and reachable, otherwise stay in process"""
+        if settings.sse_broker == "memory" or not settings.redis_url:
+            return "memory"
+        try:
+            client = redis.from_url(settings.redis_url, socket_connect_timeout=1)
+            client.ping()
+            self._redis = client
+            return "redis"
+        except Exception as e:
+            if settings.sse_broker == "redis":
+                raise
+            print(f"Redis unavailable for notifications, using in-process broker: {e}")
+            return "memory"
+
+    def publish(self, user_id: int, event_id: int, data: Dict[str, Any]) -> None:
+        """Send an event to all of a user's connections, on any worker"""
+        self.publish_many([(user_id, event_id, data)])
+
+    def publish_many(self, events: List[Tuple[int, int, Dict[str, Any]]]) -> None:
+        """Send ``(user_id, event_id, data)`` events in one pass (one Redis round trip).
+
+        Called from a request handler, the Redis work runs on a publisher thread
+        so the event loop is not blocked; errors are then logged, not raised.
+        """
+        if not events:
+            return
+
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            self._publish(events)
+            return
+        if self._backend == "memory":
+            self._publish(events)
+            return
+        self._publisher.submit(self._publish, events).add_done_callback(self._publish_done)
+
+    def _publish(self, events: List[Tuple[int, int, Dict[str, Any]]]) -> None:
+        if self.backend == "redis":
+            pipe = self._redis.pipeline(transaction=False)
+            for user_id, event_id, data in events:
+                key = BUFFER_KEY.format(user_id=user_id)
+                message = json.dumps({"user_id": user_id, "id": event_id, "data": data})
+                pipe.rpush(key, message)
+                pipe.ltrim(key, -settings.sse_replay_buffer_size, -1)
+                pipe.expire(key, BUFFER_TTL_SECONDS)
+                pipe.publish(CHANNEL, message)
+            pipe.execute()
+            return
+
+        with self._lock:
+            for user_id, event_id, data in events:
+                buffer = self._buffers.setdefault(user_id, deque(maxlen=settings.sse_replay_buffer_size))
+                buffer.append((event_id, data))
+        for user_id, event_id, data in events:
+            self._deliver(user_id, (event_id, data))
+
+    @staticmethod
+    def _publish_done(future: Future) -> None:
+        error = future.exception()
+        if error is not None:
+            print(f"Failed to publish real-time notifications: {str(error)}")
+
+    async def subscribe(self, user_id: int) -> Subscription:
+        """Register a new connection for a user"""
+        subscription = Subscription(user_id, asyncio.get_running_loop())
+        with self._lock:
+            self._subscriptions.setdefault(user_id, set()).add(subscription)
+        if await self._resolve_backend() == "redis":
+            await self._ensure_listener()
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        """Forget a closed connection"""
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.user_id)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.user_id]
+
+    async def replay(self, user_id: int, last_event_id: int) -> List[Event]:
+        """Buffered events newer than ``last_event_id``, oldest first"""
+        if await self._resolve_backend() == "redis":
+            messages = await asyncio.to_thread(self._redis.lrange, BUFFER_KEY.format(user_id=user_id), 0, -1)
+            events = [json.loads(message) for message in messages]
+            buffered = [(event["id"], event["data"]) for event in events]
+        else:
+            with self._lock:
+                buffered = list(self._buffers.get(user_id, ()))
+
+        return [event for event in buffered if event[0] > last_event_id]
+
+    def connection_count(self, user_id: Optional[int] = None) -> int:
+        """Open connections on this worker, for one user or in total"""
+        with self._lock:
+            if user_id is not None:
+                return len(self._subscriptions.get(user_id, ()))
+            return sum(len(subscriptions) for subscriptions in self._subscriptions.values())
+
+    def _deliver(self, user_id: int, event: Event) -> None:
+        """Hand an event to this worker's connections for the user"""
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(user_id, ()))
+
+        for subscription in subscriptions:
+            try:
+                running_loop = asyncio.get_running_loop()
+            except RuntimeError:
+                running_loop = None
+            if running_loop is subscription.loop:
+                subscription.offer(event)
+            else:
+                # Published from a worker thread; queues belong to the event loop
+                subscription.loop.call_soon_threadsafe(subscription.offer, event)
+
+    async def _ensure_listener(self) -> None:
+        """Start this worker's pub/sub listener once and wait until it is subscribed"""
+        if self._listener is None or self._listener.done():
+            self._listener_ready = asyncio.Event()
+            self._listener = asyncio.get_running_loop().create_task(self._listen())
+        try:
+            # Otherwise events published before the channel subscription lands are missed
+            await asyncio.wait_for(self._listener_ready.wait(), timeout=1)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _listen(self) -> None:
+        """Relay channel messages to local connections, reconnecting on errors"""
+        while True:
+            client = aioredis.from_url(settings.redis_url)
+            try:
+                async with client.pubsub() as pubsub:
+                    await pubsub.subscribe(CHANNEL)
+                    self._listener_ready.set()
+                    async for message in pubsub.listen():
+                        if message.get("type") != "message":
+                            continue
+                        event = json.loads(message["data"])
+                        self._deliver(event["user_id"], (event["id"], event["data"]))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Notification listener error, reconnecting: {e}")
+                await asyncio.sleep(1)
+            finally:
+                await client.aclose()
+
+
+# One broker per worker process
+notification_broker = NotificationBroker()
@@ -0,0 +1,160 @@
+"""
+Notification Dispatch
+Creates notifications for many recipients at once: one INSERT, one preference lookup and one real-time push
+"""
+
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from ..core.config import settings
+from ..core.email import email_service
+from ..models.user import User
+from ..models.messaging import Notification
+from .email_queue import enqueue_notification_emails
+from .messaging_hydration import load_course_titles
+from .notification_broker import notification_broker
+
+# Notification types mapped to the preference keys users can switch off
+PREFERENCE_KEYS = {
+    "message": "messages",
+    "qa_reply": "qa_replies",
+    "course_update": "course_updates",
+    "test_result": "test_results",
+    "system": "system"
+}
+
+
+def notification_action_url(notification_type: str, course_id: Optional[int]) -> Optional[str]:
+    """Frontend link for a notification email"""
+    if notification_type == "message":
+        return "http://localhost:3000/messaging"
+    if notification_type == "qa_reply":
+        return f"http://localhost:3000/courses/{course_id}/qa" if course_id else "http://localhost:3000/qa"
+    if notification_type == "course_update":
+        return f"http://localhost:3000/courses/{course_id}" if course_id else "http://localhost:3000/courses"
+    return None
+
+
+def create_notifications(
+    db: Session,
+    user_ids: Iterable[int],
+    title: str,
+    content: str,
+    notification_type: str,
+    related_entity_type: Optional[str] = None,
+    related_entity_id: Optional[int] = None,
+    course_id: Optional[int] = None,
+    send_email: bool = True
+) -> List[Notification]:
+    """Create the same notification for every user and commit.
+
+    The rows go in as one multi-row INSERT ... RETURNING, recipients' email
+    preferences are read in one query, emails are queued in one more INSERT, and
+    the real-time events are published in a single broker round trip.
+    """
+    recipients = list(dict.fromkeys(user_ids))
+    if not recipients:
+        return []
+
+    notifications = db.scalars(
+        insert(Notification).returning(Notification),
+        [
+            {
+                "user_id": user_id,
+                "title": title,
+                "content": content,
+                "notification_type": notification_type,
+                "related_entity_type": related_entity_type,
+                "related_entity_id": related_entity_id,
+                "course_id": course_id,
+                "is_read": False,
+                "is_archived": False
+            }
+            for user_id in recipients
+        ]
+    ).all()
+
+    if send_email:
+        try:
+            # In a savepoint, so a failed enqueue cannot abort the notifications' transaction
+            with db.begin_nested():
+                _queue_emails(db, recipients, title, content, notification_type, course_id)
+        except Exception as e:
+            print(f"Failed to queue email notifications: {str(e)}")
+
+    # Built before the commit expires the returned rows
+    events = [
+        (notification.user_id, notification.id, _event_data(notification))
+        for notification in notifications
+    ]
+    db.commit()
+
+    # Send real-time notifications to every connection of the users, on any worker
+    try:
+        notification_broker.publish_many(events)
+    except Exception as e:
+        print(f"Failed to publish real-time notifications: {str(e)}")
+
+    return notifications
+
+
+def _event_data(notification: Notification) -> Dict[str, Any]:
+    """Real-time event payload for a notification"""
+    return {
+        "id": notification.id,
+        "title": notification.title,
+        "content": notification.content,
+        "notification_type": notification.notification_type,
+        "is_read": notification.is_read,
+        "created_at": notification.created_at.isoformat() if notification.created_at else None,
+        "course_id": notification.course_id
+    }
+
+
+def _queue_emails(db: Session, user_ids: List[int], title: str, content: str,
+                  notification_type: str, course_id: Optional[int]) -> None:
+    """Send (or queue) emails for the recipients whose preferences allow it"""
+    if not email_service.is_configured:
+        return
+
+    pref_key = PREFERENCE_KEYS.get(notification_type, "system")
+    users = (
+        db.query(User.id, User.email, User.notification_preferences)
+        .filter(User.id.in_(user_ids), User.email_notifications.is_(True), User.email.isnot(None))
+        .all()
+    )
+    # Default to True if a preference is not set
+    recipients = [user for user in users if (user.notification_preferences or {}).get(pref_key, True)]
+    if not recipients:
+        return
+
+    course_title = load_course_titles(db, [course_id]).get(course_id)
+    action_url = notification_action_url(notification_type, course_id)
+
+    if not settings.email_queue_enabled:
+        for user in recipients:
+            email_service.send_notification_email(
+                to_email=user.email,
+                notification_type=notification_type,
+                title=title,
+                content=content,
+                course_title=course_title,
+                action_url=action_url
+            )
+        return
+
+    # The background email worker sends them, batched with any other pending notifications
+    enqueue_notification_emails(db, [
+        {
+            "user_id": user.id,
+            "to_email": user.email,
+            "notification_type": notification_type,
+            "title": title,
+            "content": content,
+            "course_title": course_title,
+            "action_url": action_url
+        }
+        for user in recipients
+    ])
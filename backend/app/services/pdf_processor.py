@@ -10,14 +10,15 @@ from pathlib import Path
 from datetime import datetime
 import aiofiles
 from fastapi import UploadFile, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from PIL import Image
-import PyPDF2
 import magic
 from sqlalchemy.orm import Session
 
 from ..core.config import settings
 from ..models.course import CourseFileContent, Course
 from ..models.learning import LearningSession, Enrollment
+from .pdf_text_extractor import pdf_text_extractor
 
 
 class PDFProcessor:
@@ -84,33 +85,23 @@ class PDFProcessor:
     async def _extract_pdf_content(self, file_path: Path) -> Dict[str, Any]:
         """Extract content and metadata from PDF"""
         try:
-            with open(file_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                
-                # Extract metadata
-                metadata = pdf_reader.metadata or {}
-                
-                # Extract text from all pages
-                text_content = []
-                for page_num, page in enumerate(pdf_reader.pages):
-                    try:
-                        text = page.extract_text()
-                        if text.strip():
-                            text_content.append({
-                                "page": page_num + 1,
-                                "text": text.strip()
-                            })
-                    except Exception as e:
-                        print(f"Error extracting text from page {page_num + 1}: {e}")
-                
-                return {
-                    "page_count": len(pdf_reader.pages),
-                    "title": metadata.get("Title", ""),
-                    "author": metadata.get("Author", ""),
-                    "subject": metadata.get("Subject", ""),
-                    "creator": metadata.get("Creator", ""),
-                    "text_content": text_content
-                }
+            # Parse off the event loop; the result is cached for embedding and generation
+            extracted = await run_in_threadpool(pdf_text_extractor.extract, file_path)
+            
+            text_content = [
+                {"page": page_num, "text": text.strip()}
+                for page_num, text in enumerate(extracted["pages"], start=1)
+                if text.strip()
+            ]
+            
+            return {
+                "page_count": extracted["page_count"],
+                "title": extracted["metadata"]["title"],
+                "author": extracted["metadata"]["author"],
+                "subject": extracted["metadata"]["subject"],
+                "creator": extracted["metadata"]["creator"],
+                "text_content": text_content
+            }
         except Exception as e:
             raise HTTPException(
                 status_code=400,
@@ -0,0 +1,192 @@
+"""
+PDF Text Extraction Service
+Shared, cached and page-parallel text extraction for course PDFs
+"""
+
+import os
+import json
+import hashlib
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Union
+
+from ..core.config import settings
+from ..core.cache import TTLCache
+
+HASH_BLOCK_SIZE = 1024 * 1024
+
+
+class PDFPage(NamedTuple):
+    """Text of a single PDF page (1-based page number)"""
+    number: int
+    text: str
+
+
+def _extract_page_range(file_path: str, start: int, stop: int) -> List[str]:
+    """Extract the text of pages [start, stop); runs inside pool workers"""
+    import PyPDF2
+
+    texts = []
+    with open(file_path, 'rb') as file:
+        pdf_reader = PyPDF2.PdfReader(file)
+        for page_num in range(start, stop):
+            try:
+                texts.append(pdf_reader.pages[page_num].extract_text() or "")
+            except Exception as e:
+                print(f"Error extracting text from page {page_num + 1}: {e}")
+                texts.append("")
+    return texts
+
+
+class PDFTextExtractor:
+    """Extracts PDF text once per file content and streams it page by page.
+
+    Results are cached under the SHA-256 of the file bytes, in memory and on
+    disk, so the same workbook is parsed a single time whether it is reached
+    through upload, embedding or test generation, and from any worker process.
+    With ``pdf_extract_workers`` above 1, large PDFs are split into page ranges
+    and extracted in a process pool; by default pages are extracted in process,
+    so web workers do not fork a pool alongside the loaded models.
+    """
+
+    def __init__(self, cache_path: Optional[str] = None, workers: Optional[int] = None,
+                 parallel_min_pages: Optional[int] = None, pages_per_task: Optional[int] = None):
+        self.cache_path = Path(cache_path or settings.pdf_text_cache_path)
+        workers = workers if workers is not None else settings.pdf_extract_workers
+        # A pool only pays off with spare cores
+        self.workers = min(workers, os.cpu_count() or 1)
+        self.parallel_min_pages = parallel_min_pages or settings.pdf_parallel_min_pages
+        self.pages_per_task = pages_per_task or settings.pdf_pages_per_task
+        self.memory_cache = TTLCache(settings.pdf_text_cache_size, settings.pdf_text_cache_ttl_seconds)
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+
+    @staticmethod
+    def file_hash(file_path: Union[str, Path]) -> str:
+        """SHA-256 of the file contents"""
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as file:
+            for block in iter(lambda: file.read(HASH_BLOCK_SIZE), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def iter_pages(self, file_path: Union[str, Path]) -> Iterator[PDFPage]:
+        """Yield each page's text in order, from the cache when possible"""
+        content_hash = self.file_hash(file_path)
+        cached = self._load_cached(content_hash)
+        if cached is None:
+            yield from self._extract_pages(file_path, content_hash, {})
+            return
+
+        for number, text in enumerate(cached["pages"], start=1):
+            yield PDFPage(number, text)
+
+    def extract_text(self, file_path: Union[str, Path]) -> str:
+        """Full document text with one line break between pages"""
+        return "\n".join(page.text for page in self.iter_pages(file_path))
+
+    def extract(self, file_path: Union[str, Path]) -> Dict[str, Any]:
+        """Page count, document metadata and per-page text"""
+        content_hash = self.file_hash(file_path)
+        extracted = self._load_cached(content_hash)
+        if extracted is None:
+            extracted = {}
+            for _ in self._extract_pages(file_path, content_hash, extracted):
+                pass
+        return extracted
+
+    def _extract_pages(self, file_path: Union[str, Path], content_hash: str,
+                       extracted: Dict[str, Any]) -> Iterator[PDFPage]:
+        """Parse the PDF, yielding pages as they arrive and caching the finished result"""
+        import PyPDF2
+
+        with open(file_path, 'rb') as file:
+            pdf_reader = PyPDF2.PdfReader(file)
+            page_count = len(pdf_reader.pages)
+            info = pdf_reader.metadata
+            extracted["page_count"] = page_count
+            extracted["metadata"] = {
+                field: str(getattr(info, field, None) or "")
+                for field in ("title", "author", "subject", "creator")
+            }
+            extracted["pages"] = []
+
+            if self.workers > 1 and page_count >= self.parallel_min_pages:
+                page_texts = self._extract_parallel(str(file_path), page_count)
+            else:
+                page_texts = self._extract_serial(pdf_reader, page_count)
+
+            for number, text in enumerate(page_texts, start=1):
+                extracted["pages"].append(text)
+                yield PDFPage(number, text)
+
+        # Only a fully extracted document is cached
+        self._store_cached(content_hash, extracted)
+
+    def _extract_serial(self, pdf_reader, page_count: int) -> Iterator[str]:
+        """Extract pages one at a time in this process"""
+        for page_num in range(page_count):
+            try:
+                yield pdf_reader.pages[page_num].extract_text() or ""
+            except Exception as e:
+                print(f"Error extracting text from page {page_num + 1}: {e}")
+                yield ""
+
+    def _extract_parallel(self, file_path: str, page_count: int) -> Iterator[str]:
+        """Fan page ranges out to the process pool, yielding results in page order"""
+        ranges = [
+            (start, min(start + self.pages_per_task, page_count))
+            for start in range(0, page_count, self.pages_per_task)
+        ]
+        futures = [
+            self._get_pool().submit(_extract_page_range, file_path, start, stop)
+            for start, stop in ranges
+        ]
+        try:
+            for future in futures:
+                yield from future.result()
+        finally:
+            for future in futures:
+                future.cancel()
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        """Create the worker pool on first use"""
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        return self._pool
+
+    def _load_cached(self, content_hash: str) -> Optional[Dict[str, Any]]:
+        """Look up extracted text in memory, then on disk"""
+        cached = self.memory_cache.get(content_hash)
+        if cached is not None:
+            return cached
+
+        cache_file = self.cache_path / f"{content_hash}.json"
+        try:
+            with open(cache_file, 'r') as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        self.memory_cache.set(content_hash, cached)
+        return cached
+
+    def _store_cached(self, content_hash: str, extracted: Dict[str, Any]) -> None:
+        """Save extracted text in memory and atomically on disk"""
+        self.memory_cache.set(content_hash, extracted)
+        try:
+            self.cache_path.mkdir(parents=True, exist_ok=True)
+            cache_file = self.cache_path / f"{content_hash}.json"
+            tmp_file = cache_file.with_name(f"{cache_file.name}.{os.getpid()}.tmp")
+            with open(tmp_file, 'w') as f:
+                json.dump(extracted, f)
+            os.replace(tmp_file, cache_file)
+        except OSError as e:
+            print(f"Error caching extracted PDF text: {e}")
+
+
+# One extractor (and, when configured, worker pool) per process, shared by every service
+pdf_text_extractor = PDFTextExtractor()
@@ -0,0 +1,97 @@
+"""
+Q&A Post Counters
+Incremental maintenance and reconciliation of the denormalised reply and vote counters on QAPost
+"""
+
+from typing import Optional
+from sqlalchemy import func, case, or_, update
+from sqlalchemy.orm import Session, aliased
+
+from ..models.messaging import QAPost, QAVote
+
+VOTE_DELTAS = {"up": (1, 0), "down": (0, 1)}
+
+
+def apply_vote_change(db: Session, post_id: int, old_vote: Optional[str], new_vote: Optional[str]) -> None:
+    """Adjust a post's vote counters for a vote being added, changed or removed.
+
+    The update is a single relative UPDATE, so concurrent voters never overwrite
+    each other's increments. The caller commits.
+    """
+    old_up, old_down = VOTE_DELTAS.get(old_vote, (0, 0))
+    new_up, new_down = VOTE_DELTAS.get(new_vote, (0, 0))
+    up_delta, down_delta = new_up - old_up, new_down - old_down
+    if not up_delta and not down_delta:
+        return
+
+    db.execute(
+        update(QAPost)
+        .where(QAPost.id == post_id)
+        .values(
+            upvote_count=QAPost.upvote_count + up_delta,
+            downvote_count=QAPost.downvote_count + down_delta,
+            vote_score=QAPost.vote_score + up_delta - down_delta
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+
+def adjust_reply_count(db: Session, parent_post_id: Optional[int], delta: int) -> None:
+    """Add ``delta`` to a parent post's reply counter. The caller commits."""
+    if parent_post_id is None:
+        return
+
+    db.execute(
+        update(QAPost)
+        .where(QAPost.id == parent_post_id)
+        .values(reply_count=QAPost.reply_count + delta)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def reconcile_qa_counters(db: Session) -> int:
+    """Recompute every post's counters from votes and replies and repair drifted rows.
+
+    Returns the number of posts that were corrected.
+    """
+    votes = db.query(
+        QAVote.post_id.label("post_id"),
+        func.sum(case((QAVote.vote_type == "up", 1), else_=0)).label("upvotes"),
+        func.sum(case((QAVote.vote_type == "down", 1), else_=0)).label("downvotes")
+    ).group_by(QAVote.post_id).subquery()
+
+    reply = aliased(QAPost)
+    replies = db.query(
+        reply.parent_post_id.label("post_id"),
+        func.count(reply.id).label("replies")
+    ).filter(reply.parent_post_id.isnot(None)).group_by(reply.parent_post_id).subquery()
+
+    upvotes = func.coalesce(votes.c.upvotes, 0)
+    downvotes = func.coalesce(votes.c.downvotes, 0)
+    reply_count = func.coalesce(replies.c.replies, 0)
+
+    drifted = db.query(QAPost.id, upvotes, downvotes, reply_count).outerjoin(
+        votes, votes.c.post_id == QAPost.id
+    ).outerjoin(
+        replies, replies.c.post_id == QAPost.id
+    ).filter(or_(
+        QAPost.upvote_count != upvotes,
+        QAPost.downvote_count != downvotes,
+        QAPost.vote_score != upvotes - downvotes,
+        QAPost.reply_count != reply_count
+    )).all()
+
+    if drifted:
+        db.execute(update(QAPost), [
+            {
+                "id": post_id,
+                "upvote_count": up,
+                "downvote_count": down,
+                "vote_score": up - down,
+                "reply_count": replies_found
+            }
+            for post_id, up, down, replies_found in drifted
+        ])
+        db.commit()
+
+    return len(drifted)
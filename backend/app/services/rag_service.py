@@ -6,6 +6,7 @@ Handles document embedding, vector storage, and content retrieval
 import os
 import json
 import uuid
+import threading
 from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime
 import numpy as np
@@ -20,6 +21,14 @@ from pathlib import Path
 from ..models.course import CourseFileContent, Course
 from ..models.ai import ContentGeneration
 from ..core.config import settings
+from ..core.cache import TTLCache
+from .shared_embedder import SharedEmbedder
+from .pdf_text_extractor import pdf_text_extractor
+from .text_chunker import TextChunker
+from .vector_store import (
+    SegmentedVectorStore, VectorSegment, ChunkTable, PartitionedIndex, MINILM_STORE, embedder_store_path,
+    normalize_query
+)
 
 
 class DocumentEmbedder:
@@ -27,131 +36,220 @@ class DocumentEmbedder:
     
     def __init__(self):
         self.model = SentenceTransformer(settings.ai_embedding_model)
+        # Text beyond the model's sequence length is truncated, so chunks must fit in it
+        self.chunker = TextChunker(
+            min(settings.ai_chunk_max_tokens, self.model.max_seq_length - 2),
+            settings.ai_chunk_overlap_tokens,
+            self._count_tokens
+        )
         self.embedding_dim = settings.vector_dimension
-        self.vector_store_path = Path(settings.vector_store_path)
+        self.vector_store_path = embedder_store_path(MINILM_STORE)
         self.vector_store_path.mkdir(parents=True, exist_ok=True)
         self.index = None
-        self.document_metadata = {}
+        self.chunks = ChunkTable()
+        # The legacy single-file store predates the per-embedder stores and is imported into each
+        self.store = SegmentedVectorStore(self.vector_store_path, self.embedding_dim,
+                                          embed=self._encode_legacy,
+                                          legacy_path=Path(settings.vector_store_path))
+        self._lock = threading.RLock()
+        self.query_cache = TTLCache(settings.rag_query_cache_size, settings.rag_cache_ttl_seconds)
+        self.result_cache = TTLCache(settings.rag_result_cache_size, settings.rag_cache_ttl_seconds)
         self._load_vector_store()
     
     def _load_vector_store(self):
-        """Load existing vector store if available"""
-        index_path = self.vector_store_path / "faiss_index.bin"
-        metadata_path = self.vector_store_path / "metadata.json"
-        
-        if index_path.exists() and metadata_path.exists():
-            try:
-                self.index = faiss.read_index(str(index_path))
-                with open(metadata_path, 'r') as f:
-                    self.document_metadata = json.load(f)
-            except Exception as e:
-                print(f"Error loading vector store: {e}")
-                self._create_new_index()
-        else:
+        """Load existing vector store segments if available"""
+        self._create_new_index()
+        try:
+            segments = self.store.load()
+            # Reuse indexes saved by the rebuild command and only add newer chunks
+            covered_ids = self.index.load(self.vector_store_path / "indexes", self.store.next_id)
+            for segment in segments:
+                self._add_segment(segment, covered_ids)
+        except Exception as e:
+            print(f"Error loading vector store: {e}")
             self._create_new_index()
     
     def _create_new_index(self):
-        """Create a new FAISS index"""
-        self.index = faiss.IndexFlatIP(self.embedding_dim)  # Inner product for cosine similarity
-        self.document_metadata = {}
+        """Create a new set of per-course FAISS indexes keyed by chunk id"""
+        self.index = PartitionedIndex(self.embedding_dim)
+        self.chunks = ChunkTable()
     
-    def _save_vector_store(self):
-        """Save vector store to disk"""
-        try:
-            index_path = self.vector_store_path / "faiss_index.bin"
-            metadata_path = self.vector_store_path / "metadata.json"
-            
-            faiss.write_index(self.index, str(index_path))
-            with open(metadata_path, 'w') as f:
-                json.dump(self.document_metadata, f, indent=2)
-        except Exception as e:
-            print(f"Error saving vector store: {e}")
+    def _add_segment(self, segment: VectorSegment, covered_ids: int = 0):
+        """Add a stored segment's vectors and chunk metadata to the in-memory index"""
+        new_rows = segment.chunks["id"] >= covered_ids
+        if new_rows.any():
+            self.index.add(
+                segment.vectors[new_rows],
+                segment.chunks["id"][new_rows],
+                segment.chunks["course"][new_rows]
+            )
+        self.chunks.add_segment(segment)
+        # Cached results were computed against the previous index version
+        self.result_cache.clear()
+    
+    def _save_vector_store(self, embeddings: np.ndarray, documents: List[Dict[str, Any]]):
+        """Append newly embedded documents to the vector store and index them"""
+        # Persist the new segment first so the in-memory index never runs ahead of disk
+        with self._lock:
+            for segment in self.store.append(embeddings, documents):
+                self._add_segment(segment)
+    
+    def refresh(self) -> bool:
+        """Add segments written by other processes since the store was loaded"""
+        with self._lock:
+            segments = self.store.refresh()
+            for segment in segments:
+                self._add_segment(segment)
+            return bool(segments)
     
     def embed_document(self, content: str, document_id: str, metadata: Dict[str, Any]) -> bool:
         """Embed a document and add to vector store"""
+        return self.embed_documents([{
+            "content": content,
+            "document_id": document_id,
+            "metadata": metadata
+        }]) is not None
+    
+    def embed_documents(self, documents: List[Dict[str, Any]], batch_size: Optional[int] = None) -> Optional[int]:
+        """Embed several documents in mini-batches and add them to the vector store in one call.
+        
+        Each document is a dict with ``content``, ``document_id`` and ``metadata`` keys.
+        Returns the number of chunks added, or None if embedding failed.
+        """
         try:
-            # Split content into chunks for better retrieval
-            chunks = self._chunk_text(content, chunk_size=500, overlap=50)
-            
-            for i, chunk in enumerate(chunks):
-                # Generate embedding
-                embedding = self.model.encode([chunk])[0]
-                embedding = embedding.astype('float32')
-                
-                # Normalize for cosine similarity
-                faiss.normalize_L2(embedding.reshape(1, -1))
-                
-                # Add to index
-                self.index.add(embedding.reshape(1, -1))
-                
-                # Store metadata
-                chunk_id = f"{document_id}_chunk_{i}"
-                self.document_metadata[chunk_id] = {
-                    "document_id": document_id,
-                    "chunk_index": i,
-                    "content": chunk,
-                    "metadata": metadata,
-                    "created_at": datetime.now().isoformat()
-                }
-            
-            # Save updated vector store
-            self._save_vector_store()
-            return True
+            chunks = []
+            chunked_documents = []
+            
+            # Split every document up front so chunks from different documents share batches
+            for document in documents:
+                content = document["content"]
+                spans = self.chunker.chunk(content)
+                chunks.extend(content[start:end] for start, end in spans)
+                # The store keeps the document text once and chunk offsets into it
+                chunked_documents.append({
+                    "document_id": document["document_id"],
+                    "metadata": document["metadata"],
+                    "text": content,
+                    "spans": spans
+                })
+            
+            if not chunks:
+                return 0
+            
+            embeddings = self._encode_batch(chunks, batch_size or settings.ai_embedding_batch_size)
+            
+            # Store and index all vectors at once
+            self._save_vector_store(embeddings, chunked_documents)
+            return len(chunks)
             
         except Exception as e:
-            print(f"Error embedding document: {e}")
-            return False
+            print(f"Error embedding documents: {e}")
+            return None
     
-    def _chunk_text(self, text: str, chunk_size: int = 500, overlap: int = 50) -> List[str]:
-        """Split text into overlapping chunks"""
-        words = text.split()
-        chunks = []
+    def _encode_batch(self, texts: List[str], batch_size: int) -> np.ndarray:
+        """Encode texts in mini-batches into a single L2-normalised float32 matrix"""
+        embeddings = np.empty((len(texts), self.embedding_dim), dtype='float32')
         
-        for i in range(0, len(words), chunk_size - overlap):
-            chunk = " ".join(words[i:i + chunk_size])
-            if chunk.strip():
-                chunks.append(chunk.strip())
+        for start in range(0, len(texts), batch_size):
+            batch = texts[start:start + batch_size]
+            embeddings[start:start + len(batch)] = self.model.encode(
+                batch,
+                batch_size=batch_size,
+                convert_to_numpy=True,
+                show_progress_bar=False
+            )
         
-        return chunks
+        # Normalize the whole matrix for cosine similarity
+        faiss.normalize_L2(embeddings)
+        return embeddings
     
-    def search_similar_content(self, query: str, top_k: int = 5) -> List[Dict[str, Any]]:
-        """Search for similar content using vector similarity"""
-        try:
-            # Generate query embedding
-            query_embedding = self.model.encode([query])[0]
-            query_embedding = query_embedding.astype('float32')
+    def _encode_legacy(self, texts: List[str]) -> np.ndarray:
+        """Re-embed chunks imported from a legacy single-file store"""
+        return self._encode_batch(texts, settings.ai_embedding_batch_size)
+    
+    def _count_tokens(self, texts: List[str]) -> List[int]:
+        """Token lengths under the embedding model's tokenizer"""
+        if not texts:
+            return []
+        encoded = self.model.tokenizer(texts, add_special_tokens=False, verbose=False)
+        return [len(input_ids) for input_ids in encoded["input_ids"]]
+    
+    def _embed_query(self, normalized_query: str) -> np.ndarray:
+        """Embed a normalised query, reusing cached embeddings of repeated queries"""
+        query_embedding = self.query_cache.get(normalized_query)
+        if query_embedding is None:
+            query_embedding = self.model.encode([normalized_query])[0].astype('float32')
             faiss.normalize_L2(query_embedding.reshape(1, -1))
+            self.query_cache.set(normalized_query, query_embedding)
+        return query_embedding
+    
+    def cache_stats(self) -> Dict[str, Any]:
+        """Report query embedding and result cache statistics"""
+        return {
+            "query_embeddings": self.query_cache.stats(),
+            "results": self.result_cache.stats()
+        }
+    
+    def search_similar_content(self, query: str, top_k: int = 5,
+                               course_ids: Optional[List[int]] = None) -> List[Dict[str, Any]]:
+        """Search for similar content using vector similarity, optionally within given courses"""
+        try:
+            normalized_query = normalize_query(query)
+            cache_key = (
+                normalized_query,
+                tuple(sorted(set(course_ids))) if course_ids is not None else None,
+                top_k,
+                self.store.version
+            )
+            cached_results = self.result_cache.get(cache_key)
+            if cached_results is not None:
+                return [dict(result) for result in cached_results]
             
-            # Search for similar vectors
-            scores, indices = self.index.search(query_embedding.reshape(1, -1), top_k)
+            query_embedding = self._embed_query(normalized_query)
+            
+            # Search only the selected course partitions
+            with self._lock:
+                hits = self.index.search(query_embedding.reshape(1, -1), top_k, course_ids)
+                chunk_rows = [(score, self.chunks.get(idx)) for score, idx in hits]
             
             results = []
-            for score, idx in zip(scores[0], indices[0]):
-                if idx in self.document_metadata:
-                    chunk_data = self.document_metadata[idx]
+            for score, chunk_data in chunk_rows:
+                if chunk_data:
                     results.append({
-                        "score": float(score),
+                        "score": score,
                         "content": chunk_data["content"],
                         "document_id": chunk_data["document_id"],
                         "chunk_index": chunk_data["chunk_index"],
                         "metadata": chunk_data["metadata"]
                     })
             
-            return results
+            self.result_cache.set(cache_key, results)
+            return [dict(result) for result in results]
             
         except Exception as e:
             print(f"Error searching similar content: {e}")
             return []
 
 
+# One embedder per process, shared by every RAGService
+shared_document_embedder = SharedEmbedder(DocumentEmbedder)
+
+
 class RAGService:
     """Main RAG service for course content generation"""
     
     def __init__(self, db: Session):
         self.db = db
-        self.embedder = DocumentEmbedder()
+        self._embedder = None
         self.openai_client = openai.OpenAI(api_key=settings.openai_api_key or os.getenv("OPENAI_API_KEY", ""))
     
+    @property
+    def embedder(self) -> DocumentEmbedder:
+        """Shared process-wide embedder, loaded on first use"""
+        if self._embedder is None:
+            self._embedder = shared_document_embedder.get()
+        return self._embedder
+    
     def process_uploaded_document(self, content_id: int, instructor_id: int) -> Dict[str, Any]:
         """Process uploaded document and create embeddings"""
         try:
@@ -186,13 +284,17 @@ class RAGService:
             
             # Embed document
             document_id = f"doc_{content_id}"
-            success = self.embedder.embed_document(text_content, document_id, metadata)
+            chunks_created = self.embedder.embed_documents([{
+                "content": text_content,
+                "document_id": document_id,
+                "metadata": metadata
+            }])
             
-            if success:
+            if chunks_created is not None:
                 return {
                     "status": "success",
                     "document_id": document_id,
-                    "chunks_created": len(self.embedder.document_metadata),
+                    "chunks_created": chunks_created,
                     "message": "Document successfully processed and embedded"
                 }
             else:
@@ -204,13 +306,9 @@ class RAGService:
     def _extract_pdf_text(self, file_path: str) -> str:
         """Extract text from PDF file"""
         try:
-            import PyPDF2
-            with open(file_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                text = ""
-                for page in pdf_reader.pages:
-                    text += page.extract_text() + "\n"
-                return text
+            # Shared extractor: cached by file hash, so uploads are parsed only once
+            # Page breaks are kept as form feeds so chunks can end on them
+            return "\f".join(page.text for page in pdf_text_extractor.iter_pages(file_path))
         except Exception as e:
             print(f"Error extracting PDF text: {e}")
             return ""
@@ -238,7 +336,7 @@ class RAGService:
             relevant_docs = self._get_course_documents(course_id)
             
             # Build context from relevant documents
-            context = self._build_context_from_documents(relevant_docs, description)
+            context = self._build_context_from_documents(relevant_docs, description, course_id)
             
             # Generate content using AI
             if use_rag and context:
@@ -295,13 +393,15 @@ class RAGService:
             for doc in documents
         ]
     
-    def _build_context_from_documents(self, documents: List[Dict[str, Any]], query: str) -> str:
+    def _build_context_from_documents(self, documents: List[Dict[str, Any]], query: str,
+                                      course_id: Optional[int] = None) -> str:
         """Build context from relevant document chunks"""
         if not documents:
             return ""
         
-        # Search for relevant chunks
-        relevant_chunks = self.embedder.search_similar_content(query, top_k=10)
+        # Search for relevant chunks, scoped to the course when known
+        course_ids = [course_id] if course_id is not None else None
+        relevant_chunks = self.embedder.search_similar_content(query, top_k=10, course_ids=course_ids)
         
         # Build context string
         context_parts = []
@@ -604,10 +704,10 @@ By the end of this lesson, students will be able to:
             if not documents:
                 return []
             
-            # Search for relevant chunks
-            relevant_chunks = self.embedder.search_similar_content(query, top_k)
+            # Search only this course's partition
+            relevant_chunks = self.embedder.search_similar_content(query, top_k, course_ids=[course_id])
             
-            # Filter results to only include chunks from this course
+            # Drop chunks from documents that have since been deactivated
             course_document_ids = {f"doc_{doc['id']}" for doc in documents}
             filtered_results = [
                 chunk for chunk in relevant_chunks
@@ -619,4 +719,20 @@ By the end of this lesson, students will be able to:
         except Exception as e:
             print(f"Error searching course content: {e}")
             return []
-
+    
+    def search_instructor_content(self, instructor_id: int, query: str, top_k: int = 5) -> List[Dict[str, Any]]:
+        """Search across all of an instructor's courses, merging results by score"""
+        try:
+            course_ids = [
+                course_id for (course_id,) in self.db.query(Course.id).filter(
+                    Course.instructor_id == instructor_id
+                ).all()
+            ]
+            if not course_ids:
+                return []
+            
+            return self.embedder.search_similar_content(query, top_k, course_ids=course_ids)
+            
+        except Exception as e:
+            print(f"Error searching instructor content: {e}")
+            return []
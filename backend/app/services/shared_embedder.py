@@ -0,0 +1,69 @@
+"""
+Shared Embedder
+Process-wide, lazily loaded embedder instances shared across requests
+"""
+
+import time
+import threading
+from typing import Any, Callable, Dict, Optional
+
+
+class SharedEmbedder:
+    """Holds one embedder per process, created on first use.
+
+    The first ``get`` pays the cold cost of loading the model and the vector
+    store; later calls only check whether another process has committed new
+    segments and add them, so requests no longer reload anything from disk.
+    """
+
+    def __init__(self, factory: Callable[[], Any]):
+        self._factory = factory
+        self._instance = None
+        self._lock = threading.Lock()
+        self.cold_load_ms: Optional[float] = None
+        self.warm_requests = 0
+        self.warm_total_ms = 0.0
+        self.refreshes = 0
+
+    def get(self) -> Any:
+        """Return the shared embedder, loading it on first use"""
+        start = time.perf_counter()
+
+        if self._instance is None:
+            with self._lock:
+                if self._instance is None:
+                    self._instance = self._factory()
+                    self.cold_load_ms = (time.perf_counter() - start) * 1000
+                    return self._instance
+
+        refreshed = self._instance.refresh()
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        with self._lock:
+            self.warm_requests += 1
+            self.warm_total_ms += elapsed_ms
+            if refreshed:
+                self.refreshes += 1
+        return self._instance
+
+    def reset(self) -> None:
+        """Drop the shared instance so the next request reloads it"""
+        with self._lock:
+            self._instance = None
+            self.cold_load_ms = None
+            self.warm_requests = 0
+            self.warm_total_ms = 0.0
+            self.refreshes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Report cold vs warm acquisition latency"""
+        instance = self._instance
+        return {
+            "loaded": instance is not None,
+            "store_version": instance.store.version if instance is not None else None,
+            "vectors": instance.index.ntotal if instance is not None else 0,
+            "cold_load_ms": round(self.cold_load_ms, 2) if self.cold_load_ms is not None else None,
+            "warm_requests": self.warm_requests,
+            "warm_avg_ms": round(self.warm_total_ms / self.warm_requests, 3) if self.warm_requests else None,
+            "refreshes": self.refreshes,
+            "caches": instance.cache_stats() if instance is not None else None,
+        }
@@ -329,17 +329,9 @@ By the end of this lesson, students will be able to:
     def extract_text_from_pdf(self, file_path: str) -> str:
         """Extract text content from PDF file"""
         try:
-            import PyPDF2
+            from .pdf_text_extractor import pdf_text_extractor
             
-            with open(file_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                text = ""
-                
-                for page_num in range(len(pdf_reader.pages)):
-                    page = pdf_reader.pages[page_num]
-                    text += page.extract_text() + "\n"
-                
-                return text
+            return pdf_text_extractor.extract_text(file_path)
                 
         except ImportError:
             return "PDF text extraction not available. Please install PyPDF2."
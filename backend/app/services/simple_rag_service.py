@@ -6,6 +6,7 @@ A lightweight version that works without heavy ML dependencies
 import os
 import json
 import uuid
+import threading
 from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime
 import numpy as np
@@ -19,6 +20,15 @@ from pathlib import Path
 from ..models.course import CourseFileContent, Course
 from ..models.ai import ContentGeneration
 from ..core.config import settings
+from ..core.cache import TTLCache
+from .shared_embedder import SharedEmbedder
+from .pdf_text_extractor import pdf_text_extractor
+from .text_chunker import TextChunker
+from .hashing_embedder import HashingEmbedder
+from .vector_store import (
+    SegmentedVectorStore, VectorSegment, ChunkTable, PartitionedIndex, HASHING_STORE, embedder_store_path,
+    normalize_query
+)
 
 
 class SimpleDocumentEmbedder:
@@ -26,148 +36,196 @@ class SimpleDocumentEmbedder:
     
     def __init__(self):
         self.embedding_dim = settings.vector_dimension
-        self.vector_store_path = Path(settings.vector_store_path)
+        self.vector_store_path = embedder_store_path(HASHING_STORE)
         self.vector_store_path.mkdir(parents=True, exist_ok=True)
+        self.hasher = HashingEmbedder(self.embedding_dim, settings.ai_hashing_ngram_max)
+        self.chunker = TextChunker(settings.ai_chunk_max_tokens, settings.ai_chunk_overlap_tokens)
         self.index = None
-        self.document_metadata = {}
+        self.chunks = ChunkTable()
+        # Per-bucket chunk counts, used to IDF-weight queries
+        self.document_frequency = np.zeros(self.embedding_dim, dtype=np.int64)
+        # The legacy single-file store predates the per-embedder stores and is imported into each
+        self.store = SegmentedVectorStore(self.vector_store_path, self.embedding_dim,
+                                          embed=self.hasher.embed_batch,
+                                          legacy_path=Path(settings.vector_store_path))
+        self._lock = threading.RLock()
+        self.query_cache = TTLCache(settings.rag_query_cache_size, settings.rag_cache_ttl_seconds)
+        self.result_cache = TTLCache(settings.rag_result_cache_size, settings.rag_cache_ttl_seconds)
         self._load_vector_store()
     
     def _load_vector_store(self):
-        """Load existing vector store if available"""
-        index_path = self.vector_store_path / "faiss_index.bin"
-        metadata_path = self.vector_store_path / "metadata.json"
-        
-        if index_path.exists() and metadata_path.exists():
-            try:
-                self.index = faiss.read_index(str(index_path))
-                with open(metadata_path, 'r') as f:
-                    self.document_metadata = json.load(f)
-            except Exception as e:
-                print(f"Error loading vector store: {e}")
-                self._create_new_index()
-        else:
+        """Load existing vector store segments if available"""
+        self._create_new_index()
+        try:
+            segments = self.store.load()
+            # Reuse indexes saved by the rebuild command and only add newer chunks
+            covered_ids = self.index.load(self.vector_store_path / "indexes", self.store.next_id)
+            for segment in segments:
+                self._add_segment(segment, covered_ids)
+        except Exception as e:
+            print(f"Error loading vector store: {e}")
             self._create_new_index()
     
     def _create_new_index(self):
-        """Create a new FAISS index"""
-        self.index = faiss.IndexFlatIP(self.embedding_dim)  # Inner product for cosine similarity
-        self.document_metadata = {}
+        """Create a new set of per-course FAISS indexes keyed by chunk id"""
+        self.index = PartitionedIndex(self.embedding_dim)
+        self.chunks = ChunkTable()
+        self.document_frequency = np.zeros(self.embedding_dim, dtype=np.int64)
     
-    def _save_vector_store(self):
-        """Save vector store to disk"""
-        try:
-            index_path = self.vector_store_path / "faiss_index.bin"
-            metadata_path = self.vector_store_path / "metadata.json"
-            
-            faiss.write_index(self.index, str(index_path))
-            with open(metadata_path, 'w') as f:
-                json.dump(self.document_metadata, f, indent=2)
-        except Exception as e:
-            print(f"Error saving vector store: {e}")
+    def _add_segment(self, segment: VectorSegment, covered_ids: int = 0):
+        """Add a stored segment's vectors and chunk metadata to the in-memory index"""
+        new_rows = segment.chunks["id"] >= covered_ids
+        if new_rows.any():
+            self.index.add(
+                segment.vectors[new_rows],
+                segment.chunks["id"][new_rows],
+                segment.chunks["course"][new_rows]
+            )
+        self.chunks.add_segment(segment)
+        # A non-zero bucket means the chunk contains a feature hashed to it
+        self.document_frequency += np.count_nonzero(np.asarray(segment.vectors), axis=0)
+        # Cached query embeddings used the old IDF weights and cached results the old index
+        self.query_cache.clear()
+        self.result_cache.clear()
+    
+    def _save_vector_store(self, embeddings: np.ndarray, documents: List[Dict[str, Any]]):
+        """Append newly embedded documents to the vector store and index them"""
+        # Persist the new segment first so the in-memory index never runs ahead of disk
+        with self._lock:
+            for segment in self.store.append(embeddings, documents):
+                self._add_segment(segment)
+    
+    def refresh(self) -> bool:
+        """Add segments written by other processes since the store was loaded"""
+        with self._lock:
+            segments = self.store.refresh()
+            for segment in segments:
+                self._add_segment(segment)
+            return bool(segments)
     
     def _simple_embedding(self, text: str) -> np.ndarray:
-        """Create a simple embedding using basic text features"""
-        # Simple bag-of-words approach with TF-IDF-like weighting
-        words = text.lower().split()
-        word_counts = {}
-        for word in words:
-            word_counts[word] = word_counts.get(word, 0) + 1
-        
-        # Create a simple embedding vector
-        embedding = np.zeros(self.embedding_dim)
-        
-        # Use word hashing to create features
-        for word, count in word_counts.items():
-            # Simple hash-based feature
-            hash_val = hash(word) % self.embedding_dim
-            embedding[hash_val] += count
-        
-        # Normalize
-        norm = np.linalg.norm(embedding)
-        if norm > 0:
-            embedding = embedding / norm
-        
-        return embedding.astype('float32')
+        """Create a deterministic hashed bag-of-words embedding for one text"""
+        return self.hasher.embed_batch([text])[0]
     
     def embed_document(self, content: str, document_id: str, metadata: Dict[str, Any]) -> bool:
         """Embed a document and add to vector store"""
+        return self.embed_documents([{
+            "content": content,
+            "document_id": document_id,
+            "metadata": metadata
+        }]) is not None
+    
+    def embed_documents(self, documents: List[Dict[str, Any]]) -> Optional[int]:
+        """Embed several documents and add them to the vector store in one segment.
+        
+        Each document is a dict with ``content``, ``document_id`` and ``metadata`` keys.
+        Returns the number of chunks added, or None if embedding failed.
+        """
         try:
-            # Split content into chunks for better retrieval
-            chunks = self._chunk_text(content, chunk_size=500, overlap=50)
-            
-            for i, chunk in enumerate(chunks):
-                # Generate embedding
-                embedding = self._simple_embedding(chunk)
-                
-                # Add to index
-                self.index.add(embedding.reshape(1, -1))
-                
-                # Store metadata
-                chunk_id = f"{document_id}_chunk_{i}"
-                self.document_metadata[chunk_id] = {
-                    "document_id": document_id,
-                    "chunk_index": i,
-                    "content": chunk,
-                    "metadata": metadata,
-                    "created_at": datetime.now().isoformat()
-                }
+            chunks = []
+            chunked_documents = []
             
-            # Save updated vector store
-            self._save_vector_store()
-            return True
+            # Split content into chunks for better retrieval
+            for document in documents:
+                content = document["content"]
+                spans = self.chunker.chunk(content)
+                chunks.extend(content[start:end] for start, end in spans)
+                # Store the document text once, with chunk offsets into it
+                chunked_documents.append({
+                    "document_id": document["document_id"],
+                    "metadata": document["metadata"],
+                    "text": content,
+                    "spans": spans
+                })
+            
+            if not chunks:
+                return 0
+            
+            self._save_vector_store(self.hasher.embed_batch(chunks), chunked_documents)
+            return len(chunks)
             
         except Exception as e:
-            print(f"Error embedding document: {e}")
-            return False
+            print(f"Error embedding documents: {e}")
+            return None
     
-    def _chunk_text(self, text: str, chunk_size: int = 500, overlap: int = 50) -> List[str]:
-        """Split text into overlapping chunks"""
-        words = text.split()
-        chunks = []
-        
-        for i in range(0, len(words), chunk_size - overlap):
-            chunk = " ".join(words[i:i + chunk_size])
-            if chunk.strip():
-                chunks.append(chunk.strip())
-        
-        return chunks
+    def _embed_query(self, normalized_query: str) -> np.ndarray:
+        """Embed a normalised query, reusing cached embeddings of repeated queries"""
+        query_embedding = self.query_cache.get(normalized_query)
+        if query_embedding is None:
+            idf = None
+            if settings.ai_hashing_idf:
+                idf = self.hasher.idf(self.document_frequency, len(self.chunks))
+            query_embedding = self.hasher.embed(normalized_query, idf)
+            self.query_cache.set(normalized_query, query_embedding)
+        return query_embedding
     
-    def search_similar_content(self, query: str, top_k: int = 5) -> List[Dict[str, Any]]:
-        """Search for similar content using vector similarity"""
+    def cache_stats(self) -> Dict[str, Any]:
+        """Report query embedding and result cache statistics"""
+        return {
+            "query_embeddings": self.query_cache.stats(),
+            "results": self.result_cache.stats()
+        }
+    
+    def search_similar_content(self, query: str, top_k: int = 5,
+                               course_ids: Optional[List[int]] = None) -> List[Dict[str, Any]]:
+        """Search for similar content using vector similarity, optionally within given courses"""
         try:
-            # Generate query embedding
-            query_embedding = self._simple_embedding(query)
+            normalized_query = normalize_query(query)
+            cache_key = (
+                normalized_query,
+                tuple(sorted(set(course_ids))) if course_ids is not None else None,
+                top_k,
+                self.store.version
+            )
+            cached_results = self.result_cache.get(cache_key)
+            if cached_results is not None:
+                return [dict(result) for result in cached_results]
             
-            # Search for similar vectors
-            scores, indices = self.index.search(query_embedding.reshape(1, -1), top_k)
+            query_embedding = self._embed_query(normalized_query)
+            
+            # Search only the selected course partitions
+            with self._lock:
+                hits = self.index.search(query_embedding.reshape(1, -1), top_k, course_ids)
+                chunk_rows = [(score, self.chunks.get(idx)) for score, idx in hits]
             
             results = []
-            for score, idx in zip(scores[0], indices[0]):
-                if idx < len(self.document_metadata):
-                    chunk_data = self.document_metadata[f"doc_{idx//10}_chunk_{idx%10}"]  # Approximate mapping
+            for score, chunk_data in chunk_rows:
+                if chunk_data:
                     results.append({
-                        "score": float(score),
+                        "score": score,
                         "content": chunk_data["content"],
                         "document_id": chunk_data["document_id"],
                         "chunk_index": chunk_data["chunk_index"],
                         "metadata": chunk_data["metadata"]
                     })
             
-            return results
+            self.result_cache.set(cache_key, results)
+            return [dict(result) for result in results]
             
         except Exception as e:
             print(f"Error searching similar content: {e}")
             return []
 
 
+# One embedder per process, shared by every SimpleRAGService
+shared_simple_embedder = SharedEmbedder(SimpleDocumentEmbedder)
+
+
 class SimpleRAGService:
     """Simplified RAG service for course content generation"""
     
     def __init__(self, db: Session):
         self.db = db
-        self.embedder = SimpleDocumentEmbedder()
+        self._embedder = None
         self.openai_client = openai.OpenAI(api_key=settings.openai_api_key or os.getenv("OPENAI_API_KEY", ""))
     
+    @property
+    def embedder(self) -> SimpleDocumentEmbedder:
+        """Shared process-wide embedder, loaded on first use"""
+        if self._embedder is None:
+            self._embedder = shared_simple_embedder.get()
+        return self._embedder
+    
     def process_uploaded_document(self, content_id: int, instructor_id: int) -> Dict[str, Any]:
         """Process uploaded document and create embeddings"""
         try:
@@ -202,13 +260,17 @@ class SimpleRAGService:
             
             # Embed document
             document_id = f"doc_{content_id}"
-            success = self.embedder.embed_document(text_content, document_id, metadata)
+            chunks_created = self.embedder.embed_documents([{
+                "content": text_content,
+                "document_id": document_id,
+                "metadata": metadata
+            }])
             
-            if success:
+            if chunks_created is not None:
                 return {
                     "status": "success",
                     "document_id": document_id,
-                    "chunks_created": len(self.embedder.document_metadata),
+                    "chunks_created": chunks_created,
                     "message": "Document successfully processed and embedded"
                 }
             else:
@@ -220,13 +282,9 @@ class SimpleRAGService:
     def _extract_pdf_text(self, file_path: str) -> str:
         """Extract text from PDF file"""
         try:
-            import PyPDF2
-            with open(file_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                text = ""
-                for page in pdf_reader.pages:
-                    text += page.extract_text() + "\n"
-                return text
+            # Shared extractor: cached by file hash, so uploads are parsed only once
+            # Page breaks are kept as form feeds so chunks can end on them
+            return "\f".join(page.text for page in pdf_text_extractor.iter_pages(file_path))
         except Exception as e:
             print(f"Error extracting PDF text: {e}")
             return ""
@@ -254,7 +312,7 @@ class SimpleRAGService:
             relevant_docs = self._get_course_documents(course_id)
             
             # Build context from relevant documents
-            context = self._build_context_from_documents(relevant_docs, description)
+            context = self._build_context_from_documents(relevant_docs, description, course_id)
             
             # Generate content using AI
             if use_rag and context:
@@ -311,13 +369,15 @@ class SimpleRAGService:
             for doc in documents
         ]
     
-    def _build_context_from_documents(self, documents: List[Dict[str, Any]], query: str) -> str:
+    def _build_context_from_documents(self, documents: List[Dict[str, Any]], query: str,
+                                      course_id: Optional[int] = None) -> str:
         """Build context from relevant document chunks"""
         if not documents:
             return ""
         
-        # Search for relevant chunks
-        relevant_chunks = self.embedder.search_similar_content(query, top_k=10)
+        # Search for relevant chunks, scoped to the course when known
+        course_ids = [course_id] if course_id is not None else None
+        relevant_chunks = self.embedder.search_similar_content(query, top_k=10, course_ids=course_ids)
         
         # Build context string
         context_parts = []
@@ -623,10 +683,10 @@ By the end of this lesson, students will be able to:
             if not documents:
                 return []
             
-            # Search for relevant chunks
-            relevant_chunks = self.embedder.search_similar_content(query, top_k)
+            # Search only this course's partition
+            relevant_chunks = self.embedder.search_similar_content(query, top_k, course_ids=[course_id])
             
-            # Filter results to only include chunks from this course
+            # Drop chunks from documents that have since been deactivated
             course_document_ids = {f"doc_{doc['id']}" for doc in documents}
             filtered_results = [
                 chunk for chunk in relevant_chunks
@@ -638,4 +698,20 @@ By the end of this lesson, students will be able to:
         except Exception as e:
             print(f"Error searching course content: {e}")
             return []
-
+    
+    def search_instructor_content(self, instructor_id: int, query: str, top_k: int = 5) -> List[Dict[str, Any]]:
+        """Search across all of an instructor's courses, merging results by score"""
+        try:
+            course_ids = [
+                course_id for (course_id,) in self.db.query(Course.id).filter(
+                    Course.instructor_id == instructor_id
+                ).all()
+            ]
+            if not course_ids:
+                return []
+            
+            return self.embedder.search_similar_content(query, top_k, course_ids=course_ids)
+            
+        except Exception as e:
+            print(f"Error searching instructor content: {e}")
+            return []
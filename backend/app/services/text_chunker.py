@@ -0,0 +1,148 @@
+"""
+Text Chunker
+Token-aware chunking on sentence and heading boundaries, expressed as character offsets
+"""
+
+import re
+from typing import Callable, List, NamedTuple, Optional, Tuple
+
+# Sentence ends, blank lines (paragraphs) and page breaks
+BOUNDARY_PATTERN = re.compile(r"[.!?][\"')\]]*\s+|\n[ \t]*\n\s*|\f")
+# Short numbered ("2.1 Pre-start checks", "Section 3: ...") or upper-case lines
+HEADING_PATTERN = re.compile(
+    r"^[ \t]*(?:"
+    r"(?:\d+(?:\.\d+)*|(?i:section|chapter|module|unit|part)[ \t]+\w+)[ \t.:)-]+[A-Z][^\n.!?]{1,80}"
+    r"|[A-Z][A-Z0-9 &,:'()/-]{2,80}"
+    r")[ \t]*$",
+    re.MULTILINE
+)
+WORD_PATTERN = re.compile(r"\S+")
+TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+Span = Tuple[int, int]
+
+
+class TextUnit(NamedTuple):
+    """A sentence, paragraph or heading span of the source text"""
+    start: int
+    end: int
+    heading: bool
+
+
+def count_word_tokens(texts: List[str]) -> List[int]:
+    """Approximate subword token counts by counting words and punctuation"""
+    return [len(TOKEN_PATTERN.findall(text)) for text in texts]
+
+
+class TextChunker:
+    """Packs sentences into chunks of at most ``max_tokens`` tokens.
+
+    Chunks are ``(start, end)`` character offsets into the original text, so no
+    chunk text is copied; overlap between neighbouring chunks is just overlapping
+    offsets. Headings start a new chunk once the current one is reasonably full,
+    and sentences longer than the limit are split on word boundaries.
+    ``count_tokens`` maps a batch of strings to their token lengths, normally the
+    embedding model's tokenizer.
+    """
+
+    def __init__(self, max_tokens: int, overlap_tokens: int = 0,
+                 count_tokens: Optional[Callable[[List[str]], List[int]]] = None):
+        self.max_tokens = max(1, max_tokens)
+        self.overlap_tokens = min(overlap_tokens, self.max_tokens // 2)
+        self.min_tokens = self.max_tokens // 4
+        self.count_tokens = count_tokens or count_word_tokens
+
+    def chunk(self, text: str) -> List[Span]:
+        """Split text into chunk spans"""
+        units = self._units(text)
+        if not units:
+            return []
+
+        counts = self.count_tokens([text[unit.start:unit.end] for unit in units])
+        spans: List[Span] = []
+        current: List[int] = []
+        current_tokens = 0
+
+        for index, unit in enumerate(units):
+            tokens = counts[index]
+
+            if tokens > self.max_tokens:
+                if current:
+                    spans.append((units[current[0]].start, units[current[-1]].end))
+                current, current_tokens = [], 0
+                spans.extend(self._split_long_unit(text, unit))
+                continue
+
+            new_section = unit.heading and current_tokens >= self.min_tokens
+            if current and (current_tokens + tokens > self.max_tokens or new_section):
+                spans.append((units[current[0]].start, units[current[-1]].end))
+                # Carry trailing sentences over, but never across a heading
+                current = [] if new_section else self._overlap(current, counts, tokens)
+                current_tokens = sum(counts[i] for i in current)
+
+            current.append(index)
+            current_tokens += tokens
+
+        if current:
+            spans.append((units[current[0]].start, units[current[-1]].end))
+        return spans
+
+    def _units(self, text: str) -> List[TextUnit]:
+        """Cut the text at sentence, paragraph and heading boundaries"""
+        cuts = {0, len(text)}
+        heading_starts = set()
+        for match in BOUNDARY_PATTERN.finditer(text):
+            cuts.add(match.end())
+        for match in HEADING_PATTERN.finditer(text):
+            cuts.update((match.start(), match.end()))
+            heading_starts.add(match.start())
+
+        units = []
+        ordered = sorted(cuts)
+        for start, end in zip(ordered, ordered[1:]):
+            heading = start in heading_starts
+            while start < end and text[start].isspace():
+                start += 1
+            while end > start and text[end - 1].isspace():
+                end -= 1
+            if start < end:
+                units.append(TextUnit(start, end, heading))
+        return units
+
+    def _overlap(self, previous: List[int], counts: List[int], next_tokens: int) -> List[int]:
+        """Trailing units of the previous chunk to repeat at the start of the next"""
+        budget = min(self.overlap_tokens, self.max_tokens - next_tokens)
+        carried = []
+        for index in reversed(previous):
+            if counts[index] > budget:
+                break
+            budget -= counts[index]
+            carried.insert(0, index)
+        # A chunk made only of carried sentences would repeat the previous one
+        return carried if len(carried) < len(previous) else []
+
+    def _split_long_unit(self, text: str, unit: TextUnit) -> List[Span]:
+        """Window a single over-long sentence on word boundaries"""
+        words = [(match.start(), match.end()) for match in WORD_PATTERN.finditer(text, unit.start, unit.end)]
+        counts = self.count_tokens([text[start:end] for start, end in words])
+
+        spans = []
+        first = 0
+        while first < len(words):
+            last = first
+            tokens = counts[first]
+            while last + 1 < len(words) and tokens + counts[last + 1] <= self.max_tokens:
+                last += 1
+                tokens += counts[last]
+            spans.append((words[first][0], words[last][1]))
+            if last + 1 >= len(words):
+                break
+
+            # Step back over up to overlap_tokens words for the next window
+            next_first = last + 1
+            overlap = 0
+            while next_first - 1 > first and overlap + counts[next_first - 1] <= self.overlap_tokens:
+                next_first -= 1
+                overlap += counts[next_first]
+            first = next_first
+        return spans
@@ -0,0 +1,112 @@
+"""
+User Engagement
+Per-user engagement figures from the daily user rollups, for paging and streaming export
+"""
+
+from datetime import date
+from typing import Any, Dict, Iterator, List, Optional
+
+from sqlalchemy import case, func, select
+from sqlalchemy.orm import Query, Session
+
+from ..models.user import User
+from .analytics_rollups import USERS, daily_metrics
+
+EXPORT_BATCH_SIZE = 1000
+
+# Flat column order for CSV exports
+ENGAGEMENT_COLUMNS = [
+    "user_id", "email", "role", "is_active", "login_count", "learning_hours", "session_count",
+    "courses_enrolled", "courses_completed", "assessments_attempted", "assessments_passed", "average_score"
+]
+
+# Sort names accepted by the engagement endpoints, highest first
+SORTS = {
+    "learning_hours": "learning_minutes",
+    "sessions": "session_count",
+    "logins": "login_count",
+    "enrollments": "courses_enrolled",
+    "completions": "courses_completed",
+    "assessments": "assessments_attempted",
+    "average_score": "average_score",
+}
+
+
+def engagement_query(db: Session, start_date: date, user_role: Optional[str] = None) -> Query:
+    """Users joined to their engagement totals since start_date.
+
+    Totals are summed per user from the daily user rollups plus a live tail
+    from the raw tables in one CTE, outer-joined to users on user_id, so the
+    whole report is one statement. They are coalesced to 0 so they can be
+    sorted and used as keyset cursors.
+    """
+    rows = daily_metrics(db, USERS, start_date)
+    total = lambda metric: func.sum(rows.c[metric]).label(metric)
+    totals = select(
+        rows.c.user_id, total("login_count"), total("learning_time"), total("learning_sessions"),
+        total("courses_enrolled"), total("courses_completed"), total("assessments_completed"),
+        total("assessments_passed"), total("assessment_score_total")
+    ).group_by(rows.c.user_id).cte("engagement_totals")
+
+    average_score = case(
+        (totals.c.assessments_completed > 0, totals.c.assessment_score_total * 1.0 / totals.c.assessments_completed),
+        else_=0
+    )
+    query = db.query(
+        User.id, User.email, User.role, User.is_active, User.created_at,
+        func.coalesce(totals.c.login_count, 0).label("login_count"),
+        func.coalesce(totals.c.learning_time, 0).label("learning_minutes"),
+        func.coalesce(totals.c.learning_sessions, 0).label("session_count"),
+        func.coalesce(totals.c.courses_enrolled, 0).label("courses_enrolled"),
+        func.coalesce(totals.c.courses_completed, 0).label("courses_completed"),
+        func.coalesce(totals.c.assessments_completed, 0).label("assessments_attempted"),
+        func.coalesce(totals.c.assessments_passed, 0).label("assessments_passed"),
+        func.coalesce(average_score, 0).label("average_score"),
+    ).outerjoin(totals, totals.c.user_id == User.id)
+
+    if user_role:
+        query = query.filter(User.role == user_role)
+    return query
+
+
+def sort_columns(query: Query, sort: str) -> List:
+    """Keyset columns for a sort name, ending in the user id; raises ValueError for an unknown sort"""
+    columns = {column["name"]: column["expr"] for column in query.column_descriptions}
+    if sort == "newest":
+        return [columns["created_at"], columns["id"]]
+    if sort not in SORTS:
+        raise ValueError(f"Unknown sort: {sort}")
+    return [columns[SORTS[sort]], columns["id"]]
+
+
+def engagement_row(row) -> Dict[str, Any]:
+    """The API shape of one engagement row"""
+    return {
+        "user_id": row.id,
+        "email": row.email,
+        "role": row.role,
+        "is_active": row.is_active,
+        "engagement": {
+            "login_count": row.login_count,
+            "learning_hours": round((row.learning_minutes or 0) / 60, 2),
+            "session_count": row.session_count,
+            "courses_enrolled": row.courses_enrolled,
+            "courses_completed": row.courses_completed,
+            "assessments_attempted": row.assessments_attempted,
+            "assessments_passed": row.assessments_passed,
+            "average_score": round(float(row.average_score or 0), 2)
+        }
+    }
+
+
+def iter_engagement_rows(db: Session, start_date: date, user_role: Optional[str] = None,
+                         sort: str = "newest") -> Iterator[Dict[str, Any]]:
+    """Every engagement row, flattened, fetched from a server-side cursor in batches"""
+    query = engagement_query(db, start_date, user_role)
+    columns = sort_columns(query, sort)
+    query = query.order_by(*[column.desc() for column in columns])
+    for row in query.yield_per(EXPORT_BATCH_SIZE):
+        item = engagement_row(row)
+        engagement = item.pop("engagement")
+        item.update(engagement)
+        yield item
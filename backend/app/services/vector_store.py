@@ -0,0 +1,648 @@
+"""
+Segmented Vector Store
+Append-only, crash-safe persistence for document embeddings and chunk metadata
+"""
+
+import os
+import json
+import fcntl
+import heapq
+import threading
+from contextlib import contextmanager
+from typing import List, Dict, Any, Callable, Optional, NamedTuple, Iterable, Tuple
+from datetime import datetime
+from pathlib import Path
+import numpy as np
+import faiss
+
+from ..core.config import settings
+
+
+# One fixed-width row per chunk; chunk text is a byte range of the segment's text blob.
+# Chunks of documents without a course are stored with course NO_COURSE.
+NO_COURSE = -1
+CHUNK_DTYPE = np.dtype([
+    ("id", "<i8"),
+    ("doc", "<i4"),
+    ("course", "<i4"),
+    ("chunk", "<i4"),
+    ("offset", "<i8"),
+    ("length", "<i4"),
+])
+
+
+# Each embedder keeps its own store under vector_store_path: their vectors have the
+# same dimension but live in different spaces, so they must never share an index
+HASHING_STORE = "hashing"
+MINILM_STORE = "minilm"
+
+
+def embedder_store_path(name: str) -> Path:
+    """The store directory for one embedder's vectors"""
+    return Path(settings.vector_store_path) / name
+
+
+def utf8_offsets(text: str, encoded: Optional[bytes] = None) -> np.ndarray:
+    """Byte offset in the UTF-8 encoding of every character offset 0..len(text)"""
+    encoded = encoded if encoded is not None else text.encode("utf-8")
+    if len(encoded) == len(text):
+        return np.arange(len(text) + 1, dtype=np.int64)
+
+    code_points = np.frombuffer(text.encode("utf-32-le"), dtype="<u4")
+    widths = 1 + (code_points >= 0x80) + (code_points >= 0x800) + (code_points >= 0x10000)
+    return np.concatenate([[0], np.cumsum(widths, dtype=np.int64)])
+
+
+def normalize_query(query: str) -> str:
+    """Canonical form of a search query for cache keys"""
+    return " ".join(query.lower().split())
+
+
+class VectorSegment(NamedTuple):
+    """A committed segment of vectors and their columnar chunk metadata"""
+    name: str
+    vectors: np.ndarray
+    chunks: np.ndarray
+    text: np.ndarray
+    documents: List[Dict[str, Any]]
+
+
+class ChunkTable:
+    """Columnar chunk id -> metadata lookup across all loaded segments.
+
+    Chunk ids are assigned densely by the store, so a chunk's id is also its row
+    and lookups are a single array index. Text stays in the memory-mapped segment
+    blobs and per-document metadata is held once per document, not per chunk.
+    """
+
+    def __init__(self):
+        self.columns = np.empty(0, dtype=CHUNK_DTYPE)
+        self.segment = np.empty(0, dtype='<i4')
+        self.blobs: List[np.ndarray] = []
+        self.documents: Dict[int, Dict[str, Any]] = {}
+
+    def __len__(self) -> int:
+        return len(self.columns)
+
+    def add_segment(self, segment: VectorSegment) -> None:
+        """Append a segment's rows to the table"""
+        self.blobs.append(segment.text)
+        self.columns = np.concatenate([self.columns, segment.chunks])
+        self.segment = np.concatenate([
+            self.segment,
+            np.full(len(segment.chunks), len(self.blobs) - 1, dtype='<i4')
+        ])
+        for document in segment.documents:
+            self.documents[document["doc"]] = document
+
+    def text(self, chunk_id: int) -> str:
+        """Decode a chunk's text from its segment blob"""
+        row = self.columns[chunk_id]
+        blob = self.blobs[self.segment[chunk_id]]
+        return bytes(blob[row["offset"]:row["offset"] + row["length"]]).decode("utf-8")
+
+    def get(self, chunk_id: int) -> Optional[Dict[str, Any]]:
+        """Return chunk metadata for a FAISS id, or None if it is unknown"""
+        if chunk_id < 0 or chunk_id >= len(self.columns):
+            return None
+
+        row = self.columns[chunk_id]
+        document = self.documents[int(row["doc"])]
+        return {
+            "content": self.text(chunk_id),
+            "document_id": document["document_id"],
+            "chunk_index": int(row["chunk"]),
+            "metadata": document["metadata"],
+        }
+
+
+# Embeds a batch of texts into an (n, dimension) float32 matrix
+Embed = Callable[[List[str]], np.ndarray]
+LEGACY_EMBED_BATCH_SIZE = 1000
+
+
+# Exact search; "faiss" is kept as an alias for existing deployments
+FLAT_INDEX_TYPES = ("faiss", "flat")
+ANN_INDEX_TYPES = ("hnsw", "ivfpq")
+
+
+def create_index(index_type: str, dimension: int, train_vectors: Optional[np.ndarray] = None) -> faiss.Index:
+    """Create an inner-product FAISS index keyed by chunk id.
+
+    ``ivfpq`` needs training vectors; without enough of them it falls back to an
+    exact flat index so small partitions still work.
+    """
+    index_type = index_type.lower()
+
+    if index_type == "hnsw":
+        base = faiss.IndexHNSWFlat(dimension, settings.vector_hnsw_m, faiss.METRIC_INNER_PRODUCT)
+        base.hnsw.efConstruction = settings.vector_hnsw_ef_construction
+        base.hnsw.efSearch = settings.vector_hnsw_ef_search
+        return faiss.IndexIDMap(base)
+
+    if index_type == "ivfpq":
+        # k-means wants ~39 training points per centroid (2^bits per PQ sub-quantizer)
+        min_train = max(39 * 2 ** settings.vector_pq_bits, settings.vector_ann_min_vectors)
+        if train_vectors is not None and len(train_vectors) >= min_train:
+            nlist = max(1, min(settings.vector_ivf_nlist, len(train_vectors) // 39))
+            quantizer = faiss.IndexFlatIP(dimension)
+            base = faiss.IndexIVFPQ(
+                quantizer, dimension, nlist, settings.vector_pq_m, settings.vector_pq_bits,
+                faiss.METRIC_INNER_PRODUCT
+            )
+            base.train(np.ascontiguousarray(train_vectors, dtype='float32'))
+            base.nprobe = min(settings.vector_ivf_nprobe, nlist)
+            return faiss.IndexIDMap(base)
+    elif index_type not in FLAT_INDEX_TYPES:
+        raise ValueError(f"Unknown vector index type: {index_type}")
+
+    # Inner product for cosine similarity
+    return faiss.IndexIDMap(faiss.IndexFlatIP(dimension))
+
+
+class PartitionedIndex:
+    """FAISS sub-indexes partitioned by course, with a router for cross-course search.
+
+    A course-scoped query only scans that course's vectors; a query over several
+    courses (or all of them) searches each partition and merges the hits by score.
+    Partitions use ``index_type`` (see ``create_index``); trained ``ivfpq``
+    partitions are only produced by ``build``, so courses added since the last
+    rebuild stay exact until the index is rebuilt.
+    """
+
+    MANIFEST_NAME = "manifest.json"
+
+    def __init__(self, dimension: int, index_type: Optional[str] = None):
+        self.dimension = dimension
+        self.index_type = (index_type or settings.vector_index_type).lower()
+        self.partitions: Dict[int, faiss.Index] = {}
+
+    @property
+    def ntotal(self) -> int:
+        return sum(partition.ntotal for partition in self.partitions.values())
+
+    def _new_partition(self) -> faiss.Index:
+        """Create an empty sub-index keyed by chunk id"""
+        return create_index(self.index_type, self.dimension)
+
+    def add(self, vectors: np.ndarray, ids: np.ndarray, courses: np.ndarray) -> None:
+        """Route vectors to their course partitions"""
+        vectors = np.ascontiguousarray(vectors, dtype='float32')
+        ids = np.ascontiguousarray(ids, dtype='int64')
+        courses = np.asarray(courses)
+
+        for course in np.unique(courses):
+            mask = courses == course
+            partition = self.partitions.get(int(course))
+            if partition is None:
+                partition = self.partitions[int(course)] = self._new_partition()
+            partition.add_with_ids(vectors[mask], ids[mask])
+
+    def build(self, vectors: np.ndarray, ids: np.ndarray, courses: np.ndarray) -> None:
+        """Rebuild every partition from scratch, training on each course's vectors"""
+        vectors = np.ascontiguousarray(vectors, dtype='float32')
+        ids = np.ascontiguousarray(ids, dtype='int64')
+        courses = np.asarray(courses)
+
+        self.partitions = {}
+        for course in np.unique(courses):
+            mask = courses == course
+            partition = create_index(self.index_type, self.dimension, vectors[mask])
+            partition.add_with_ids(vectors[mask], ids[mask])
+            self.partitions[int(course)] = partition
+
+    def search(self, query: np.ndarray, top_k: int,
+               course_ids: Optional[Iterable[int]] = None) -> List[Tuple[float, int]]:
+        """Return the best (score, chunk id) pairs across the selected courses"""
+        if course_ids is None:
+            partitions = list(self.partitions.values())
+        else:
+            partitions = [self.partitions[c] for c in set(course_ids) if c in self.partitions]
+
+        hits = []
+        for partition in partitions:
+            k = min(top_k, partition.ntotal)
+            if k <= 0:
+                continue
+            scores, ids = partition.search(query, k)
+            hits.extend((float(score), int(idx)) for score, idx in zip(scores[0], ids[0]) if idx >= 0)
+
+        if len(partitions) == 1:
+            return hits
+        return heapq.nlargest(top_k, hits)
+
+    def save(self, path: Path, covered_ids: int) -> None:
+        """Persist built partitions; ``covered_ids`` is the first chunk id not included"""
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+
+        partition_files = {}
+        for course, partition in self.partitions.items():
+            filename = f"{self.index_type}_course_{course}.faiss"
+            faiss.write_index(partition, str(path / f"{filename}.tmp"))
+            os.replace(path / f"{filename}.tmp", path / filename)
+            partition_files[str(course)] = filename
+
+        manifest = {
+            "index_type": self.index_type,
+            "dimension": self.dimension,
+            "covered_ids": covered_ids,
+            "partitions": partition_files,
+        }
+        with open(path / f"{self.MANIFEST_NAME}.tmp", 'w') as f:
+            json.dump(manifest, f)
+        os.replace(path / f"{self.MANIFEST_NAME}.tmp", path / self.MANIFEST_NAME)
+
+    def load(self, path: Path, max_ids: int) -> int:
+        """Load persisted partitions built for this index type.
+
+        Returns the number of chunk ids they already cover (0 if none could be
+        used), so the caller only needs to add newer chunks.
+        """
+        manifest_path = Path(path) / self.MANIFEST_NAME
+        if not manifest_path.exists():
+            return 0
+
+        try:
+            with open(manifest_path, 'r') as f:
+                manifest = json.load(f)
+            if (manifest["index_type"] != self.index_type
+                    or manifest["dimension"] != self.dimension
+                    or manifest["covered_ids"] > max_ids):
+                return 0
+
+            self.partitions = {
+                int(course): faiss.read_index(str(Path(path) / filename))
+                for course, filename in manifest["partitions"].items()
+            }
+            return manifest["covered_ids"]
+
+        except Exception as e:
+            print(f"Error loading vector indexes: {e}")
+            self.partitions = {}
+            return 0
+
+
+class SegmentedVectorStore:
+    """Stores vectors in immutable segment files tracked by an append-only commit log.
+
+    Each ingest writes a new segment (``<name>.npy`` vectors, ``<name>.chunks.npy``
+    chunk columns, ``<name>.text`` document text blob and ``<name>.docs.jsonl``
+    document metadata) and then appends one record to ``segments.log``. A segment
+    only becomes visible once its log record is fsynced, so a crash mid-write
+    leaves at worst an orphaned segment that is ignored on load. Small segments
+    are merged in a background thread once their number exceeds ``compact_after``.
+    Writers take an exclusive file lock, so several worker processes can share
+    one store and pick up each other's segments via ``refresh``. A legacy
+    single-file store in ``legacy_path`` (default ``path``) is imported on first
+    load by re-embedding its chunk text with ``embed``; without one it is left
+    for a store that has it. Several stores can import the same legacy store.
+    """
+
+    LOG_NAME = "segments.log"
+    LOCK_NAME = "segments.lock"
+    LEGACY_INDEX_NAME = "faiss_index.bin"
+    LEGACY_METADATA_NAME = "metadata.json"
+    SEGMENT_SUFFIXES = (".npy", ".chunks.npy", ".text", ".docs.jsonl")
+
+    def __init__(self, path: Path, dimension: int, compact_after: Optional[int] = None,
+                 embed: Optional[Embed] = None, legacy_path: Optional[Path] = None):
+        self.path = Path(path)
+        self.legacy_path = Path(legacy_path) if legacy_path is not None else self.path
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.dimension = dimension
+        self.compact_after = compact_after or settings.vector_store_compact_segments
+        self.embed = embed
+        self.log_path = self.path / self.LOG_NAME
+        self.version = 0
+        self.next_id = 0
+        self.next_doc = 0
+        self._segments: List[Dict[str, Any]] = []
+        self._log_signature = None
+        self._lock = threading.Lock()
+        self._compaction_thread: Optional[threading.Thread] = None
+
+    @contextmanager
+    def _exclusive(self):
+        """Serialise writers across threads and across worker processes"""
+        with self._lock:
+            with open(self.path / self.LOCK_NAME, 'a') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def load(self) -> List[VectorSegment]:
+        """Read the commit log and memory-map every committed segment"""
+        with self._exclusive():
+            if not self.log_path.exists():
+                self._import_legacy_store()
+            self.version = 0
+            self.next_id = 0
+            self.next_doc = 0
+            return self._catch_up()
+
+    def refresh(self) -> List[VectorSegment]:
+        """Return rows committed by other processes since the last load, append or refresh"""
+        if self._current_log_signature() == self._log_signature:
+            return []
+        with self._exclusive():
+            return self._catch_up()
+
+    def append(self, vectors: np.ndarray, documents: List[Dict[str, Any]]) -> List[VectorSegment]:
+        """Persist a batch of embedded documents as a new segment.
+
+        Each document is a dict with ``document_id``, ``metadata`` and either
+        ``text`` plus ``spans`` (chunk character offsets into the text) or
+        ``chunks`` (the chunk texts); ``vectors`` holds one row per chunk in the
+        same order.
+        Returns any segments committed by other processes first, followed by the
+        new segment, so callers can keep their in-memory index in id order.
+        """
+        with self._exclusive():
+            segments = self._catch_up()
+
+            seq = self.version + 1
+            name = f"seg_{seq:08d}"
+            chunks, text, document_rows = self._build_columns(documents, self.next_id, self.next_doc)
+            if len(chunks) != len(vectors):
+                raise ValueError("vectors and chunks must have the same length")
+
+            self._write_segment(name, vectors, chunks, text, document_rows)
+            record = {"seq": seq, "segment": name, "count": len(chunks), "documents": len(document_rows)}
+            self._append_log(record)
+            self._log_signature = self._current_log_signature()
+            self._segments.append(record)
+            self.version = seq
+            self.next_id += len(chunks)
+            self.next_doc += len(document_rows)
+            needs_compaction = len(self._segments) > self.compact_after
+            segments.append(self._open_segment(name))
+
+        if needs_compaction:
+            self.compact_in_background()
+        return segments
+
+    def compact_in_background(self) -> None:
+        """Start a compaction thread unless one is already running"""
+        if self._compaction_thread and self._compaction_thread.is_alive():
+            return
+        self._compaction_thread = threading.Thread(target=self.compact, daemon=True)
+        self._compaction_thread.start()
+
+    def compact(self) -> bool:
+        """Merge all currently committed segments into a single segment"""
+        with self._exclusive():
+            snapshot = self._read_log()
+        if len(snapshot) < 2:
+            return False
+
+        try:
+            opened = [self._open_segment(record["segment"]) for record in snapshot]
+            vectors = np.concatenate([segment.vectors for segment in opened])
+
+            # Rebase each segment's text offsets onto the merged blob
+            chunk_parts = []
+            text_offset = 0
+            for segment in opened:
+                part = np.array(segment.chunks)
+                part["offset"] += text_offset
+                chunk_parts.append(part)
+                text_offset += len(segment.text)
+            chunks = np.concatenate(chunk_parts)
+            text = b"".join(bytes(segment.text) for segment in opened)
+            document_rows = [document for segment in opened for document in segment.documents]
+
+            # The merged segment keeps the newest sequence number it covers
+            seq = snapshot[-1]["seq"]
+            name = f"seg_{seq:08d}_c"
+            self._write_segment(name, vectors, chunks, text, document_rows)
+            merged = {"seq": seq, "segment": name, "count": len(chunks), "documents": len(document_rows)}
+
+            with self._exclusive():
+                records = self._read_log()
+                if records[:len(snapshot)] != snapshot:
+                    # Another process compacted first; its merged segment wins
+                    self._remove_segment(name)
+                    return False
+
+                # Keep anything appended while the merge was running
+                self._rewrite_log([merged] + records[len(snapshot):])
+
+            for record in snapshot:
+                self._remove_segment(record["segment"])
+            return True
+
+        except Exception as e:
+            print(f"Error compacting vector store: {e}")
+            return False
+
+    def _catch_up(self) -> List[VectorSegment]:
+        """Re-read the log and open rows beyond ``next_id``; caller holds the lock"""
+        self._log_signature = self._current_log_signature()
+        records = self._read_log()
+        self._segments = records
+        latest = max((record["seq"] for record in records), default=0)
+        if latest <= self.version:
+            return []
+
+        segments = []
+        for record in records:
+            if record["seq"] <= self.version or not record["count"]:
+                continue
+            segment = self._open_segment(record["segment"])
+            # A compacted segment can also hold rows this process already has
+            start = max(0, self.next_id - int(segment.chunks["id"][0]))
+            if start < len(segment.chunks):
+                segments.append(segment._replace(
+                    vectors=segment.vectors[start:],
+                    chunks=segment.chunks[start:]
+                ))
+
+        self.version = latest
+        self.next_id = sum(record["count"] for record in records)
+        self.next_doc = sum(record["documents"] for record in records)
+        return segments
+
+    def _current_log_signature(self) -> Optional[Tuple[int, int]]:
+        """Cheap change marker for the commit log"""
+        try:
+            stat = self.log_path.stat()
+        except FileNotFoundError:
+            return None
+        return (stat.st_size, stat.st_mtime_ns)
+
+    def _build_columns(self, documents: List[Dict[str, Any]], first_id: int, first_doc: int):
+        """Lay out chunk rows, the text blob and document rows for a new segment.
+
+        Documents carrying ``text`` and ``spans`` store their text once, with each
+        chunk recorded as a byte range into it; documents carrying ``chunks``
+        store each chunk's text in turn.
+        """
+        created_at = datetime.now().isoformat()
+        rows = []
+        text_parts = []
+        document_rows = []
+        offset = 0
+
+        for doc_key, document in enumerate(documents, start=first_doc):
+            course_id = document["metadata"].get("course_id")
+            course = int(course_id) if course_id is not None else NO_COURSE
+            document_rows.append({
+                "doc": doc_key,
+                "document_id": document["document_id"],
+                "metadata": document["metadata"],
+                "created_at": document.get("created_at") or created_at,
+            })
+
+            if "spans" in document:
+                encoded = document["text"].encode("utf-8")
+                byte_offsets = utf8_offsets(document["text"], encoded)
+                for chunk_index, (start, end) in enumerate(document["spans"]):
+                    start_byte, end_byte = int(byte_offsets[start]), int(byte_offsets[end])
+                    rows.append((first_id + len(rows), doc_key, course, chunk_index,
+                                 offset + start_byte, end_byte - start_byte))
+                text_parts.append(encoded)
+                offset += len(encoded)
+                continue
+
+            for chunk_index, chunk in enumerate(document["chunks"]):
+                encoded = chunk.encode("utf-8")
+                rows.append((first_id + len(rows), doc_key, course, chunk_index, offset, len(encoded)))
+                text_parts.append(encoded)
+                offset += len(encoded)
+
+        return np.array(rows, dtype=CHUNK_DTYPE), b"".join(text_parts), document_rows
+
+    def _open_segment(self, name: str) -> VectorSegment:
+        """Memory-map a segment's vectors, chunk columns and text blob"""
+        vectors = np.load(self.path / f"{name}.npy", mmap_mode='r')
+        chunks = np.load(self.path / f"{name}.chunks.npy", mmap_mode='r')
+
+        text_path = self.path / f"{name}.text"
+        if text_path.stat().st_size:
+            text = np.memmap(text_path, dtype=np.uint8, mode='r')
+        else:
+            text = np.empty(0, dtype=np.uint8)
+
+        with open(self.path / f"{name}.docs.jsonl", 'r') as f:
+            documents = [json.loads(line) for line in f if line.strip()]
+
+        return VectorSegment(name=name, vectors=vectors, chunks=chunks, text=text, documents=documents)
+
+    def _write_segment(self, name: str, vectors: np.ndarray, chunks: np.ndarray,
+                       text: bytes, documents: List[Dict[str, Any]]) -> None:
+        """Durably write a segment's files"""
+        vectors = np.ascontiguousarray(vectors, dtype='float32').reshape(-1, self.dimension)
+
+        self._write_file(f"{name}.npy", lambda f: np.save(f, vectors))
+        self._write_file(f"{name}.chunks.npy", lambda f: np.save(f, chunks))
+        self._write_file(f"{name}.text", lambda f: f.write(text))
+        self._write_file(f"{name}.docs.jsonl", lambda f: f.write("".join(
+            json.dumps(document, separators=(',', ':')) + "\n" for document in documents
+        ).encode("utf-8")))
+
+        for suffix in self.SEGMENT_SUFFIXES:
+            os.replace(self.path / f"{name}{suffix}.tmp", self.path / f"{name}{suffix}")
+
+    def _write_file(self, filename: str, write) -> None:
+        """Write and fsync a temporary file that is renamed into place later"""
+        with open(self.path / f"{filename}.tmp", 'wb') as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _remove_segment(self, name: str) -> None:
+        """Delete a segment's files once it is no longer referenced"""
+        for suffix in self.SEGMENT_SUFFIXES:
+            try:
+                (self.path / f"{name}{suffix}").unlink()
+            except FileNotFoundError:
+                pass
+
+    def _read_log(self) -> List[Dict[str, Any]]:
+        """Read committed segment records, ignoring a torn trailing line"""
+        if not self.log_path.exists():
+            return []
+
+        records = []
+        with open(self.log_path, 'r') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    break
+                if (self.path / f"{record['segment']}.npy").exists():
+                    records.append(record)
+        return records
+
+    def _append_log(self, record: Dict[str, Any]) -> None:
+        """Commit a segment by appending its record to the log"""
+        with open(self.log_path, 'a+b') as f:
+            # A crash mid-append leaves a torn last line; drop it so this record starts a line of its own
+            f.seek(0)
+            log = f.read()
+            if log and not log.endswith(b"\n"):
+                f.truncate(log.rfind(b"\n") + 1)
+            f.write((json.dumps(record) + "\n").encode("utf-8"))
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _rewrite_log(self, records: List[Dict[str, Any]]) -> None:
+        """Atomically replace the log after compaction"""
+        tmp_path = self.log_path.with_suffix(".log.tmp")
+        with open(tmp_path, 'w') as f:
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.log_path)
+
+    def _import_legacy_store(self) -> None:
+        """Convert a single-file faiss_index.bin/metadata.json store into a first segment.
+
+        The legacy vectors are not reused: the old simple embedder hashed tokens
+        with Python's salted ``hash()``, so they only ever matched queries from
+        the process that wrote them. Each chunk's text is embedded again instead.
+        """
+        index_path = self.legacy_path / self.LEGACY_INDEX_NAME
+        metadata_path = self.legacy_path / self.LEGACY_METADATA_NAME
+        if not (index_path.exists() and metadata_path.exists()):
+            return
+        if self.embed is None:
+            print("Legacy vector store found; it is imported by the RAG service on startup")
+            return
+
+        try:
+            index = faiss.read_index(str(index_path))
+            with open(metadata_path, 'r') as f:
+                legacy_metadata = list(json.load(f).values())[:index.ntotal]
+            if not legacy_metadata:
+                return
+
+            # Legacy chunks were inserted in index order; group consecutive chunks by document
+            documents = []
+            for chunk_data in legacy_metadata:
+                if not documents or documents[-1]["document_id"] != chunk_data["document_id"]:
+                    documents.append({
+                        "document_id": chunk_data["document_id"],
+                        "metadata": chunk_data["metadata"],
+                        "created_at": chunk_data.get("created_at"),
+                        "chunks": [],
+                    })
+                documents[-1]["chunks"].append(chunk_data["content"])
+
+            texts = [chunk_data["content"] for chunk_data in legacy_metadata]
+            vectors = np.concatenate([
+                self.embed(texts[start:start + LEGACY_EMBED_BATCH_SIZE])
+                for start in range(0, len(texts), LEGACY_EMBED_BATCH_SIZE)
+            ])
+            chunks, text, document_rows = self._build_columns(documents, 0, 0)
+            name = "seg_00000001"
+            self._write_segment(name, vectors, chunks, text, document_rows)
+            self._append_log({"seq": 1, "segment": name, "count": len(chunks), "documents": len(document_rows)})
+            print(f"Imported {len(chunks)} chunks from the legacy vector store")
+
+        except Exception as e:
+            print(f"Error importing legacy vector store: {e}")
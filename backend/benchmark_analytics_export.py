@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Analytics Export Benchmark
+Exports a large learning-session table in every streaming format and compares
+peak Python memory with building the whole CSV in memory first
+"""
+
+import os
+import sys
+import io
+import csv
+import time
+import argparse
+import tracemalloc
+from datetime import date, datetime, timedelta
+
+# Add the app directory to the Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.core.database import Base
+from app.models import User, Course
+from app.models.learning import LearningSession
+from app.services.analytics_export import DATASETS, FORMATS, export_chunks
+
+TABLES = [User.__table__, Course.__table__, LearningSession.__table__]
+INSERT_CHUNK = 20000
+
+
+def seed(database_url: str, sessions: int):
+    """Learning sessions spread over the last 30 days"""
+    if database_url.startswith("sqlite"):
+        engine = create_engine(database_url, connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    else:
+        engine = create_engine(database_url)
+    Base.metadata.drop_all(engine, tables=TABLES)
+    Base.metadata.create_all(engine, tables=TABLES)
+    db = sessionmaker(bind=engine)()
+
+    db.execute(insert(User.__table__), [
+        {"id": n + 1, "email": f"student{n}@example.com", "hashed_password": "x", "role": "student"}
+        for n in range(1000)
+    ])
+    db.execute(insert(Course.__table__), [
+        {"id": n + 1, "title": f"Course {n}", "instructor_id": 1, "status": "published"} for n in range(50)
+    ])
+    now = datetime.utcnow()
+    for start in range(0, sessions, INSERT_CHUNK):
+        db.execute(insert(LearningSession.__table__), [
+            {"user_id": n % 1000 + 1, "course_id": n % 50 + 1, "duration_minutes": n % 90,
+             "started_at": now - timedelta(minutes=n % (29 * 24 * 60)),
+             "ended_at": now if n % 3 else None}
+            for n in range(start, min(start + INSERT_CHUNK, sessions))
+        ])
+    db.commit()
+    print(f"Seeded {sessions} learning sessions")
+    return engine, db
+
+
+def in_memory_csv(db, start_date: date) -> int:
+    """Original shape: every session loaded, then the whole CSV built in a StringIO"""
+    columns = [name for name, _ in DATASETS["sessions"].columns]
+    sessions = db.query(LearningSession).filter(
+        LearningSession.started_at >= datetime.combine(start_date, datetime.min.time())
+    ).all()
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(columns)
+    for session in sessions:
+        writer.writerow([session.id] + [getattr(session, name) for name in columns[1:]])
+    return len(output.getvalue().encode())
+
+
+def streamed(format: str):
+    """Export the sessions in ``format``, discarding the chunks as a client would receive them"""
+    def run(db, start_date: date) -> int:
+        dataset = DATASETS["sessions"]
+        size = 0
+        for chunk in export_chunks(format, dataset.columns, dataset.rows(db, start_date)):
+            size += len(chunk.encode() if isinstance(chunk, str) else chunk)
+        return size
+    return run
+
+
+def run_benchmark(label: str, export, db, sessions: int) -> None:
+    """Time one export and print its size, throughput and peak traced memory"""
+    start_date = date.today() - timedelta(days=30)
+    db.expunge_all()
+    tracemalloc.start()
+    start = time.perf_counter()
+    size = export(db, start_date)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print(f"{label:<16} {elapsed:7.2f} s  {sessions / elapsed:9.0f} rows/s  "
+          f"{size / 1e6:8.1f} MB out  peak {peak / 1e6:8.1f} MB")
+
+
+def main():
+    """Run the benchmark"""
+    parser = argparse.ArgumentParser(description="Benchmark the streaming analytics export")
+    parser.add_argument("--sessions", type=int, default=1_000_000)
+    parser.add_argument("--formats", default=",".join(FORMATS),
+                        help="Comma-separated formats to stream (parquet needs pyarrow)")
+    parser.add_argument("--skip-in-memory", action="store_true", help="Skip the original in-memory CSV export")
+    parser.add_argument("--database-url", default="sqlite://",
+                        help="Database to benchmark against (tables are dropped and recreated)")
+    args = parser.parse_args()
+
+    print(f"📦 Analytics Export Benchmark ({args.sessions} sessions)")
+    print("=" * 50)
+    engine, db = seed(args.database_url, args.sessions)
+    print("Timings include tracemalloc overhead")
+
+    if not args.skip_in_memory:
+        run_benchmark("in-memory csv", in_memory_csv, db, args.sessions)
+    for format in args.formats.split(","):
+        try:
+            run_benchmark(f"streamed {format}", streamed(format), db, args.sessions)
+        except ImportError as e:
+            print(f"streamed {format}: skipped ({e})")
+    db.close()
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
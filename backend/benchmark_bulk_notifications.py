@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Bulk Notification Benchmark
+Compares per-recipient and bulk notification creation for a course-wide Q&A event
+"""
+
+import os
+import sys
+import time
+import argparse
+
+# Add the app directory to the Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.core.database import Base
+from app.core.email import email_service
+from app.models import User, Course
+from app.models.learning import Enrollment
+from app.models.messaging import Notification, OutboundEmail
+from app.api.messaging import create_notification
+from app.services.notification_dispatch import create_notifications
+
+TABLES = [User.__table__, Course.__table__, Enrollment.__table__, Notification.__table__, OutboundEmail.__table__]
+
+
+class StatementCounter:
+    """Counts statements sent to the database"""
+
+    def __init__(self, engine):
+        self.count = 0
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+
+def create_course(database_url: str, students: int):
+    """Fresh database with one course and its enrolled students"""
+    if database_url.startswith("sqlite"):
+        engine = create_engine(database_url, connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    else:
+        engine = create_engine(database_url)
+    Base.metadata.drop_all(engine, tables=TABLES)
+    Base.metadata.create_all(engine, tables=TABLES)
+    db = sessionmaker(bind=engine)()
+
+    instructor = User(email="instructor@example.com", hashed_password="x", role="instructor")
+    db.add(instructor)
+    db.flush()
+    course = Course(title="Excavator Operation", instructor_id=instructor.id)
+    db.add(course)
+    db.flush()
+    users = [User(email=f"student{i}@example.com", hashed_password="x", role="student") for i in range(students)]
+    db.add_all(users)
+    db.flush()
+    db.add_all([Enrollment(user_id=user.id, course_id=course.id, status="active") for user in users])
+    db.commit()
+    return engine, db, course, [user.id for user in users]
+
+
+def notify_per_recipient(db, course, user_ids):
+    """Original path: one create_notification (and commit) per recipient"""
+    for user_id in user_ids:
+        create_notification(
+            db=db, user_id=user_id, title="New question in course discussion",
+            content="How do I check the hydraulic fluid?", notification_type="qa_reply",
+            related_entity_type="qa_post", related_entity_id=1, course_id=course.id
+        )
+
+
+def notify_bulk(db, course, user_ids):
+    """Bulk path: one create_notifications call for the whole course"""
+    create_notifications(
+        db, user_ids, title="New question in course discussion",
+        content="How do I check the hydraulic fluid?", notification_type="qa_reply",
+        related_entity_type="qa_post", related_entity_id=1, course_id=course.id
+    )
+
+
+def run_benchmark(label: str, notify, database_url: str, students: int) -> float:
+    """Time a notification path and print its statement count"""
+    engine, db, course, user_ids = create_course(database_url, students)
+    counter = StatementCounter(engine)
+
+    start = time.perf_counter()
+    notify(db, course, user_ids)
+    elapsed = time.perf_counter() - start
+
+    notifications = db.query(Notification).count()
+    emails = db.query(OutboundEmail).count()
+    db.close()
+    engine.dispose()
+    print(f"{label:<16} {elapsed * 1000:9.1f} ms  {counter.count:6d} statements  "
+          f"{notifications} notifications, {emails} emails queued")
+    return elapsed
+
+
+def main():
+    """Run the benchmark"""
+    parser = argparse.ArgumentParser(description="Benchmark course-wide notification creation")
+    parser.add_argument("--students", type=int, default=500)
+    parser.add_argument("--database-url", default="sqlite://",
+                        help="Database to benchmark against (tables are dropped and recreated)")
+    args = parser.parse_args()
+
+    # Queue emails as if SMTP were configured; nothing is sent
+    email_service.smtp_use_tls = False
+
+    print(f"🔔 Bulk Notification Benchmark ({args.students} students)")
+    print("=" * 50)
+    per_recipient = run_benchmark("per-recipient", notify_per_recipient, args.database_url, args.students)
+    bulk = run_benchmark("bulk", notify_bulk, args.database_url, args.students)
+    print(f"✅ Bulk creation is {per_recipient / bulk:.1f}x faster")
+
+
+if __name__ == "__main__":
+    main()
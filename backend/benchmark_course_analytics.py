@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Course Analytics Benchmark
+Compares the per-course, grouped-aggregate and rolled-up /analytics/courses report on a seeded database
+"""
+
+import os
+import sys
+import time
+import argparse
+import statistics
+from datetime import date, datetime, timedelta
+
+# Add the app directory to the Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from sqlalchemy import create_engine, event, insert
+from sqlalchemy.orm import joinedload, sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.core.database import Base
+from app.models import User, Course
+from app.models.analytics import (
+    AnalyticsEvent, CourseAnalytics, PlatformMetrics, RollupWatermark, UserEngagementMetrics
+)
+from app.models.learning import Assessment, AssessmentAttempt, Enrollment, LearningSession
+from app.services.analytics_rollups import run_rollups
+from app.services.course_analytics import course_report
+
+TABLES = [
+    User.__table__, Course.__table__, Enrollment.__table__, LearningSession.__table__,
+    Assessment.__table__, AssessmentAttempt.__table__, AnalyticsEvent.__table__,
+    PlatformMetrics.__table__, CourseAnalytics.__table__, UserEngagementMetrics.__table__, RollupWatermark.__table__
+]
+INSERT_CHUNK = 20000
+
+
+class StatementCounter:
+    """Counts statements sent to the database"""
+
+    def __init__(self, engine):
+        self.count = 0
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+
+def insert_rows(db, table, rows):
+    """Core executemany inserts in chunks"""
+    for i in range(0, len(rows), INSERT_CHUNK):
+        db.execute(insert(table), rows[i:i + INSERT_CHUNK])
+
+
+def seed(database_url: str, courses: int, enrollments_per_course: int):
+    """Every student enrolled in every course, with sessions and assessment attempts"""
+    if database_url.startswith("sqlite"):
+        engine = create_engine(database_url, connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    else:
+        engine = create_engine(database_url)
+    Base.metadata.drop_all(engine, tables=TABLES)
+    Base.metadata.create_all(engine, tables=TABLES)
+    db = sessionmaker(bind=engine)()
+
+    now = datetime.utcnow()
+    insert_rows(db, User.__table__, [
+        {"id": i + 1, "email": f"user{i}@example.com", "hashed_password": "x",
+         "role": "instructor" if i == 0 else "student"}
+        for i in range(enrollments_per_course + 1)
+    ])
+    insert_rows(db, Course.__table__, [
+        {"id": c + 1, "title": f"Course {c}", "instructor_id": 1, "category": "Plant", "status": "published"}
+        for c in range(courses)
+    ])
+    insert_rows(db, Assessment.__table__, [
+        {"id": c + 1, "course_id": c + 1, "title": "Final test", "passing_score": 70, "total_questions": 20}
+        for c in range(courses)
+    ])
+
+    enrollments, sessions, attempts = [], [], []
+    for c in range(courses):
+        for s in range(enrollments_per_course):
+            n = c * enrollments_per_course + s
+            enrollments.append({
+                "user_id": s + 2, "course_id": c + 1, "status": "completed" if n % 7 == 0 else "active",
+                "created_at": now - timedelta(days=n % 90)
+            })
+            if n % 5 == 0:
+                sessions.append({"user_id": s + 2, "course_id": c + 1, "duration_minutes": 10 + n % 50,
+                                 "started_at": now - timedelta(days=n % 60)})
+            if n % 10 == 0:
+                attempts.append({"user_id": s + 2, "assessment_id": c + 1, "score": n % 100, "total_score": 100,
+                                 "percentage": float(n % 100), "passed": n % 100 >= 70,
+                                 "started_at": now - timedelta(days=n % 45)})
+    insert_rows(db, Enrollment.__table__, enrollments)
+    insert_rows(db, LearningSession.__table__, sessions)
+    insert_rows(db, AssessmentAttempt.__table__, attempts)
+    db.commit()
+    print(f"Seeded {courses} courses, {len(enrollments)} enrollments, "
+          f"{len(sessions)} sessions, {len(attempts)} attempts")
+    return engine, db
+
+
+def per_course_report(db, start_date: date):
+    """Original shape: every enrollment eager-loaded, then sessions and attempts pulled per course"""
+    since = datetime.combine(start_date, datetime.min.time())
+    report = []
+    for course in db.query(Course).options(joinedload(Course.enrollments)).all():
+        recent = len([e for e in course.enrollments if e.created_at >= since])
+        sessions = db.query(LearningSession).filter(
+            LearningSession.course_id == course.id, LearningSession.started_at >= since
+        ).all()
+        attempts = db.query(AssessmentAttempt).join(Assessment).filter(
+            Assessment.course_id == course.id, AssessmentAttempt.started_at >= since
+        ).all()
+        report.append((course.id, len(course.enrollments), recent, sum(s.duration_minutes for s in sessions),
+                       len([a for a in attempts if a.passed])))
+    return report
+
+
+def run_benchmark(label: str, build, engine, db, runs: int) -> float:
+    """Time a report builder and print its statement count and p95"""
+    counter = StatementCounter(engine)
+    start_date = date.today() - timedelta(days=30)
+    timings = []
+    for _ in range(runs):
+        db.expunge_all()
+        counter.count = 0
+        start = time.perf_counter()
+        build(db, start_date)
+        timings.append(time.perf_counter() - start)
+    p95 = statistics.quantiles(timings, n=20)[-1] if runs > 1 else timings[0]
+    print(f"{label:<12} median {statistics.median(timings) * 1000:9.1f} ms  p95 {p95 * 1000:9.1f} ms  "
+          f"{counter.count:5d} statements per report")
+    event.remove(engine, "before_cursor_execute", counter._on_execute)
+    return p95
+
+
+def main():
+    """Run the benchmark"""
+    parser = argparse.ArgumentParser(description="Benchmark the /analytics/courses report")
+    parser.add_argument("--courses", type=int, default=200)
+    parser.add_argument("--enrollments-per-course", type=int, default=5000)
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--per-course-runs", type=int, default=3,
+                        help="Runs of the original per-course report (0 to skip it)")
+    parser.add_argument("--database-url", default="sqlite://",
+                        help="Database to benchmark against (tables are dropped and recreated)")
+    args = parser.parse_args()
+
+    print(f"📊 Course Analytics Benchmark ({args.courses} courses x {args.enrollments_per_course} enrollments)")
+    print("=" * 50)
+    engine, db = seed(args.database_url, args.courses, args.enrollments_per_course)
+
+    grouped = run_benchmark("grouped", course_report, engine, db, args.runs)
+    if args.per_course_runs:
+        per_course = run_benchmark("per-course", per_course_report, engine, db, args.per_course_runs)
+        print(f"✅ Grouped aggregates are {per_course / grouped:.1f}x faster at p95")
+
+    start = time.perf_counter()
+    days = run_rollups(db)
+    print(f"Rolled up {days} days in {(time.perf_counter() - start) * 1000:.1f} ms")
+    rolled = run_benchmark("rolled-up", course_report, engine, db, args.runs)
+    print(f"✅ Reading the daily rollups is {grouped / rolled:.1f}x faster at p95 than grouping raw rows")
+    db.close()
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
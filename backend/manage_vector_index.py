@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Vector Index Management
+Rebuilds the per-course ANN indexes and reports recall@k vs latency against exact search
+"""
+
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+
+# Add the app directory to the Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.core.config import settings
+from app.services.vector_store import (
+    SegmentedVectorStore, PartitionedIndex, ANN_INDEX_TYPES, HASHING_STORE, MINILM_STORE, embedder_store_path
+)
+
+
+def load_vectors(store: SegmentedVectorStore):
+    """Read every stored vector with its chunk id and course"""
+    segments = store.load()
+    if not segments:
+        return None, None, None
+
+    vectors = np.concatenate([np.asarray(segment.vectors) for segment in segments])
+    ids = np.concatenate([segment.chunks["id"] for segment in segments])
+    courses = np.concatenate([segment.chunks["course"] for segment in segments])
+    return vectors, ids, courses
+
+
+def rebuild(args):
+    """Train and persist indexes of the requested type"""
+    print(f"🔧 Rebuilding '{args.index_type}' vector indexes for the '{args.store}' store")
+    print("=" * 60)
+
+    store_path = embedder_store_path(args.store)
+    store = SegmentedVectorStore(store_path, settings.vector_dimension)
+    vectors, ids, courses = load_vectors(store)
+    if vectors is None:
+        print("⚠️  Vector store is empty, nothing to rebuild")
+        return
+
+    start = time.perf_counter()
+    index = PartitionedIndex(settings.vector_dimension, args.index_type)
+    index.build(vectors, ids, courses)
+    index.save(store_path / "indexes", covered_ids=store.next_id)
+    elapsed = time.perf_counter() - start
+
+    print(f"✅ Indexed {index.ntotal} vectors in {len(index.partitions)} course partitions ({elapsed:.1f}s)")
+    if args.index_type != settings.vector_index_type.lower():
+        print(f"⚠️  VECTOR_INDEX_TYPE is '{settings.vector_index_type}'; "
+              f"set it to '{args.index_type}' to use these indexes")
+
+
+def evaluate(args):
+    """Compare each ANN index type with exact search on course-scoped queries"""
+    print(f"📊 Vector index recall@k vs latency for the '{args.store}' store")
+    print("=" * 60)
+
+    store = SegmentedVectorStore(embedder_store_path(args.store), settings.vector_dimension)
+    vectors, ids, courses = load_vectors(store)
+    if vectors is None:
+        print("⚠️  Vector store is empty, nothing to evaluate")
+        return
+
+    # Use stored chunks, lightly perturbed, as queries against their own course
+    rng = np.random.default_rng(args.seed)
+    sample = rng.choice(len(vectors), size=min(args.queries, len(vectors)), replace=False)
+    queries = vectors[sample] + rng.normal(0, 0.01, size=(len(sample), vectors.shape[1])).astype('float32')
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    query_courses = courses[sample]
+
+    print(f"Vectors: {len(vectors)}, queries: {len(sample)}, k: {args.k}")
+    print("-" * 60)
+    print(f"{'index':<8} {'build (s)':>10} {'recall@k':>10} {'p50 (ms)':>10} {'p95 (ms)':>10}")
+
+    exact = None
+    for index_type in ["flat"] + list(args.types):
+        start = time.perf_counter()
+        index = PartitionedIndex(settings.vector_dimension, index_type)
+        index.build(vectors, ids, courses)
+        build_time = time.perf_counter() - start
+
+        results = []
+        latencies = []
+        for query, course in zip(queries, query_courses):
+            start = time.perf_counter()
+            hits = index.search(query.reshape(1, -1), args.k, [int(course)])
+            latencies.append((time.perf_counter() - start) * 1000)
+            results.append({idx for _, idx in hits})
+
+        if exact is None:
+            exact = results
+        recall = np.mean([
+            len(found & truth) / len(truth) if truth else 1.0
+            for found, truth in zip(results, exact)
+        ])
+        print(f"{index_type:<8} {build_time:>10.2f} {recall:>10.3f} "
+              f"{np.percentile(latencies, 50):>10.3f} {np.percentile(latencies, 95):>10.3f}")
+
+
+def main():
+    """Parse arguments and run the selected command"""
+    parser = argparse.ArgumentParser(description="Manage the RAG vector indexes")
+    parser.add_argument("--store", choices=[HASHING_STORE, MINILM_STORE], default=HASHING_STORE,
+                        help="embedder whose vectors to index (the API serves the hashing store)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    rebuild_parser = subparsers.add_parser("rebuild", help="train and save indexes")
+    rebuild_parser.add_argument("--index-type", default=settings.vector_index_type.lower(),
+                                help="faiss/flat, hnsw or ivfpq")
+    rebuild_parser.set_defaults(func=rebuild)
+
+    evaluate_parser = subparsers.add_parser("evaluate", help="report recall@k and latency")
+    evaluate_parser.add_argument("--types", nargs="+", default=list(ANN_INDEX_TYPES))
+    evaluate_parser.add_argument("--k", type=int, default=10)
+    evaluate_parser.add_argument("--queries", type=int, default=200)
+    evaluate_parser.add_argument("--seed", type=int, default=0)
+    evaluate_parser.set_defaults(func=evaluate)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
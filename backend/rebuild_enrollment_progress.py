@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""
+Enrollment Progress Backfill
+Rebuilds the enrollment_progress table from learning-session history
+"""
+
+import os
+import sys
+
+# Add the app directory to the Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.core.database import SessionLocal
+from app.services.enrollment_progress import rebuild_enrollment_progress
+
+
+def main():
+    """Rebuild every enrollment's progress row"""
+    print("🔧 Rebuilding enrollment progress")
+    print("=" * 50)
+
+    db = SessionLocal()
+    try:
+        rebuilt = rebuild_enrollment_progress(db)
+        db.commit()
+        print(f"✅ Rebuilt progress for {rebuilt} enrollments")
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Rebuild failed: {e}")
+        sys.exit(1)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
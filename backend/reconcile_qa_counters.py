@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+Q&A Counter Reconciliation
+Recomputes reply and vote counters on Q&A posts and repairs any drift
+"""
+
+import os
+import sys
+
+# Add the app directory to the Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.core.database import SessionLocal
+from app.services.qa_counters import reconcile_qa_counters
+
+
+def main():
+    """Run the reconciliation once"""
+    print("🔧 Reconciling Q&A post counters")
+    print("=" * 50)
+
+    db = SessionLocal()
+    try:
+        repaired = reconcile_qa_counters(db)
+        if repaired:
+            print(f"✅ Repaired counters on {repaired} posts")
+        else:
+            print("✅ All counters are consistent")
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Reconciliation failed: {e}")
+        sys.exit(1)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Analytics Rollups
+Rolls raw activity up into the daily platform, course and user metrics tables
+"""
+
+import os
+import sys
+import argparse
+from datetime import date
+
+# Add the app directory to the Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.core.database import SessionLocal
+from app.services.analytics_rollups import rollup_through, run_rollups
+
+
+def main():
+    """Run the rollups once, from the watermark or from scratch"""
+    parser = argparse.ArgumentParser(description="Roll up daily analytics metrics")
+    parser.add_argument("--through", type=date.fromisoformat, help="Last day to roll up (YYYY-MM-DD, default yesterday)")
+    parser.add_argument("--rebuild", action="store_true", help="Rebuild every day from the first recorded activity")
+    args = parser.parse_args()
+
+    print("📊 Rolling up daily analytics metrics")
+    print("=" * 50)
+
+    db = SessionLocal()
+    try:
+        days = run_rollups(db, through=args.through, rebuild=args.rebuild)
+        if days:
+            print(f"✅ Rolled up {days} days, through {rollup_through(db)}")
+        else:
+            print(f"✅ Already rolled up through {rollup_through(db)}")
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Rollup failed: {e}")
+        sys.exit(1)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
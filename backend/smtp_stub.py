@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Local SMTP stub for trying the notification email queue
+Accepts plain SMTP without TLS or auth and prints (or collects) every message
+
+Usage:
+    python smtp_stub.py [--port 1025]
+    SMTP_SERVER=localhost SMTP_PORT=1025 SMTP_USE_TLS=false uvicorn app.main:app
+"""
+
+import argparse
+import socketserver
+import threading
+from email import message_from_bytes
+from typing import List, Optional
+
+
+class SMTPStubHandler(socketserver.StreamRequestHandler):
+    """Speaks just enough SMTP for smtplib: EHLO/HELO, MAIL, RCPT, DATA, NOOP, RSET, QUIT"""
+
+    def reply(self, line: str) -> None:
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        self.server.connections += 1
+        self.reply("220 smtp-stub ready")
+        sender, recipients = None, []
+
+        for raw in self.rfile:
+            command = raw.decode(errors="replace").strip()
+            verb = command[:4].upper()
+
+            if verb in ("EHLO", "HELO"):
+                self.reply("250 smtp-stub")
+            elif verb == "MAIL":
+                sender, recipients = command.split(":", 1)[1].strip(" <>"), []
+                self.reply("250 OK")
+            elif verb == "RCPT":
+                recipients.append(command.split(":", 1)[1].strip(" <>"))
+                self.reply("250 OK")
+            elif verb == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                lines = []
+                for data_line in self.rfile:
+                    if data_line in (b".\r\n", b".\n"):
+                        break
+                    lines.append(data_line[1:] if data_line.startswith(b"..") else data_line)
+                self.server.deliver(sender, recipients, b"".join(lines))
+                self.reply("250 OK: queued")
+            elif verb in ("NOOP", "RSET"):
+                if verb == "RSET":
+                    sender, recipients = None, []
+                self.reply("250 OK")
+            elif verb == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+
+class SMTPStub(socketserver.ThreadingTCPServer):
+    """Threaded SMTP stub; messages are kept in ``messages`` and optionally printed"""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host: str = "localhost", port: int = 0, verbose: bool = False):
+        super().__init__((host, port), SMTPStubHandler)
+        self.verbose = verbose
+        self.messages: List[dict] = []
+        self.connections = 0
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def port(self) -> int:
+        return self.server_address[1]
+
+    def deliver(self, sender: str, recipients: List[str], data: bytes) -> None:
+        message = message_from_bytes(data)
+        self.messages.append({"from": sender, "to": recipients, "subject": message["Subject"], "message": message})
+        if self.verbose:
+            print(f"📧 {sender} -> {', '.join(recipients)}: {message['Subject']}")
+
+    def start(self) -> "SMTPStub":
+        """Serve in a background thread"""
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local SMTP stub that prints received emails")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=1025)
+    args = parser.parse_args()
+
+    stub = SMTPStub(args.host, args.port, verbose=True)
+    print(f"📮 SMTP stub listening on {args.host}:{stub.port} (Ctrl+C to stop)")
+    try:
+        stub.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 Stopping SMTP stub")
+    finally:
+        stub.server_close()
+
+
+if __name__ == "__main__":
+    main()
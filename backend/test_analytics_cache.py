@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Analytics cache test
+Checks that admin analytics responses are served from the in-process cache,
+dropped when enrollments are written, and refreshed in the background once stale
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+from datetime import datetime
+
+# Add the app directory to the Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.core.config import settings
+from app.core.database import Base
+from app.models import User, Course
+from app.models.analytics import AnalyticsEvent, PlatformMetrics, RollupWatermark
+from app.models.learning import Assessment, AssessmentAttempt, Enrollment, LearningSession
+from app.api import analytics
+from app.services.analytics_cache import analytics_cache
+
+# Counts, the rollup watermark and the period totals
+MAX_OVERVIEW_QUERIES = 3
+
+
+class QueryCounter:
+    """Counts SELECT statements issued on an engine"""
+
+    def __init__(self, engine):
+        self.count = 0
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            self.count += 1
+
+
+def seeded_database():
+    """One course with a single enrollment, and an empty in-process cache"""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine, tables=[
+        User.__table__, Course.__table__, Enrollment.__table__, LearningSession.__table__,
+        Assessment.__table__, AssessmentAttempt.__table__, AnalyticsEvent.__table__,
+        PlatformMetrics.__table__, RollupWatermark.__table__
+    ])
+    session_factory = sessionmaker(bind=engine)
+    db = session_factory()
+
+    admin = User(email="admin@example.com", hashed_password="x", role="admin")
+    students = [User(email=f"student{i}@example.com", hashed_password="x", role="student") for i in range(3)]
+    db.add_all([admin] + students)
+    db.flush()
+    course = Course(title="Excavator basics", instructor_id=admin.id, category="Plant", status="published")
+    db.add(course)
+    db.flush()
+    db.add(Enrollment(user_id=students[0].id, course_id=course.id, status="active", created_at=datetime.utcnow()))
+    db.commit()
+    db.refresh(admin)
+
+    settings.analytics_cache_enabled = True
+    settings.analytics_cache_backend = "memory"
+    settings.analytics_cache_ttl_seconds = 300
+    analytics_cache.clear()
+    analytics_cache.session_factory = session_factory
+    return db, admin, course, students, QueryCounter(engine)
+
+
+def overview(db, admin):
+    """GET /analytics/overview for the last 30 days"""
+    return asyncio.run(analytics.get_platform_overview(days=30, current_user=admin, db=db))
+
+
+def enroll(db, student, course, invalidate=True):
+    """Write a new enrollment, dropping cached responses on commit unless told not to"""
+    db.add(Enrollment(user_id=student.id, course_id=course.id, status="active", created_at=datetime.utcnow()))
+    if invalidate:
+        analytics_cache.invalidate_on_commit(db)
+    db.commit()
+    db.refresh(student)
+
+
+def wait_for_refresh(timeout=5):
+    """Wait for background refreshes to finish"""
+    deadline = time.monotonic() + timeout
+    while analytics_cache._refreshing and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert not analytics_cache._refreshing
+
+
+def test_overview_is_cached():
+    """A repeated overview is answered from the cache without queries"""
+    db, admin, course, students, counter = seeded_database()
+
+    counter.count = 0
+    first = overview(db, admin)
+    assert first["courses"]["enrollments"] == 1
+    assert counter.count <= MAX_OVERVIEW_QUERIES
+    print(f"GET /analytics/overview: {counter.count} queries, then cached")
+
+    counter.count = 0
+    assert overview(db, admin) == first
+    assert counter.count == 0
+
+    # Other parameters are cached separately
+    week = asyncio.run(analytics.get_platform_overview(days=7, current_user=admin, db=db))
+    assert week["period"]["days"] == 7 and counter.count > 0
+
+
+def test_writes_invalidate():
+    """Enrollments written through the invalidation hook show up on the next request"""
+    db, admin, course, students, counter = seeded_database()
+    assert overview(db, admin)["courses"]["enrollments"] == 1
+
+    enroll(db, students[1], course)
+    db.refresh(admin)
+    assert overview(db, admin)["courses"]["enrollments"] == 2
+
+    # The export reads the same cache
+    counter.count = 0
+    response = asyncio.run(analytics.export_analytics_data(
+        format="json", metric="overview", days=30, current_user=admin, db=db
+    ))
+
+    async def body():
+        return "".join([chunk async for chunk in response.body_iterator])
+
+    exported = {row["metric"]: row["value"] for row in json.loads(asyncio.run(body()))}
+    assert exported["courses_enrollments"] == 2
+    assert counter.count == 0
+
+
+def test_stale_while_revalidate():
+    """A stale entry is served at once and replaced by a background refresh"""
+    db, admin, course, students, counter = seeded_database()
+    settings.analytics_cache_ttl_seconds = 0
+    try:
+        assert overview(db, admin)["courses"]["enrollments"] == 1
+
+        # Not invalidated, so only the refresh picks it up
+        enroll(db, students[2], course, invalidate=False)
+        db.refresh(admin)
+        assert overview(db, admin)["courses"]["enrollments"] == 1
+        wait_for_refresh()
+
+        # The refreshed entry is served next, and refreshed again since it is already stale
+        assert overview(db, admin)["courses"]["enrollments"] == 2
+        wait_for_refresh()
+    finally:
+        settings.analytics_cache_ttl_seconds = 300
+    print(f"Cache stats: {analytics_cache.stats()}")
+
+
+class SlowRedis:
+    """A Redis stand-in whose every call takes a while"""
+
+    def __init__(self, delay=0.2):
+        self.delay = delay
+        self.values = {}
+
+    def mget(self, *keys):
+        time.sleep(self.delay)
+        return [self.values.get(key) for key in keys]
+
+    def set(self, key, value, ex=None):
+        time.sleep(self.delay)
+        self.values[key] = value
+
+    def incr(self, key):
+        time.sleep(self.delay)
+        self.values[key] = int(self.values.get(key) or 0) + 1
+
+
+def test_redis_calls_leave_the_event_loop_free():
+    """Slow Redis round trips run off the event loop, and reads follow queued invalidations"""
+    db, admin, course, students, counter = seeded_database()
+    slow = SlowRedis()
+    analytics_cache._backend = "redis"
+    analytics_cache._redis = slow
+
+    async def scenario():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        task = asyncio.create_task(ticker())
+        first = await analytics.get_platform_overview(days=30, current_user=admin, db=db)
+        assert ticks >= 10, ticks
+
+        # Invalidated from the loop: the next read waits for the increment, then misses
+        enroll(db, students[1], course)
+        counter.count = 0
+        second = await analytics.get_platform_overview(days=30, current_user=admin, db=db)
+        task.cancel()
+        return first, second
+
+    try:
+        first, second = asyncio.run(scenario())
+    finally:
+        analytics_cache.clear()
+    assert first["courses"]["enrollments"] == 1
+    assert second["courses"]["enrollments"] == 2 and counter.count > 0
+    assert slow.values["analytics:cache:generation"] == 1
+
+
+def main():
+    """Run the analytics cache tests"""
+    print("🗄️ Analytics Cache Test")
+    print("=" * 50)
+    test_overview_is_cached()
+    print("✅ Repeated overviews are served from the cache")
+    test_writes_invalidate()
+    print("✅ Enrollment writes invalidate cached responses")
+    test_stale_while_revalidate()
+    print("✅ Stale responses are served while refreshed in the background")
+    test_redis_calls_leave_the_event_loop_free()
+    print("✅ Redis calls run off the event loop")
+
+
+if __name__ == "__main__":
+    main()
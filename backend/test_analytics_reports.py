@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+Query-count test for the admin analytics reports
+Seeds an in-memory SQLite database with several courses and checks that the
+course and user engagement reports are built from grouped aggregates in a
+constant number of queries, and read the same before and after the daily
+rollups run
+"""
+
+import os
+import sys
+import asyncio
+import csv
+import io
+from datetime import datetime, timedelta
+
+# Add the app directory to the Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from fastapi import Response
+from sqlalchemy import create_engine, event, func
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.core.config import settings
+from app.core.database import Base
+from app.core.pagination import NEXT_CURSOR_HEADER
+from app.models import User, Course
+from app.models.analytics import (
+    AnalyticsEvent, CourseAnalytics, PlatformMetrics, RollupWatermark, UserEngagementMetrics
+)
+from app.models.learning import Assessment, AssessmentAttempt, Enrollment, LearningSession
+from app.api import analytics
+from app.services.analytics_rollups import COURSES as COURSE_ROLLUPS, daily_metrics, rollup_through, run_rollups
+
+COURSES = 12
+STUDENTS = 15
+# Courses, the rollup watermark, rolled-up totals and unique learners
+MAX_COURSE_REPORT_QUERIES = 4
+# The rollup watermark, then users outer-joined to their totals
+MAX_ENGAGEMENT_PAGE_QUERIES = 2
+
+
+class QueryCounter:
+    """Counts SELECT statements issued on an engine"""
+
+    def __init__(self, engine):
+        self.count = 0
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            self.count += 1
+
+
+def seeded_database():
+    """Courses with enrollments, learning sessions and assessment attempts"""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine, tables=[
+        User.__table__, Course.__table__, Enrollment.__table__, LearningSession.__table__,
+        Assessment.__table__, AssessmentAttempt.__table__, AnalyticsEvent.__table__,
+        PlatformMetrics.__table__, CourseAnalytics.__table__, UserEngagementMetrics.__table__,
+        RollupWatermark.__table__
+    ])
+    db = sessionmaker(bind=engine)()
+
+    admin = User(email="admin@example.com", hashed_password="x", role="admin")
+    students = [User(email=f"student{i}@example.com", hashed_password="x", role="student") for i in range(STUDENTS)]
+    db.add_all([admin] + students)
+    db.flush()
+
+    now = datetime.utcnow()
+    for c in range(COURSES):
+        course = Course(title=f"Course {c}", instructor_id=admin.id, category="Plant", status="published")
+        db.add(course)
+        db.flush()
+        assessment = Assessment(course_id=course.id, title="Final test", passing_score=70, total_questions=10)
+        db.add(assessment)
+        db.flush()
+        # Course c has c + 1 students; every third enrollment is old, every fourth completed
+        for s, student in enumerate(students[:c + 1]):
+            db.add(Enrollment(user_id=student.id, course_id=course.id,
+                              status="completed" if s % 4 == 0 else "active",
+                              created_at=now - timedelta(days=60 if s % 3 == 0 else 1)))
+            db.add(LearningSession(user_id=student.id, course_id=course.id, duration_minutes=30,
+                                   started_at=now - timedelta(days=2)))
+            db.add(AssessmentAttempt(user_id=student.id, assessment_id=assessment.id, score=60 + 5 * s,
+                                     total_score=100, percentage=60.0 + 5 * s, passed=60 + 5 * s >= 70,
+                                     started_at=now - timedelta(days=2)))
+        # Activity from before the reporting period is ignored
+        db.add(LearningSession(user_id=students[0].id, course_id=course.id, duration_minutes=600,
+                               started_at=now - timedelta(days=90)))
+    # Student s logs in s times
+    for s, student in enumerate(students):
+        db.add_all([
+            AnalyticsEvent(user_id=student.id, event_type="login", event_category="user", created_at=now)
+            for _ in range(s)
+        ])
+    db.commit()
+    db.refresh(admin)
+    # Every call here should hit the database
+    settings.analytics_cache_enabled = False
+    return db, admin, QueryCounter(engine)
+
+
+def test_course_report_query_count():
+    """GET /analytics/courses reports every course in a constant number of queries"""
+    db, admin, counter = seeded_database()
+
+    counter.count = 0
+    report = asyncio.run(analytics.get_course_analytics(course_id=None, days=30, current_user=admin, db=db))
+    print(f"GET /analytics/courses: {len(report['courses'])} courses in {counter.count} queries")
+
+    assert len(report["courses"]) == COURSES
+    assert counter.count <= MAX_COURSE_REPORT_QUERIES
+    for c, course in enumerate(report["courses"]):
+        students = c + 1
+        passed = len([s for s in range(students) if 60 + 5 * s >= 70])
+        assert course["enrollments"]["total"] == students
+        assert course["enrollments"]["recent"] == len([s for s in range(students) if s % 3])
+        assert course["enrollments"]["completions"] == len([s for s in range(students) if s % 4 == 0])
+        assert course["learning"] == {
+            "total_hours": round(students * 0.5, 2), "unique_learners": students, "average_session_duration": 0.5
+        }
+        assert course["assessments"]["total_attempts"] == students
+        assert course["assessments"]["passed_attempts"] == passed
+        assert course["assessments"]["average_score"] == round(sum(60 + 5 * s for s in range(students)) / students, 2)
+
+    single = asyncio.run(analytics.get_course_analytics(
+        course_id=report["courses"][3]["course_id"], days=30, current_user=admin, db=db
+    ))
+    assert single["courses"] == [report["courses"][3]]
+
+
+def expected_engagement(s):
+    """Engagement totals for student s, who is in courses s..COURSES-1"""
+    courses = max(COURSES - s, 0)
+    recent = courses if s % 3 else 0
+    return {
+        "login_count": s,
+        "learning_hours": round(courses * 0.5, 2),
+        "session_count": courses,
+        "courses_enrolled": recent,
+        "courses_completed": recent if s % 4 == 0 else 0,
+        "assessments_attempted": courses,
+        "assessments_passed": courses if 60 + 5 * s >= 70 else 0,
+        "average_score": 60.0 + 5 * s if courses else 0.0,
+    }
+
+
+def test_engagement_pages_and_streams():
+    """GET /analytics/users/engagement pages sorted rows in one query each; the export streams them all"""
+    db, admin, counter = seeded_database()
+
+    users, cursor, pages = [], None, 0
+    while True:
+        counter.count = 0
+        response = Response()
+        page = asyncio.run(analytics.get_user_engagement_analytics(
+            days=30, user_role="student", limit=4, cursor=cursor, sort="logins", response=response,
+            current_user=admin, db=db
+        ))
+        assert counter.count <= MAX_ENGAGEMENT_PAGE_QUERIES
+        users += page["users"]
+        pages += 1
+        cursor = response.headers.get(NEXT_CURSOR_HEADER)
+        if not cursor:
+            break
+    print(f"GET /analytics/users/engagement: {len(users)} users in {pages} pages of {MAX_ENGAGEMENT_PAGE_QUERIES} queries")
+
+    # Highest login count first, so student s is at position STUDENTS - 1 - s
+    assert len(users) == STUDENTS
+    for position, user in enumerate(users):
+        assert user["email"] == f"student{STUDENTS - 1 - position}@example.com"
+        assert user["engagement"] == expected_engagement(STUDENTS - 1 - position)
+
+    response = asyncio.run(analytics.export_user_engagement(
+        days=30, user_role="student", sort="logins", format="csv", current_user=admin, db=db
+    ))
+
+    async def body():
+        return "".join([chunk async for chunk in response.body_iterator])
+
+    rows = list(csv.DictReader(io.StringIO(asyncio.run(body()))))
+    assert [row["email"] for row in rows] == [user["email"] for user in users]
+    assert rows[0]["login_count"] == str(STUDENTS - 1)
+
+
+def reports(db, admin):
+    """Every report that reads the daily rollups"""
+    engagement = asyncio.run(analytics.get_user_engagement_analytics(
+        days=30, user_role="student", limit=STUDENTS, cursor=None, sort="logins", current_user=admin, db=db
+    ))
+    overview = asyncio.run(analytics.get_platform_overview(days=30, current_user=admin, db=db))
+    return {
+        "courses": asyncio.run(analytics.get_course_analytics(course_id=None, days=30, current_user=admin, db=db)),
+        "engagement": engagement["users"],
+        "overview": {key: overview[key] for key in ("courses", "learning", "engagement")},
+        "timeseries": {
+            (metric, granularity): asyncio.run(analytics.get_timeseries_data(
+                metric=metric, days=30, granularity=granularity, current_user=admin, db=db
+            ))["data"]
+            for metric in analytics.TIMESERIES_METRICS for granularity in ("daily", "weekly")
+        },
+    }
+
+
+def test_reports_match_after_rollups():
+    """Reports read the same from raw tables, from rollups plus a live tail, and after a re-roll"""
+    db, admin, _ = seeded_database()
+    live = reports(db, admin)
+    assert sum(point["value"] for point in live["timeseries"][("enrollments", "daily")]) == \
+        live["overview"]["courses"]["enrollments"]
+
+    days = run_rollups(db)
+    assert days > 1
+    assert rollup_through(db) == datetime.utcnow().date() - timedelta(days=1)
+    assert db.query(CourseAnalytics).count() >= COURSES * 2
+    assert reports(db, admin) == live
+    print(f"Rolled up {days} days; reports unchanged")
+
+    # Distinct viewers are kept per day but not offered for summing over a range
+    assert db.query(func.max(CourseAnalytics.unique_viewers)).scalar() == COURSES
+    assert "unique_viewers" not in daily_metrics(db, COURSE_ROLLUPS).c
+
+    # A second run only re-rolls the lookback window and changes nothing
+    assert run_rollups(db) > 0
+    assert reports(db, admin) == live
+
+    # Activity logged today shows up through the live tail
+    student = db.query(User).filter(User.email == "student0@example.com").one()
+    db.add(AnalyticsEvent(user_id=student.id, event_type="login", event_category="user",
+                          created_at=datetime.utcnow()))
+    db.commit()
+    db.refresh(admin)
+    engagement = reports(db, admin)["engagement"]
+    assert engagement[-1]["engagement"]["login_count"] == 1
+
+    assert run_rollups(db, rebuild=True) > days - 1
+    assert reports(db, admin)["engagement"] == engagement
+
+
+def main():
+    """Run the analytics report tests"""
+    print("📊 Analytics Report Query Count Test")
+    print("=" * 50)
+    test_course_report_query_count()
+    print("✅ The course report uses a constant number of queries")
+    test_engagement_pages_and_streams()
+    print("✅ User engagement pages in two queries and streams for export")
+    test_reports_match_after_rollups()
+    print("✅ Reports match before and after the daily rollups")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Outbound email queue test
+Drains queued notifications through a local SMTP stub and checks digests,
+connection reuse and retry backoff
+"""
+
+import os
+import sys
+import socket
+from datetime import datetime
+
+# Add the app directory to the Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.core.config import settings
+from app.core.database import Base
+from app.core.email import EmailService
+from app.models.messaging import OutboundEmail
+from app.services.email_queue import EmailWorker, enqueue_notification_email
+from smtp_stub import SMTPStub
+
+
+def create_session_factory():
+    """In-memory database with the outbound email table"""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine, tables=[OutboundEmail.__table__])
+    return sessionmaker(bind=engine)
+
+
+def create_sender(port: int) -> EmailService:
+    """Email service pointed at a plain-SMTP server on localhost"""
+    sender = EmailService()
+    sender.smtp_server = "localhost"
+    sender.smtp_port = port
+    sender.smtp_use_tls = False
+    sender.smtp_username = sender.smtp_password = ""
+    return sender
+
+
+def unused_port() -> int:
+    """A local port with nothing listening on it"""
+    with socket.socket() as sock:
+        sock.bind(("localhost", 0))
+        return sock.getsockname()[1]
+
+
+def queue(session_factory, *recipients):
+    """Queue one notification per recipient, due immediately"""
+    db = session_factory()
+    for index, to_email in enumerate(recipients):
+        email = enqueue_notification_email(
+            db, to_email=to_email, notification_type="system",
+            title=f"Notice {index}", content="Something happened"
+        )
+        email.next_attempt_at = datetime.utcnow()
+    db.commit()
+    db.close()
+
+
+def statuses(session_factory):
+    db = session_factory()
+    rows = db.query(OutboundEmail).order_by(OutboundEmail.id).all()
+    db.close()
+    return rows
+
+
+def test_digest_over_one_connection():
+    """Notifications for one address become a digest, all sent over one SMTP connection"""
+    session_factory = create_session_factory()
+    stub = SMTPStub().start()
+    sender = create_sender(stub.port)
+    worker = EmailWorker(session_factory, sender)
+    try:
+        queue(session_factory, "a@example.com", "a@example.com", "b@example.com", "a@example.com")
+        sent = worker.run_once()
+        print(f"Sent {sent} notifications as {len(stub.messages)} emails over {stub.connections} connection(s)")
+
+        subjects = {message["to"][0]: message["subject"] for message in stub.messages}
+        assert sent == 4
+        assert subjects == {"a@example.com": "You have 3 new notifications", "b@example.com": "Notice 2"}
+        assert stub.connections == 1
+        assert all(row.status == "sent" and row.sent_at for row in statuses(session_factory))
+        assert worker.run_once() == 0
+    finally:
+        sender.close()
+        stub.stop()
+
+
+def test_retry_with_backoff():
+    """Failed sends are retried later and marked failed after the last attempt"""
+    session_factory = create_session_factory()
+    sender = create_sender(unused_port())
+    worker = EmailWorker(session_factory, sender)
+    queue(session_factory, "a@example.com")
+
+    assert worker.run_once() == 0
+    row = statuses(session_factory)[0]
+    print(f"After failure: {row.status}, attempt {row.attempts}, retry at {row.next_attempt_at}")
+    assert row.status == "pending" and row.attempts == 1
+    assert row.next_attempt_at > datetime.utcnow()
+    # Not due again until the backoff has passed
+    assert worker.run_once() == 0
+    assert statuses(session_factory)[0].attempts == 1
+
+    db = session_factory()
+    db.query(OutboundEmail).update({"attempts": settings.email_max_attempts - 1, "next_attempt_at": datetime.utcnow()})
+    db.commit()
+    db.close()
+    worker.run_once()
+    row = statuses(session_factory)[0]
+    assert row.status == "failed" and row.attempts == settings.email_max_attempts and row.last_error
+
+
+def main():
+    """Run the email queue test"""
+    print("📧 Outbound Email Queue Test")
+    print("=" * 50)
+    test_digest_over_one_connection()
+    test_retry_with_backoff()
+    print("✅ Email queue sends digests over a pooled connection and retries with backoff")
+
+
+if __name__ == "__main__":
+    main()
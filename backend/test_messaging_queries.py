@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+"""
+Query-count test for the messaging list endpoints
+Seeds an in-memory SQLite database and checks that a full page of messages,
+Q&A posts and notifications is built in a constant number of queries
+"""
+
+import os
+import sys
+import asyncio
+
+# Add the app directory to the Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from fastapi import Response
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.core.database import Base
+from app.models import User, Course
+from app.models.messaging import Message, QAPost, QAVote, Notification
+from app.api import messaging
+from app.schemas.messaging import QAVoteCreate
+from app.services.qa_counters import reconcile_qa_counters
+from app.services import notification_dispatch
+from app.services.notification_dispatch import create_notifications
+from app.services import message_search
+
+PAGE_SIZE = 100
+# Main query plus users, courses and reply counts (the caller's votes for posts)
+MAX_MESSAGE_QUERIES = 4
+MAX_QA_POST_QUERIES = 4
+MAX_NOTIFICATION_QUERIES = 2
+# INSERT ... RETURNING for the notifications, whatever the number of recipients
+MAX_BULK_NOTIFICATION_STATEMENTS = 1
+
+
+class QueryCounter:
+    """Counts SELECT statements (and all statements) issued on an engine"""
+
+    def __init__(self, engine):
+        self.count = 0
+        self.statements = 0
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements += 1
+        if statement.lstrip().upper().startswith("SELECT"):
+            self.count += 1
+
+
+def create_session():
+    """Create an in-memory database with the messaging tables"""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine, tables=[
+        User.__table__, Course.__table__, Message.__table__,
+        QAPost.__table__, QAVote.__table__, Notification.__table__
+    ])
+    return engine, sessionmaker(bind=engine)()
+
+
+def seed(db):
+    """Create users, courses and a page's worth of messages, posts and notifications"""
+    users = [
+        User(email=f"user{i}@example.com", hashed_password="x", role="student" if i else "instructor")
+        for i in range(20)
+    ]
+    db.add_all(users)
+    db.flush()
+    me = users[0]
+
+    courses = [Course(title=f"Course {i}", instructor_id=me.id) for i in range(5)]
+    db.add_all(courses)
+    db.flush()
+
+    for i in range(PAGE_SIZE):
+        message = Message(
+            sender_id=users[1 + i % 19].id, recipient_id=me.id, subject=f"Subject {i}",
+            content="Hello", course_id=courses[i % 5].id
+        )
+        db.add(message)
+        db.flush()
+        db.add(Message(sender_id=me.id, recipient_id=message.sender_id, subject="Re",
+                       content="Reply", parent_message_id=message.id))
+
+        post = QAPost(course_id=courses[i % 5].id, author_id=users[1 + i % 19].id,
+                      title=f"Question {i}", content="How?")
+        db.add(post)
+        db.flush()
+        db.add(QAPost(course_id=post.course_id, author_id=me.id, title="Answer",
+                      content="Like this", parent_post_id=post.id))
+        db.add_all([
+            QAVote(post_id=post.id, user_id=me.id, vote_type="up"),
+            QAVote(post_id=post.id, user_id=users[2].id, vote_type="down" if i % 2 else "up"),
+        ])
+
+        db.add(Notification(user_id=me.id, title=f"Notice {i}", content="Update",
+                            notification_type="system", course_id=courses[i % 5].id))
+
+    db.commit()
+    # Votes and replies were inserted directly, so bring the post counters up to date
+    reconcile_qa_counters(db)
+    # Load the current user up front, as get_current_user does for a request
+    db.refresh(me)
+    return me
+
+
+def run_counted(counter, coroutine):
+    """Run an endpoint coroutine and return its result with the number of queries"""
+    counter.count = 0
+    result = asyncio.run(coroutine)
+    return result, counter.count
+
+
+def seeded_database():
+    """Seeded session, its current user and a query counter"""
+    engine, db = create_session()
+    me = seed(db)
+    return db, me, QueryCounter(engine)
+
+
+def test_messages_query_count():
+    """GET /messages builds a full page in a constant number of queries"""
+    db, me, counter = seeded_database()
+    messages, queries = run_counted(counter, messaging.get_messages(
+        skip=0, limit=PAGE_SIZE, search=None, cursor=None, course_id=None, is_read=None,
+        is_archived=False, current_user=me, db=db
+    ))
+    print(f"GET /messages: {len(messages)} messages in {queries} queries")
+    assert len(messages) == PAGE_SIZE
+    assert all(m.sender_name and m.course_title for m in messages if m.parent_message_id is None)
+    assert queries <= MAX_MESSAGE_QUERIES
+
+
+def test_qa_posts_query_count():
+    """GET /qa/posts builds a full page in a constant number of queries"""
+    db, me, counter = seeded_database()
+    posts, queries = run_counted(counter, messaging.get_qa_posts(
+        course_id=None, post_type=None, search=None, tags=None, is_resolved=None,
+        is_pinned=None, skip=0, limit=PAGE_SIZE, cursor=None, current_user=me, db=db
+    ))
+    print(f"GET /qa/posts: {len(posts)} posts in {queries} queries")
+    assert len(posts) == PAGE_SIZE
+    assert all(p.reply_count == 1 and p.user_vote == "up" for p in posts)
+    assert {p.vote_score for p in posts} == {0, 2}
+    assert queries <= MAX_QA_POST_QUERIES
+
+
+def test_notifications_query_count():
+    """GET /notifications builds a full page in a constant number of queries"""
+    db, me, counter = seeded_database()
+    notifications, queries = run_counted(counter, messaging.get_notifications(
+        skip=0, limit=PAGE_SIZE, is_read=None, cursor=None, current_user=me, db=db
+    ))
+    print(f"GET /notifications: {len(notifications)} notifications in {queries} queries")
+    assert len(notifications) == PAGE_SIZE
+    assert all(n.course_title for n in notifications)
+    assert queries <= MAX_NOTIFICATION_QUERIES
+
+
+def test_vote_counters_follow_votes():
+    """Voting endpoints keep the post counters consistent without reconciliation"""
+    db, me, counter = seeded_database()
+    post = db.query(QAPost).filter(QAPost.parent_post_id.is_(None)).first()
+    voter = db.query(User).filter(User.id != me.id, User.id != post.author_id).first()
+
+    asyncio.run(messaging.create_vote(QAVoteCreate(post_id=post.id, vote_type="down"), current_user=me, db=db))
+    asyncio.run(messaging.create_vote(QAVoteCreate(post_id=post.id, vote_type="up"), current_user=voter, db=db))
+    asyncio.run(messaging.delete_vote(post.id, current_user=voter, db=db))
+
+    db.refresh(post)
+    print(f"Post {post.id}: score {post.vote_score} (+{post.upvote_count}/-{post.downvote_count})")
+    assert reconcile_qa_counters(db) == 0
+
+
+def test_bulk_notifications_statement_count():
+    """Course-wide notifications are inserted in one statement"""
+    db, me, counter = seeded_database()
+    user_ids = [user_id for (user_id,) in db.query(User.id).filter(User.id != me.id)]
+    before = db.query(Notification).count()
+
+    counter.statements = 0
+    notifications = create_notifications(
+        db, user_ids, title="New question", content="How?", notification_type="qa_reply",
+        send_email=False
+    )
+    statements = counter.statements
+    print(f"create_notifications: {len(notifications)} notifications in {statements} statements")
+    assert db.query(Notification).count() == before + len(user_ids)
+    assert {n.user_id for n in notifications} == set(user_ids)
+    assert statements <= MAX_BULK_NOTIFICATION_STATEMENTS
+
+
+def test_failed_email_queueing_keeps_notifications():
+    """A failure while queueing emails rolls back only the email writes"""
+    db, me, counter = seeded_database()
+    user_ids = [user_id for (user_id,) in db.query(User.id).filter(User.id != me.id)]
+    before = db.query(Notification).count()
+
+    def failing_queue_emails(db, *args):
+        db.add(Notification(user_id=me.id, title="Half written", content="", notification_type="system"))
+        db.flush()
+        raise RuntimeError("outbound_emails insert failed")
+
+    queue_emails = notification_dispatch._queue_emails
+    notification_dispatch._queue_emails = failing_queue_emails
+    try:
+        notifications = create_notifications(
+            db, user_ids, title="New question", content="How?", notification_type="qa_reply"
+        )
+    finally:
+        notification_dispatch._queue_emails = queue_emails
+
+    db.rollback()
+    assert len(notifications) == len(user_ids)
+    assert db.query(Notification).count() == before + len(user_ids)
+    assert db.query(Notification).filter(Notification.title == "Half written").count() == 0
+
+
+def test_search_ranks_and_paginates():
+    """Message search ranks subject hits first, highlights matches and pages by cursor"""
+    db, me, counter = seeded_database()
+    other = db.query(User).filter(User.id != me.id).first()
+    for i in range(5):
+        db.add(Message(sender_id=other.id, recipient_id=me.id, subject=f"Hydraulic leak {i}",
+                       content="The excavator is leaking fluid"))
+        db.add(Message(sender_id=other.id, recipient_id=me.id, subject=f"Question {i}",
+                       content="Where is the hydraulic <tank>?"))
+    db.commit()
+
+    def search_page(cursor):
+        response = Response()
+        page = asyncio.run(messaging.get_messages(
+            skip=0, limit=4, search="hydraulic", cursor=cursor, course_id=None, is_read=None,
+            is_archived=False, response=response, current_user=me, db=db
+        ))
+        return page, response.headers.get("X-Next-Cursor")
+
+    first, cursor = search_page(None)
+    second, cursor = search_page(cursor)
+    third, cursor = search_page(cursor)
+    results = first + second + third
+    print(f"Search: {len(results)} hits over 3 pages, top highlight {first[0].highlight!r}")
+
+    assert cursor is None
+    assert len({m.id for m in results}) == len(results) == 10
+    assert all(m.subject.startswith("Hydraulic") for m in results[:5])
+    assert [m.search_rank for m in results] == sorted((m.search_rank for m in results), reverse=True)
+    assert all("<mark>" in m.highlight for m in results)
+    assert "&lt;tank&gt;" in results[-1].highlight
+
+
+def test_search_ties_across_pages():
+    """Equal ranks split over page boundaries are paged by id without gaps or repeats"""
+    db, me, counter = seeded_database()
+    other = db.query(User).filter(User.id != me.id).first()
+    tied = [Message(sender_id=other.id, recipient_id=me.id, subject=f"Reminder {i}",
+                    content="Check the hydraulic hoses") for i in range(7)]
+    db.add_all(tied)
+    db.commit()
+
+    seen, cursor, pages = [], None, 0
+    while True:
+        response = Response()
+        page = asyncio.run(messaging.get_messages(
+            skip=0, limit=3, search="hydraulic", cursor=cursor, course_id=None, is_read=None,
+            is_archived=False, response=response, current_user=me, db=db
+        ))
+        seen.extend(page)
+        pages += 1
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+
+    # Every hit ranks 1/3, which no float type stores exactly
+    assert {m.search_rank for m in seen} == {1 / 3}
+    assert [m.id for m in seen] == sorted((m.id for m in tied), reverse=True)
+    assert pages == 3
+
+    # On Postgres the float4 ts_rank_cd is compared as double precision, the type the cursor round-trips
+    from sqlalchemy.dialects import postgresql
+    cached = message_search._vector_columns.pop(Message.__tablename__, None)
+    message_search._vector_columns[Message.__tablename__] = True
+    try:
+        match, rank, headline = message_search._postgres_terms(db, Message, "hydraulic")
+    finally:
+        message_search._vector_columns.pop(Message.__tablename__)
+        if cached is not None:
+            message_search._vector_columns[Message.__tablename__] = cached
+    assert str(rank.compile(dialect=postgresql.dialect())).startswith("CAST(ts_rank_cd(")
+
+
+def test_cursor_pagination_is_stable():
+    """Notification pages follow the cursor without gaps or duplicates as new rows arrive"""
+    db, me, counter = seeded_database()
+
+    seen, cursor, pages = [], None, 0
+    while True:
+        response = Response()
+        notifications = asyncio.run(messaging.get_notifications(
+            skip=0, limit=30, is_read=None, cursor=cursor, response=response, current_user=me, db=db
+        ))
+        seen.extend(n.id for n in notifications)
+        pages += 1
+        if pages == 1:
+            # A new notification arriving mid-scroll must not shift later pages
+            db.add(Notification(user_id=me.id, title="Late", content="Update", notification_type="system"))
+            db.commit()
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+
+    print(f"GET /notifications: {len(seen)} notifications over {pages} cursor pages")
+    assert len(seen) == len(set(seen)) == PAGE_SIZE
+    assert pages == 4
+
+
+def main():
+    """Run the query-count test"""
+    print("🔢 Messaging Query Count Test")
+    print("=" * 50)
+    test_messages_query_count()
+    test_qa_posts_query_count()
+    test_notifications_query_count()
+    test_vote_counters_follow_votes()
+    test_bulk_notifications_statement_count()
+    test_failed_email_queueing_keeps_notifications()
+    test_search_ranks_and_paginates()
+    test_search_ties_across_pages()
+    test_cursor_pagination_is_stable()
+    print("✅ All list endpoints use a constant number of queries")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+Query-count test for the student dashboard
+Seeds an in-memory SQLite database with a student enrolled in many courses and
+checks that /student-learning/my-courses is built in a constant number of queries,
+that learning-session events keep the enrollment_progress table current, and that
+learning analytics are aggregated in SQL
+"""
+
+import os
+import sys
+import asyncio
+from datetime import datetime, timedelta
+
+# Add the app directory to the Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.core.database import Base
+from app.models import User, Course
+from app.models.course import CourseFileContent
+from app.models.learning import Enrollment, EnrollmentProgress, LearningSession, LearningTimeTracking
+from app.api import course_management, learning_analytics, student_learning, time_tracking
+from app.schemas.learning import LearningSessionCreate
+from app.schemas.time_tracking import TimeTrackingStart, TimeTrackingEnd
+from app.services.enrollment_progress import rebuild_enrollment_progress, refresh_course_progress
+
+COURSES = 25
+CONTENT_PER_COURSE = 4
+# Enrollments joined to courses and their progress rows
+MAX_DASHBOARD_QUERIES = 1
+
+
+class QueryCounter:
+    """Counts SELECT statements issued on an engine"""
+
+    def __init__(self, engine):
+        self.count = 0
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            self.count += 1
+
+
+def seeded_database(autoflush=True):
+    """A student enrolled in every course, with some learning sessions in each"""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine, tables=[
+        User.__table__, Course.__table__, CourseFileContent.__table__,
+        Enrollment.__table__, LearningSession.__table__, LearningTimeTracking.__table__,
+        EnrollmentProgress.__table__
+    ])
+    db = sessionmaker(bind=engine, autoflush=autoflush)()
+
+    instructor = User(email="instructor@example.com", hashed_password="x", role="instructor")
+    student = User(email="student@example.com", hashed_password="x", role="student")
+    db.add_all([instructor, student])
+    db.flush()
+
+    start = datetime(2026, 1, 1)
+    for i in range(COURSES):
+        course = Course(title=f"Course {i}", description="Plant operation", instructor_id=instructor.id)
+        db.add(course)
+        db.flush()
+        db.add_all([
+            CourseFileContent(course_id=course.id, instructor_id=instructor.id, title=f"Workbook {j}",
+                              is_active=j < CONTENT_PER_COURSE)
+            for j in range(CONTENT_PER_COURSE + 1)
+        ])
+        enrollment = Enrollment(user_id=student.id, course_id=course.id, status="active")
+        db.add(enrollment)
+        db.flush()
+        # Course i has i % 5 completed sessions and one still open
+        for j in range(i % 5 + 1):
+            db.add(LearningSession(
+                user_id=student.id, course_id=course.id, enrollment_id=enrollment.id, duration_minutes=30,
+                started_at=start + timedelta(days=i, hours=j),
+                ended_at=start + timedelta(days=i, hours=j, minutes=30) if j < i % 5 else None
+            ))
+
+    rebuild_enrollment_progress(db)
+    db.commit()
+    db.refresh(student)
+    return db, student, QueryCounter(engine)
+
+
+def test_my_courses_query_count():
+    """GET /student-learning/my-courses builds every enrollment in a constant number of queries"""
+    db, student, counter = seeded_database()
+
+    counter.count = 0
+    courses = asyncio.run(student_learning.get_my_courses(db=db, current_user=student))
+    print(f"GET /my-courses: {len(courses)} courses in {counter.count} queries")
+
+    assert len(courses) == COURSES
+    assert counter.count <= MAX_DASHBOARD_QUERIES
+    for i, course in enumerate(courses):
+        assert course.progress_percentage == round((i % 5) / CONTENT_PER_COURSE * 100, 2)
+        assert course.last_accessed == datetime(2026, 1, 1) + timedelta(days=i, hours=i % 5)
+        assert course.status == ("completed" if i % 5 >= CONTENT_PER_COURSE else "active")
+
+
+def progress_rows(db):
+    """Every enrollment_progress row as comparable tuples"""
+    db.expire_all()
+    return [
+        (row.enrollment_id, row.total_content, row.completed_sessions, row.learning_minutes,
+         row.tracked_seconds, row.progress_percentage)
+        for row in db.query(EnrollmentProgress).order_by(EnrollmentProgress.enrollment_id)
+    ]
+
+
+def test_session_events_maintain_progress():
+    """Starting and ending sessions updates progress rows to what a rebuild would produce"""
+    db, student, counter = seeded_database()
+    course_id = db.query(Course.id).order_by(Course.id).first()[0]
+    content = db.query(CourseFileContent).filter(
+        CourseFileContent.course_id == course_id, CourseFileContent.is_active == True
+    ).first()
+    # Rows for enrollments with no events yet are built on their first event
+    db.query(EnrollmentProgress).filter(EnrollmentProgress.course_id == course_id).delete()
+    db.commit()
+
+    for minutes in (20, 40):
+        session = asyncio.run(student_learning.start_learning_session(
+            LearningSessionCreate(course_id=course_id, content_id=content.id), db=db, current_user=student
+        ))
+        asyncio.run(student_learning.end_learning_session(
+            session.id, {"duration_minutes": minutes}, db=db, current_user=student
+        ))
+
+    tracking = asyncio.run(time_tracking.start_time_tracking(
+        TimeTrackingStart(course_id=course_id), current_user=student, db=db
+    ))
+    asyncio.run(time_tracking.end_time_tracking(
+        tracking.session_id, TimeTrackingEnd(final_time_spent_seconds=300), current_user=student, db=db
+    ))
+
+    maintained = progress_rows(db)
+    first = maintained[0]
+    print(f"Course {course_id}: {first[2]} sessions, {first[3]} minutes, {first[4]}s tracked, {first[5]}%")
+    assert first[1:] == (CONTENT_PER_COURSE, 2, 60, 300, 50.0)
+
+    rebuild_enrollment_progress(db)
+    db.commit()
+    assert progress_rows(db) == maintained
+
+    # The /progress summary reads the same rows
+    db.refresh(student)
+    counter.count = 0
+    summary = asyncio.run(student_learning.get_learning_progress(db=db, current_user=student))
+    assert counter.count <= MAX_DASHBOARD_QUERIES
+    assert summary.total_learning_time_minutes == sum(row[3] for row in maintained)
+
+
+def test_content_changes_rescale_progress():
+    """Adding and deactivating content files rescales progress, with autoflush off as in production"""
+    db, student, counter = seeded_database(autoflush=False)
+    course = db.query(Course).order_by(Course.id).offset(2).first()
+
+    def progress():
+        db.expire_all()
+        row = db.query(EnrollmentProgress).filter(EnrollmentProgress.course_id == course.id).one()
+        return row.total_content, row.progress_percentage
+
+    assert progress() == (CONTENT_PER_COURSE, 50.0)
+
+    added = CourseFileContent(course_id=course.id, instructor_id=course.instructor_id, title="New workbook",
+                              is_active=True)
+    db.add(added)
+    refresh_course_progress(db, course.id)
+    db.commit()
+    assert progress() == (CONTENT_PER_COURSE + 1, 40.0)
+
+    added.is_active = False
+    refresh_course_progress(db, course.id)
+    db.commit()
+    assert progress() == (CONTENT_PER_COURSE, 50.0)
+
+
+def test_course_delete_drops_progress():
+    """Deleting a course removes its enrollments' progress rows and leaves the others alone"""
+    db, student, counter = seeded_database(autoflush=False)
+    instructor = db.query(User).filter(User.role == "instructor").one()
+    course = db.query(Course).order_by(Course.id).first()
+    # The course's other relationships are loaded when it is deleted
+    Base.metadata.create_all(db.get_bind())
+
+    asyncio.run(course_management.delete_course(course.id, current_user=instructor, db=db))
+    assert db.query(EnrollmentProgress).filter(EnrollmentProgress.course_id == course.id).count() == 0
+    assert db.query(EnrollmentProgress).count() == COURSES - 1
+
+
+def test_learning_goals_count_completed_courses():
+    """Only completed enrollments count towards the course goal, not dropped or paused ones"""
+    db, student, counter = seeded_database()
+    enrollments = db.query(Enrollment).filter(Enrollment.user_id == student.id).order_by(Enrollment.id).all()
+    for enrollment, status in zip(enrollments, ["completed", "completed", "dropped", "paused"]):
+        enrollment.status = status
+    db.commit()
+
+    goals = learning_analytics.get_learning_goals(db, student.id, enrollments)
+    assert (goals[0]["target"], goals[0]["current"]) == (COURSES, 2)
+
+
+def test_streak_and_activity_in_sql():
+    """Streak and daily activity match a Python reference in a constant number of queries"""
+    db, student, counter = seeded_database()
+    course_ids = [row[0] for row in db.query(Course.id).order_by(Course.id).limit(3)]
+    today = datetime.utcnow().replace(hour=9, minute=0, second=0, microsecond=0)
+
+    # Active on each of the last 6 days, then a gap, then a long history
+    history_days = [0, 1, 2, 3, 4, 5] + list(range(7, 200))
+    for days_ago in history_days:
+        for n, course_id in enumerate(course_ids[:days_ago % 3 + 1]):
+            started = today - timedelta(days=days_ago, minutes=n * 45)
+            db.add(LearningSession(user_id=student.id, course_id=course_id, duration_minutes=15,
+                                   started_at=started, ended_at=started + timedelta(minutes=15)))
+    db.commit()
+    db.refresh(student)
+
+    counter.count = 0
+    streak = learning_analytics.calculate_learning_streak(db, student.id)
+    start = today - timedelta(days=9, hours=12)
+    activity = learning_analytics.get_weekly_activity(db, student.id, start, today + timedelta(hours=1))
+    print(f"Streak of {streak} days and {len(activity)} active days in {counter.count} queries")
+
+    assert streak == 6
+    assert counter.count == 2
+    expected = [
+        {"date": (today - timedelta(days=days_ago)).date().isoformat(),
+         "minutes": 15 * (days_ago % 3 + 1), "courses_accessed": days_ago % 3 + 1}
+        for days_ago in sorted((d for d in history_days if d <= 9), reverse=True)
+    ]
+    assert activity == expected
+
+
+def main():
+    """Run the dashboard tests"""
+    print("🎓 Student Dashboard Query Count Test")
+    print("=" * 50)
+    test_my_courses_query_count()
+    print("✅ The dashboard uses a constant number of queries")
+    test_session_events_maintain_progress()
+    print("✅ Session events keep enrollment progress current")
+    test_content_changes_rescale_progress()
+    print("✅ Content changes rescale enrollment progress")
+    test_course_delete_drops_progress()
+    print("✅ Deleting a course drops its progress rows")
+    test_learning_goals_count_completed_courses()
+    print("✅ Learning goals count completed courses")
+    test_streak_and_activity_in_sql()
+    print("✅ Learning streak and activity are computed in SQL")
+
+
+if __name__ == "__main__":
+    main()
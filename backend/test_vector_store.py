@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+"""
+Vector store test
+Checks that the segmented store survives reloads, compaction and torn writes,
+that legacy stores are re-embedded on import, that course partitions keep
+searches apart, and that the hashing embedder, text chunker and TTL cache
+behave as the RAG service expects
+"""
+
+import os
+import sys
+import json
+import time
+import tempfile
+from pathlib import Path
+
+# Add the app directory to the Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+import faiss
+import numpy as np
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.services.hashing_embedder import HashingEmbedder
+from app.services.text_chunker import TextChunker
+from app.services.vector_store import (
+    ChunkTable, NO_COURSE, PartitionedIndex, SegmentedVectorStore, HASHING_STORE, MINILM_STORE
+)
+
+DIMENSION = 16
+
+
+def document(document_id, course_id, chunks):
+    """A pre-chunked document for SegmentedVectorStore.append"""
+    return {"document_id": document_id, "metadata": {"course_id": course_id}, "chunks": chunks}
+
+
+def vectors_for(count, seed):
+    """Deterministic unit vectors"""
+    rng = np.random.default_rng(seed)
+    return HashingEmbedder.normalize(rng.standard_normal((count, DIMENSION)))
+
+
+def loaded_chunks(store):
+    """Every committed chunk's (id, course, text) after a fresh load"""
+    table = ChunkTable()
+    vectors = []
+    for segment in store.load():
+        table.add_segment(segment)
+        vectors.append(np.asarray(segment.vectors))
+    rows = [(int(row["id"]), int(row["course"]), table.text(int(row["id"]))) for row in table.columns]
+    return rows, np.concatenate(vectors) if vectors else np.empty((0, DIMENSION))
+
+
+def test_append_reload_and_compaction():
+    """Appended segments reload with dense ids and the same text, before and after compaction"""
+    with tempfile.TemporaryDirectory() as path:
+        store = SegmentedVectorStore(Path(path), DIMENSION, compact_after=100)
+        store.load()
+        written = []
+        text = "Check the tyres. Lower the forks — then isolate the engine."
+        batches = [
+            ([document("manual", 1, ["Pre-start checks", "Walk around the machine"])], vectors_for(2, 1)),
+            ([document("notes", None, ["Überlast vermeiden"])], vectors_for(1, 2)),
+            ([{"document_id": "guide", "metadata": {"course_id": 2}, "text": text,
+               "spans": [(0, 16), (17, len(text))]}], vectors_for(2, 3)),
+        ]
+        for documents, vectors in batches:
+            store.append(vectors, documents)
+            written.append(vectors)
+        expected_vectors = np.concatenate(written)
+        expected = [
+            (0, 1, "Pre-start checks"), (1, 1, "Walk around the machine"), (2, NO_COURSE, "Überlast vermeiden"),
+            (3, 2, "Check the tyres."), (4, 2, "Lower the forks — then isolate the engine."),
+        ]
+
+        reloaded = SegmentedVectorStore(Path(path), DIMENSION)
+        rows, vectors = loaded_chunks(reloaded)
+        assert rows == expected
+        assert np.array_equal(vectors, expected_vectors)
+        assert (reloaded.version, reloaded.next_id, reloaded.next_doc) == (3, 5, 3)
+
+        # Another process's store picks up new segments through refresh
+        store.append(vectors_for(1, 4), [document("late", 1, ["Refuel with the engine off"])])
+        refreshed = reloaded.refresh()
+        assert [int(i) for segment in refreshed for i in segment.chunks["id"]] == [5]
+        assert reloaded.refresh() == []
+        expected.append((5, 1, "Refuel with the engine off"))
+
+        assert store.compact()
+        assert len(store._read_log()) == 1
+        assert len(list(Path(path).glob("seg_*.npy"))) == 2  # vectors and chunk columns of the merged segment
+        rows, vectors = loaded_chunks(SegmentedVectorStore(Path(path), DIMENSION))
+        assert rows == expected
+        assert np.allclose(vectors[:5], expected_vectors)
+
+        # Ids carry on after the merged segment
+        store.append(vectors_for(1, 5), [document("after", 2, ["Park on level ground"])])
+        rows, _ = loaded_chunks(SegmentedVectorStore(Path(path), DIMENSION))
+        assert rows[-1] == (6, 2, "Park on level ground")
+    print(f"Store: {len(rows)} chunks reloaded across appends, refresh and compaction")
+
+
+def test_torn_writes_are_ignored():
+    """An uncommitted segment and a torn log line are skipped, and later appends still commit"""
+    with tempfile.TemporaryDirectory() as path:
+        store = SegmentedVectorStore(Path(path), DIMENSION)
+        store.load()
+        store.append(vectors_for(1, 1), [document("manual", 1, ["Pre-start checks"])])
+
+        # A crash after writing segment files but before the log record, then one mid-record
+        np.save(Path(path) / "seg_00000002.npy", vectors_for(1, 2))
+        with open(store.log_path, "a") as f:
+            f.write('{"seq": 3, "segment": "seg_0000')
+
+        reloaded = SegmentedVectorStore(Path(path), DIMENSION)
+        rows, _ = loaded_chunks(reloaded)
+        assert rows == [(0, 1, "Pre-start checks")]
+
+        reloaded.append(vectors_for(1, 3), [document("notes", 1, ["Lower the forks"])])
+        rows, _ = loaded_chunks(SegmentedVectorStore(Path(path), DIMENSION))
+        assert rows == [(0, 1, "Pre-start checks"), (1, 1, "Lower the forks")]
+
+
+def test_course_partitions_isolate_search():
+    """A course-scoped search only returns that course's chunks; a global one merges by score"""
+    index = PartitionedIndex(DIMENSION, "flat")
+    vectors = vectors_for(6, 7)
+    # Course 2 holds exact copies of course 1's vectors, so only the partitioning can tell them apart
+    index.add(np.concatenate([vectors[:3], vectors[:3]]), np.arange(6), np.array([1, 1, 1, 2, 2, 2]))
+    query = vectors[:1]
+
+    course_one = index.search(query, 3, [1])
+    assert [idx for _, idx in course_one][0] == 0 and {idx for _, idx in course_one} == {0, 1, 2}
+    assert {idx for _, idx in index.search(query, 3, [2])} == {3, 4, 5}
+    assert index.search(query, 3, [99]) == []
+
+    merged = index.search(query, 4)
+    assert len(merged) == 4 and {idx for _, idx in merged[:2]} == {0, 3}
+    assert [score for score, _ in merged] == sorted((score for score, _ in merged), reverse=True)
+
+
+def test_rag_search_stays_in_course():
+    """Documents embedded for one course are never returned for another"""
+    from app.services.simple_rag_service import SimpleDocumentEmbedder
+
+    store_path = settings.vector_store_path
+    with tempfile.TemporaryDirectory() as path:
+        settings.vector_store_path = path
+        try:
+            embedder = SimpleDocumentEmbedder()
+            text = "Telehandler stability depends on the load chart. Never exceed the rated capacity."
+            embedder.embed_document(text, "course-1-manual", {"course_id": 1})
+            embedder.embed_document(text, "course-2-manual", {"course_id": 2})
+
+            hits = embedder.search_similar_content("telehandler load chart", top_k=5, course_ids=[2])
+            assert hits and {hit["document_id"] for hit in hits} == {"course-2-manual"}
+            everywhere = embedder.search_similar_content("telehandler load chart", top_k=5)
+            assert {hit["document_id"] for hit in everywhere} == {"course-1-manual", "course-2-manual"}
+
+            # A second process loading the same store sees the same partitions
+            reloaded = SimpleDocumentEmbedder()
+            hits = reloaded.search_similar_content("telehandler load chart", top_k=5, course_ids=[1])
+            assert {hit["document_id"] for hit in hits} == {"course-1-manual"}
+
+            # Hashing vectors stay out of the sentence-transformer store, which shares the dimension
+            assert (Path(path) / HASHING_STORE / "segments.log").exists()
+            assert SegmentedVectorStore(Path(path) / MINILM_STORE, settings.vector_dimension).load() == []
+        finally:
+            settings.vector_store_path = store_path
+
+
+def test_legacy_store_is_reembedded():
+    """A legacy faiss_index.bin/metadata.json store is imported into each embedder's store with its own vectors"""
+    from app.services.simple_rag_service import SimpleDocumentEmbedder
+
+    store_path = settings.vector_store_path
+    with tempfile.TemporaryDirectory() as root:
+        path = Path(root) / HASHING_STORE
+        texts = ["Check the tyres", "Lower the forks", "Isolate the engine"]
+        # The old vectors came from a salted hash() and are noise to any other process
+        legacy = faiss.IndexFlatIP(settings.vector_dimension)
+        legacy.add(vectors_for(3, 9).repeat(settings.vector_dimension // DIMENSION, axis=1))
+        faiss.write_index(legacy, str(Path(root) / "faiss_index.bin"))
+        metadata = {
+            str(i): {"content": text, "document_id": "manual" if i < 2 else "notes",
+                     "metadata": {"course_id": 3}, "chunk_index": i}
+            for i, text in enumerate(texts)
+        }
+        with open(Path(root) / "metadata.json", "w") as f:
+            json.dump(metadata, f)
+
+        # Without an embedder the legacy store is left for the RAG service to import
+        assert SegmentedVectorStore(path, settings.vector_dimension, legacy_path=Path(root)).load() == []
+        assert not (path / "segments.log").exists()
+
+        settings.vector_store_path = root
+        try:
+            embedder = SimpleDocumentEmbedder()
+        finally:
+            settings.vector_store_path = store_path
+        segments = SegmentedVectorStore(path, settings.vector_dimension).load()
+        assert [len(segment.chunks) for segment in segments] == [3]
+        assert np.allclose(segments[0].vectors, embedder.hasher.embed_batch(texts))
+        assert [segment["document_id"] for segment in segments[0].documents] == ["manual", "notes"]
+
+        hits = embedder.search_similar_content("lower the forks", top_k=1, course_ids=[3])
+        assert [(hit["content"], hit["document_id"]) for hit in hits] == [("Lower the forks", "manual")]
+
+        # Another embedder's store imports the same chunks with its own model
+        other = HashingEmbedder(settings.vector_dimension, ngram_max=1)
+        segments = SegmentedVectorStore(Path(root) / MINILM_STORE, settings.vector_dimension,
+                                        embed=other.embed_batch, legacy_path=Path(root)).load()
+        assert [len(segment.chunks) for segment in segments] == [3]
+        assert np.allclose(segments[0].vectors, other.embed_batch(texts))
+        assert not np.allclose(segments[0].vectors, embedder.hasher.embed_batch(texts))
+        assert not (Path(root) / "segments.log").exists()
+
+
+def test_processed_document_reports_its_chunks():
+    """process_uploaded_document reports the chunks of that document, not of the whole store"""
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from sqlalchemy.pool import StaticPool
+    from app.core.database import Base
+    from app.models import User, Course
+    from app.models.course import CourseFileContent
+    from app.services.simple_rag_service import SimpleDocumentEmbedder, SimpleRAGService
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine, tables=[User.__table__, Course.__table__, CourseFileContent.__table__])
+    db = sessionmaker(bind=engine)()
+    instructor = User(email="instructor@example.com", hashed_password="x", role="instructor")
+    db.add(instructor)
+    db.flush()
+    course = Course(title="Forklift", instructor_id=instructor.id)
+    db.add(course)
+    db.flush()
+    sentences = [f"Step {n}: check the forklift mast chain and the hydraulic hoses before use." for n in range(40)]
+    contents = [
+        CourseFileContent(course_id=course.id, instructor_id=instructor.id, title=f"Manual {n}",
+                          content_type="text", description=" ".join(sentences[:count]))
+        for n, count in enumerate((40, 3))
+    ]
+    db.add_all(contents)
+    db.commit()
+
+    store_path, api_key = settings.vector_store_path, settings.openai_api_key
+    with tempfile.TemporaryDirectory() as path:
+        # Nothing here calls OpenAI, but the client needs a key to be created
+        settings.vector_store_path, settings.openai_api_key = path, api_key or "sk-unused"
+        try:
+            service = SimpleRAGService(db)
+            service._embedder = SimpleDocumentEmbedder()
+            first = service.process_uploaded_document(contents[0].id, instructor.id)
+            second = service.process_uploaded_document(contents[1].id, instructor.id)
+        finally:
+            settings.vector_store_path, settings.openai_api_key = store_path, api_key
+
+    chunker = service._embedder.chunker
+    assert first["chunks_created"] == len(chunker.chunk(contents[0].description)) > 1
+    assert second["chunks_created"] == len(chunker.chunk(contents[1].description)) == 1
+    assert len(service._embedder.chunks) == first["chunks_created"] + second["chunks_created"]
+
+
+def test_hashing_embedder_is_deterministic():
+    """Embeddings are unit vectors that do not depend on the instance or the batch"""
+    texts = ["Check the hydraulic hoses", "", "Lower the forks before leaving the cab"]
+    first = HashingEmbedder(64, ngram_max=2).embed_batch(texts)
+    second = HashingEmbedder(64, ngram_max=2)
+
+    assert first.shape == (3, 64) and first.dtype == np.float32
+    assert np.array_equal(first[2], second.embed_batch(texts[2:])[0])
+    assert np.allclose(np.linalg.norm(first[[0, 2]], axis=1), 1.0)
+    assert not first[1].any()
+    # Bigrams make word order matter
+    assert not np.array_equal(second.embed("forks lower"), second.embed("lower forks"))
+
+
+def test_text_chunker_offsets():
+    """Chunks are in-bounds offsets within the token limit that cover every word"""
+    text = (
+        "2.1 Pre-start checks\n\n"
+        "Walk around the machine. Check the tyres, the forks and the mast for damage! "
+        "Look for leaks under the engine.\n\n"
+        "SHUTDOWN\n\n" + " ".join(f"word{n}" for n in range(40)) + "."
+    )
+    chunker = TextChunker(max_tokens=12, overlap_tokens=3)
+    spans = chunker.chunk(text)
+
+    assert spans and spans == sorted(spans)
+    for start, end in spans:
+        assert 0 <= start < end <= len(text)
+        assert not text[start].isspace() and not text[end - 1].isspace()
+        assert chunker.count_tokens([text[start:end]])[0] <= 12
+    covered = set()
+    for start, end in spans:
+        covered.update(range(start, end))
+    assert all(i in covered for i, char in enumerate(text) if not char.isspace())
+    assert text[spans[0][0]:spans[0][1]].startswith("2.1 Pre-start checks")
+    assert chunker.chunk("   ") == []
+
+
+def test_ttl_cache_evicts_and_expires():
+    """The least recently used entry is evicted first and entries expire after their TTL"""
+    cache = TTLCache(max_size=2, ttl_seconds=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is None and cache.get("a") == 1 and cache.get("c") == 3
+
+    cache.set("short", 4, ttl_seconds=0.01)
+    time.sleep(0.02)
+    assert cache.get("short", "gone") == "gone"
+    stats = cache.stats()
+    assert (stats["evictions"], stats["expirations"], stats["size"]) == (2, 1, 1)
+
+
+def main():
+    """Run the vector store tests"""
+    print("🧭 Vector Store Test")
+    print("=" * 50)
+    test_append_reload_and_compaction()
+    print("✅ Segments reload, refresh and compact without losing chunks")
+    test_torn_writes_are_ignored()
+    print("✅ Torn writes are ignored and later appends still commit")
+    test_course_partitions_isolate_search()
+    test_rag_search_stays_in_course()
+    print("✅ Course partitions keep searches apart")
+    test_legacy_store_is_reembedded()
+    print("✅ Legacy stores are imported with re-embedded chunks")
+    test_processed_document_reports_its_chunks()
+    print("✅ Processed documents report their own chunk count")
+    test_hashing_embedder_is_deterministic()
+    test_text_chunker_offsets()
+    test_ttl_cache_evicts_and_expires()
+    print("✅ Embedder, chunker and cache behave as expected")
+
+
+if __name__ == "__main__":
+    main()
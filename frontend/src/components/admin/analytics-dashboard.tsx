@@ -129,14 +129,16 @@ export default function AnalyticsDashboard() {
       );
       
       if (response.ok) {
-        const data = await response.json();
+        // The export is streamed as a file download
+        const blob = await response.blob();
+        const disposition = response.headers.get('Content-Disposition') || '';
+        const filename = disposition.match(/filename="([^"]+)"/)?.[1] || `analytics_overview.${format}`;
         
         // Create download link
-        const blob = new Blob([data.content], { type: data.content_type });
         const url = window.URL.createObjectURL(blob);
         const a = document.createElement('a');
         a.href = url;
-        a.download = data.filename;
+        a.download = filename;
         document.body.appendChild(a);
         a.click();
         window.URL.revokeObjectURL(url);
@@ -1,7 +1,7 @@
 "use client";
 
 import React, { useState, useEffect } from 'react';
-import { api } from '@/lib/api';
+import { api, fetchAllPages } from '@/lib/api';
 import ContentPreview from './content-preview';
 
 interface Course {
@@ -125,16 +125,12 @@ export default function CourseContentBuilder({ courseId, onContentUpdate }: Cour
 
   const loadGeneratedContent = async () => {
     try {
-      const response = await fetch(`${api.baseUrl}/api/content/courses/${courseId}/generated-content`, {
+      const data = await fetchAllPages(`${api.baseUrl}/api/content/courses/${courseId}/generated-content`, {
         headers: {
           'Authorization': `Bearer ${localStorage.getItem('token')}`
         }
       });
-      
-      if (response.ok) {
-        const data = await response.json();
-        setGeneratedContent(data);
-      }
+      setGeneratedContent(data);
     } catch (err) {
       console.error('Error loading generated content:', err);
     }
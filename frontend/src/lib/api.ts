@@ -267,6 +267,26 @@ export const makeAuthenticatedRequest = async (url: string, options: RequestInit
   return handleApiError(response);
 };
 
+/**
+ * Fetch every page of a cursor-paginated list endpoint, following the X-Next-Cursor header
+ */
+export const fetchAllPages = async <T = any>(url: string, options: RequestInit = {}): Promise<T[]> => {
+  const items: T[] = [];
+  let cursor: string | null = null;
+  
+  do {
+    const pageUrl = cursor ? `${url}${url.includes('?') ? '&' : '?'}cursor=${encodeURIComponent(cursor)}` : url;
+    const response = await fetch(pageUrl, options);
+    if (!response.ok) {
+      throw new Error(`HTTP ${response.status}: ${response.statusText}`);
+    }
+    items.push(...(await response.json()));
+    cursor = response.headers.get('X-Next-Cursor');
+  } while (cursor);
+  
+  return items;
+};
+
 /**
  * Logout function - clears token and redirects to main site
  */